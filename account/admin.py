@@ -1,13 +1,58 @@
+from typing import List
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.urls import path
 
 from account.models import CustomUser
+from core.settings import USERNAME_AUTOCOMPLETE_LIMIT
+from utils.replicas import ReplicaReadMixin, get_read_database
 
 
 @admin.register(CustomUser)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ReplicaReadMixin, BaseUserAdmin):
     ordering = ("email",)
 
+    def get_urls(self) -> List:
+        """
+        Get the URLs of the admin views, with the username autocomplete.
+
+        :return: List of URLs.
+        """
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                "autocomplete/",
+                self.admin_site.admin_view(self.username_autocomplete),
+                name="account_customuser_autocomplete",
+            ),
+        ]
+        return custom_urls + urls
+
+    def username_autocomplete(self, request) -> JsonResponse:
+        """
+        Suggest the usernames starting with the ``term`` parameter, for
+        the username filters of the changelists. Read from the replica.
+        As with the admin autocomplete, staff users need the permission
+        to view the users.
+
+        :param request: The current request object.
+        :return: JSON with the first matching usernames, in order.
+        :raises PermissionDenied: If the user may not view the users.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        term = request.GET.get("term", "").strip()
+        usernames = (
+            CustomUser.objects.using(get_read_database())
+            .filter(username__startswith=term)
+            .order_by("username")
+            .values_list("username", flat=True)[:USERNAME_AUTOCOMPLETE_LIMIT]
+        )
+        return JsonResponse({"results": list(usernames)})
+
 
 admin.site.unregister(Group)
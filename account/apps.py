@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AccountConfig(AppConfig):
     name = "account"
+
+    def ready(self) -> None:
+        from account import signals  # noqa: F401
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("account", "0001_initial"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                fields=["username"],
+                name="username_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
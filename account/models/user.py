@@ -13,3 +13,15 @@ class CustomUser(AbstractUser):
         primary_key=True,
         editable=False,
     )
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Prefix searches of the username autocomplete, see
+            # account.admin. The unique index only serves them under
+            # the C collation.
+            models.Index(
+                fields=["username"],
+                name="username_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            )
+        ]
@@ -0,0 +1,113 @@
+from typing import Iterable, Optional
+
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from account.models import CustomUser
+from utils.permissions import invalidate_permission_cache
+
+M2M_CHANGES = ("post_add", "post_remove", "post_clear")
+
+
+def _invalidate_on_commit(user_ids: Optional[Iterable] = None) -> None:
+    # Invalidating before the commit would let a concurrent request
+    # cache the old permissions again.
+    if user_ids is not None:
+        user_ids = list(user_ids)
+    transaction.on_commit(lambda: invalidate_permission_cache(user_ids))
+
+
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def user_permissions_changed(
+    sender, instance, action: str, reverse: bool, pk_set, **kwargs
+) -> None:
+    """
+    Invalidate the cached permissions of users whose permissions or
+    groups changed, from either side of the relation.
+
+    :param sender: The through model.
+    :param instance: The user, or the permission or group if reverse.
+    :param action: The m2m_changed action.
+    :param reverse: Whether the relation changed from its reverse side.
+    :param pk_set: The ids of the related objects, None on clear.
+    """
+    if action not in M2M_CHANGES:
+        return
+    if not reverse:
+        _invalidate_on_commit([instance.pk])
+    else:
+        _invalidate_on_commit(pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(
+    sender, instance, action: str, reverse: bool, pk_set, **kwargs
+) -> None:
+    """
+    Invalidate the cached permissions of the members of groups whose
+    permissions changed.
+
+    :param sender: The through model.
+    :param instance: The group, or the permission if reverse.
+    :param action: The m2m_changed action.
+    :param reverse: Whether the relation changed from its reverse side.
+    :param pk_set: The ids of the related objects, None on clear.
+    """
+    if action not in M2M_CHANGES:
+        return
+    if not reverse:
+        group_ids = [instance.pk]
+    elif pk_set is None:
+        _invalidate_on_commit()
+        return
+    else:
+        group_ids = pk_set
+    _invalidate_on_commit(
+        CustomUser.objects.filter(groups__in=group_ids)
+        .values_list("pk", flat=True)
+        .distinct()
+    )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance: Group, **kwargs) -> None:
+    """
+    Invalidate the cached permissions of the members of a deleted group.
+
+    :param sender: The model class.
+    :param instance: The group.
+    """
+    _invalidate_on_commit(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Permission)
+def permission_deleted(sender, instance: Permission, **kwargs) -> None:
+    """
+    Invalidate the cached permissions of every user.
+
+    :param sender: The model class.
+    :param instance: The permission.
+    """
+    _invalidate_on_commit()
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance: CustomUser, created: bool, **kwargs) -> None:
+    """
+    Invalidate the cached permissions of a saved user, whose superuser
+    status may have changed.
+
+    :param sender: The model class.
+    :param instance: The user.
+    :param created: Whether the user was created.
+    """
+    if not created:
+        _invalidate_on_commit([instance.pk])
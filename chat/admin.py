@@ -1,33 +1,37 @@
-import json
 import logging
 import threading
+import uuid
 from typing import Any, Dict, List, Optional
 
-import redis
+from django.apps import apps
 from django.contrib import admin, messages
 from django.contrib.auth.decorators import user_passes_test
-from django.core.serializers.json import DjangoJSONEncoder
 from django.shortcuts import redirect, render
 from django.urls import path
-from django_celery_beat.models import (
-    ClockedSchedule,
-    CrontabSchedule,
-    IntervalSchedule,
-    PeriodicTask,
-    SolarSchedule,
-)
 
-from chat.forms import BannerMessageForm
-from chat.models import Chat, ExternalImage, Message
-from core.settings import BULK_CREATE_BATCH_SIZE, REDIS_HOST, REDIS_PORT
-from utils.admin_actions import delete_elements
+from chat.banners import (
+    cancel_banner,
+    claim_banner_job,
+    create_banner_job,
+    get_scheduled_banner,
+    reschedule_banner,
+    run_banner_job,
+    schedule_banner,
+)
+from chat.forms import BannerMessageForm, ScheduledBannerJobForm
+from chat.models import BannerJob, BannerSegment, Chat, ExternalImage, Message
+from chat.segments import refresh_segment
+from utils.admin_actions import delete_elements, export_as_csv, export_as_jsonl
+from utils.admin_filters import UsernameAutocompleteFilter
+from utils.counts import ApproximateCountMixin
+from utils.metrics import BANNER_SENDS, IMAGE_CACHE_REFILLS, IMAGE_CACHE_SIZE
 from utils.permissions import (
     has_modify_permissions,
     has_modify_permissions_for_module,
 )
-from utils.redis import cache_decorator
+from utils.redis import cache_decorator, pack_image_record, redis_client
+from utils.replicas import ReplicaReadMixin
 
-redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
 logger = logging.getLogger(__name__)
 
 
@@ -43,20 +47,47 @@ class MessageInline(admin.TabularInline):
 
 
 @admin.register(Chat)
-class ChatAdmin(admin.ModelAdmin):
+class ChatAdmin(ReplicaReadMixin, ApproximateCountMixin, admin.ModelAdmin):
     """
     Admin view for the Chat model.
     """
 
     change_list_template = "admin/chat_changelist.html"
-    list_display = ("id", "user", "created_at", "updated_at", "is_deleted")
+    list_display = (
+        "id",
+        "user",
+        "message_count",
+        "last_message_at",
+        "created_at",
+        "updated_at",
+        "is_deleted",
+    )
     search_fields = ("user__username", "user__email")
-    list_filter = ("user__username", "is_deleted", "created_at", "updated_at")
+    list_filter = (
+        ("user__username", UsernameAutocompleteFilter),
+        "is_deleted",
+        "created_at",
+        "updated_at",
+    )
     list_select_related = ("user",)
     raw_id_fields = ("user",)
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = (
+        "message_count",
+        "last_message_at",
+        "created_at",
+        "updated_at",
+    )
     exclude = ("deleted_at", "is_deleted")
-    actions = [delete_elements]
+    actions = [delete_elements, export_as_csv, export_as_jsonl]
+    export_fields = (
+        "id",
+        "user__username",
+        "message_count",
+        "last_message_at",
+        "created_at",
+        "updated_at",
+        "is_deleted",
+    )
     inlines = [MessageInline]
 
     def get_queryset(self, request):
@@ -104,7 +135,7 @@ class ChatAdmin(admin.ModelAdmin):
         :param request: The current request object.
         :return: Rendered form for sending banner messages.
         """
-        form = BannerMessageForm()
+        form = BannerMessageForm(initial={"dedup_key": uuid.uuid4().hex})
         context = {
             "form": form,
             "opts": self.model._meta,
@@ -123,21 +154,25 @@ class ChatAdmin(admin.ModelAdmin):
         CACHE_SIZE = 30
 
         available_images = ExternalImage.objects.filter(
-            was_sent=False
+            was_sent=False, duplicate_of__isnull=True
         ).order_by("external_id")[:CACHE_SIZE]
 
-        for image in available_images:
-            image_data = {
-                "id": str(image.id),
-                "external_id": image.external_id,
-                "url": image.url,
-                "image_path": image.image.name if image.image else None,
-            }
-            redis_client.rpush(
-                cache_key, json.dumps(image_data, cls=DjangoJSONEncoder)
+        records = [
+            pack_image_record(
+                {
+                    "id": str(image.id),
+                    "external_id": image.external_id,
+                    "url": image.url,
+                    "image_path": image.image.name if image.image else None,
+                }
             )
+            for image in available_images
+        ]
+        cache_size = redis_client.rpush(cache_key, *records) if records else 0
 
         redis_client.expire(cache_key, 3600)
+        IMAGE_CACHE_REFILLS.inc()
+        IMAGE_CACHE_SIZE.set(cache_size)
 
     @cache_decorator()
     def process_send_banner_form(
@@ -153,7 +188,9 @@ class ChatAdmin(admin.ModelAdmin):
         """
         if not image_data:
             image = (
-                ExternalImage.objects.filter(was_sent=False)
+                ExternalImage.objects.filter(
+                    was_sent=False, duplicate_of__isnull=True
+                )
                 .order_by("external_id")
                 .first()
             )
@@ -171,45 +208,56 @@ class ChatAdmin(admin.ModelAdmin):
         if request.method == "POST":
             form = BannerMessageForm(request.POST)
             if form.is_valid():
-                content = form.cleaned_data["content"]
+                send_at = form.cleaned_data.get("send_at")
+                rows_per_second = form.cleaned_data.get("rows_per_second")
                 try:
-                    chats = Chat.objects.filter(is_deleted=False)
-
-                    messages_to_create = [
-                        Message(
-                            chat=chat,
-                            content=content,
-                            image=image_data.get("image_path"),
-                        )
-                        for chat in chats
-                    ]
-
-                    Message.objects.bulk_create(
-                        messages_to_create, batch_size=BULK_CREATE_BATCH_SIZE
-                    )
-
-                    ExternalImage.objects.filter(id=image_data["id"]).update(
-                        was_sent=True
+                    job, created = create_banner_job(
+                        form.cleaned_data.get("dedup_key") or uuid.uuid4().hex,
+                        form.cleaned_data["content"],
+                        image_data,
+                        form.get_audience(),
+                        rows_per_second=rows_per_second,
                     )
+                    if not created:
+                        self.message_user(
+                            request,
+                            "This banner was already submitted.",
+                            level=messages.WARNING,
+                        )
+                        return redirect("..")
+                    if send_at or rows_per_second:
+                        schedule_banner(job, send_at=send_at)
+                    elif claim_banner_job(job):
+                        run_banner_job(job)
 
                     cached_images_count = redis_client.llen(cache_key)
                     if cached_images_count < 5:
                         threading.Thread(
                             target=self._update_redis_cache, args=(cache_key,)
                         ).start()
+                    BANNER_SENDS.labels("success").inc()
                     self.message_user(
                         request,
-                        "Banners sent successfully.",
+                        "Banners scheduled successfully."
+                        if send_at or rows_per_second
+                        else "Banners sent successfully.",
                         level=messages.SUCCESS,
                     )
 
                 except Exception as e:
+                    BANNER_SENDS.labels("error").inc()
                     logger.error(
                         f"Error performing send banner action. Error: {str(e)}"
                     )
                     self.message_user(
                         request, "Error sending banners", level=messages.ERROR
                     )
+            else:
+                self.message_user(
+                    request,
+                    f"Invalid banner: {form.errors.as_text()}",
+                    level=messages.ERROR,
+                )
 
         return redirect("..")
 
@@ -231,7 +279,7 @@ class ChatAdmin(admin.ModelAdmin):
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(ReplicaReadMixin, ApproximateCountMixin, admin.ModelAdmin):
     """
     Admin view for the Message model.
     """
@@ -247,7 +295,7 @@ class MessageAdmin(admin.ModelAdmin):
     list_select_related = ("chat", "chat__user")
     search_fields = ("chat__user__username", "chat__user__email", "content")
     list_filter = (
-        "chat__user__username",
+        ("chat__user__username", UsernameAutocompleteFilter),
         "is_deleted",
         "created_at",
         "updated_at",
@@ -255,7 +303,17 @@ class MessageAdmin(admin.ModelAdmin):
     raw_id_fields = ("chat",)
     readonly_fields = ("created_at", "updated_at")
     exclude = ("deleted_at", "is_deleted")
-    actions = [delete_elements]
+    actions = [delete_elements, export_as_csv, export_as_jsonl]
+    export_fields = (
+        "id",
+        "chat_id",
+        "chat__user__username",
+        "content",
+        "image",
+        "created_at",
+        "updated_at",
+        "is_deleted",
+    )
 
     def get_queryset(self, request):
         """
@@ -280,10 +338,159 @@ class MessageAdmin(admin.ModelAdmin):
     display_user.short_description = "User"
 
 
-# Unregister tasks views
-admin.site.unregister(PeriodicTask)
-admin.site.unregister(IntervalSchedule)
-admin.site.unregister(CrontabSchedule)
-admin.site.unregister(SolarSchedule)
-admin.site.unregister(ClockedSchedule)
+@admin.register(BannerSegment)
+class BannerSegmentAdmin(admin.ModelAdmin):
+    """
+    Admin view for the BannerSegment model.
+    """
+
+    list_display = ("name", "created_from", "created_to", "refreshed_at")
+    search_fields = ("name",)
+    raw_id_fields = ("users",)
+    readonly_fields = ("created_at", "updated_at", "refreshed_at")
+    exclude = ("deleted_at", "is_deleted")
+    actions = ["refresh_segments", delete_elements]
+
+    @admin.action(description="Refresh selected segments")
+    def refresh_segments(self, request, queryset) -> None:
+        """
+        Rebuild the precomputed memberships of the selected segments.
+
+        :param request: The current request object.
+        :param queryset: The selected segments.
+        """
+        for segment in queryset:
+            refresh_segment(segment, full=True)
+        self.message_user(
+            request, "Segments refreshed.", level=messages.SUCCESS
+        )
+
+
+@admin.register(BannerJob)
+class BannerJobAdmin(admin.ModelAdmin):
+    """
+    Admin view for the BannerJob model.
+    """
+
+    list_display = (
+        "id",
+        "status",
+        "messages_created",
+        "created_at",
+        "updated_at",
+        "completed_at",
+    )
+    list_filter = ("status", "created_at")
+    search_fields = ("dedup_key", "content")
+    readonly_fields = [
+        field.name
+        for field in BannerJob._meta.fields
+        if field.name not in ("deleted_at", "is_deleted")
+    ]
+    exclude = ("deleted_at", "is_deleted")
+    actions = ["resume_jobs", "cancel_jobs"]
+
+    def has_add_permission(self, request) -> bool:
+        """
+        Banner jobs are only created by the send banner form.
+
+        :param request: The current request object.
+        :return: False
+        """
+        return False
+
+    def get_readonly_fields(self, request, obj=None) -> List[str]:
+        """
+        Get the read-only fields. The content of a scheduled job stays
+        editable until it is sent.
+
+        :param request: The current request object.
+        :param obj: The job being changed, if any.
+        :return: List of read-only field names.
+        """
+        if obj and get_scheduled_banner(obj):
+            return [name for name in self.readonly_fields if name != "content"]
+        return self.readonly_fields
+
+    def get_form(self, request, obj=None, change=False, **kwargs):
+        """
+        Get the change form, with the send date of scheduled jobs.
+
+        :param request: The current request object.
+        :param obj: The job being changed, if any.
+        :param change: Whether an existing job is changed.
+        :param kwargs: Other arguments of the form factory.
+        :return: The form class.
+        """
+        if obj and get_scheduled_banner(obj):
+            kwargs["form"] = ScheduledBannerJobForm
+        return super().get_form(request, obj, change, **kwargs)
+
+    def save_model(self, request, obj, form, change) -> None:
+        """
+        Apply the new content and send date of a scheduled job to the
+        job and its clocked task, unless a worker claimed it meanwhile.
+
+        :param request: The current request object.
+        :param obj: The job being changed.
+        :param form: The validated change form.
+        :param change: Whether an existing job is changed.
+        """
+        if not isinstance(form, ScheduledBannerJobForm):
+            super().save_model(request, obj, form, change)
+            return
+        if not reschedule_banner(
+            obj, form.cleaned_data["content"], form.cleaned_data["send_at"]
+        ):
+            self.message_user(
+                request,
+                "The job already started or was cancelled, "
+                "it was not changed.",
+                level=messages.WARNING,
+            )
+
+    @admin.action(description="Resume selected failed jobs")
+    def resume_jobs(self, request, queryset) -> None:
+        """
+        Queue the selected failed jobs, which resume after their last
+        committed chunk.
+
+        :param request: The current request object.
+        :param queryset: The selected jobs.
+        """
+        jobs = queryset.filter(status=BannerJob.STATUS_FAILED)
+        for job in jobs:
+            schedule_banner(job)
+        self.message_user(
+            request, f"{len(jobs)} jobs resumed.", level=messages.SUCCESS
+        )
+
+    @admin.action(description="Cancel selected scheduled jobs")
+    def cancel_jobs(self, request, queryset) -> None:
+        """
+        Cancel the selected pending jobs and disable their clocked task.
+        Jobs already claimed by a worker are left running.
+
+        :param request: The current request object.
+        :param queryset: The selected jobs.
+        """
+        cancelled = sum(
+            cancel_banner(job)
+            for job in queryset.filter(status=BannerJob.STATUS_PENDING)
+        )
+        self.message_user(
+            request, f"{cancelled} jobs cancelled.", level=messages.SUCCESS
+        )
+
+
+# Unregister the django_celery_beat views. Its models are loaded with
+# the installed apps, so looking them up in the registry is enough.
+for model_name in (
+    "PeriodicTask",
+    "IntervalSchedule",
+    "CrontabSchedule",
+    "SolarSchedule",
+    "ClockedSchedule",
+):
+    admin.site.unregister(apps.get_model("django_celery_beat", model_name))
 admin.site.disable_action("delete_selected")
@@ -0,0 +1,374 @@
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_celery_beat.models import (
+    ClockedSchedule,
+    PeriodicTask,
+    PeriodicTasks,
+)
+
+from chat.models import (
+    BannerJob,
+    BannerSegment,
+    Chat,
+    ExternalImage,
+    Message,
+    SegmentMembership,
+)
+from chat.renditions import BANNER_RENDITION, get_rendition_path
+from chat.segments import refresh_segment
+from core.settings import BULK_CREATE_BATCH_SIZE
+from utils.counts import invalidate_counts
+from utils.metrics import BANNER_MESSAGES_CREATED, BANNER_SEND_DURATION
+from utils.redis import publish_event
+
+AUDIENCE_ALL = "all"
+AUDIENCE_USER = "user"
+AUDIENCE_CREATED = "created"
+AUDIENCE_SEGMENT = "segment"
+AUDIENCE_CHOICES = [
+    (AUDIENCE_ALL, "All chats"),
+    (AUDIENCE_USER, "Chats of a user"),
+    (AUDIENCE_CREATED, "Chats created in a time window"),
+    (AUDIENCE_SEGMENT, "Saved segment"),
+]
+
+
+def get_audience_chat_ids(
+    audience: Dict[str, Any], after: Optional[uuid.UUID] = None
+) -> QuerySet:
+    """
+    Get the ids of the chats targeted by a banner audience, ordered by
+    id so a send can resume after the last chat it reached.
+
+    Segment audiences are read from their precomputed memberships,
+    which are refreshed incrementally first.
+
+    :param audience: Dictionary describing the audience, as built by
+        BannerMessageForm.get_audience.
+    :param after: Only return the chats with a greater id, if given.
+    :return: QuerySet of chat ids.
+    """
+    audience_type = audience.get("type", AUDIENCE_ALL)
+    if audience_type == AUDIENCE_SEGMENT:
+        segment = BannerSegment.objects.get(id=audience["segment_id"])
+        refresh_segment(segment)
+        memberships = SegmentMembership.objects.filter(segment_id=segment.id)
+        if after:
+            memberships = memberships.filter(chat_id__gt=after)
+        return memberships.order_by("chat_id").values_list(
+            "chat_id", flat=True
+        )
+
+    chats = Chat.objects.filter(is_deleted=False)
+    if audience_type == AUDIENCE_USER:
+        chats = chats.filter(user_id=audience["user_id"])
+    elif audience_type == AUDIENCE_CREATED:
+        if audience.get("created_from"):
+            chats = chats.filter(
+                created_at__gte=parse_datetime(audience["created_from"])
+            )
+        if audience.get("created_to"):
+            chats = chats.filter(
+                created_at__lte=parse_datetime(audience["created_to"])
+            )
+    if after:
+        chats = chats.filter(id__gt=after)
+    return chats.order_by("id").values_list("id", flat=True)
+
+
+def iter_chunks(chat_ids: Iterable, size: int) -> Iterator[List]:
+    """
+    Split the targeted chat ids in lists of at most ``size`` ids,
+    streaming them from the database when given a QuerySet.
+
+    :param chat_ids: Ids of the targeted chats.
+    :param size: Maximum number of ids per chunk.
+    :return: Iterator over the chunks.
+    """
+    if isinstance(chat_ids, QuerySet):
+        chat_ids = chat_ids.iterator(chunk_size=size)
+    chunk = []
+    for chat_id in chat_ids:
+        chunk.append(chat_id)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def create_banner_job(
+    dedup_key: str,
+    content: str,
+    image_data: Dict[str, Any],
+    audience: Dict[str, Any],
+    rows_per_second: Optional[int] = None,
+) -> Tuple[BannerJob, bool]:
+    """
+    Record a banner send, once per dedup key, and mark its image as
+    sent. Submitting the same key again returns the existing job and
+    leaves the images untouched. Banners use the banner rendition of the
+    image when it exists.
+
+    :param dedup_key: Key identifying the submission.
+    :param content: Content of the banner message.
+    :param image_data: Dictionary with the id and path of the image.
+    :param audience: Dictionary describing the audience.
+    :param rows_per_second: Maximum insert rate. None to disable.
+    :return: The job and whether it was created.
+    """
+    with transaction.atomic():
+        job, created = BannerJob.objects.get_or_create(
+            dedup_key=dedup_key,
+            defaults={
+                "content": content,
+                "image_id": image_data["id"],
+                "image_path": get_rendition_path(
+                    image_data["id"], BANNER_RENDITION
+                )
+                or image_data.get("image_path"),
+                "audience": audience,
+                "rows_per_second": rows_per_second,
+            },
+        )
+        if created:
+            ExternalImage.objects.filter(id=image_data["id"]).update(
+                was_sent=True
+            )
+    return job, created
+
+
+def claim_banner_job(job: BannerJob) -> bool:
+    """
+    Mark a pending or failed job as running, unless another worker
+    claimed it first.
+
+    :param job: The job to claim.
+    :return: True if the job was claimed.
+    """
+    claimed = BannerJob.objects.filter(
+        id=job.id,
+        status__in=[BannerJob.STATUS_PENDING, BannerJob.STATUS_FAILED],
+    ).update(
+        status=BannerJob.STATUS_RUNNING, error="", updated_at=timezone.now()
+    )
+    if claimed:
+        job.status = BannerJob.STATUS_RUNNING
+    return bool(claimed)
+
+
+def get_job_channel(job_id: Union[str, uuid.UUID]) -> str:
+    """
+    Get the Redis channel the progress of a banner job is published on.
+
+    :param job_id: The id of the job.
+    :return: Name of the channel.
+    """
+    return f"banner_job:{job_id}"
+
+
+def get_job_progress(job: BannerJob) -> Dict[str, Any]:
+    """
+    Describe the progress of a banner job with JSON serializable values.
+
+    :param job: The job.
+    :return: Dictionary with the id, status, number of messages created
+        and error of the job.
+    """
+    return {
+        "id": str(job.id),
+        "status": job.status,
+        "messages_created": job.messages_created,
+        "error": job.error,
+    }
+
+
+def run_banner_job(job: BannerJob) -> int:
+    """
+    Insert the banner message of a job in every targeted chat, in
+    batches, without loading the chats themselves.
+
+    Every chunk is committed together with the message counters of its
+    chats and the id of its last chat, so a job that crashed resumes
+    after the last committed chunk. The unique (banner_job, chat)
+    constraint guards against duplicates. Progress is published on the
+    channel of the job after every chunk.
+
+    Throttled jobs sleep between chunks so that no more than
+    ``rows_per_second`` messages are inserted per second, spreading the
+    write load.
+
+    :param job: The job to run. It must have been claimed.
+    :return: Number of messages created by this run.
+    """
+    rows_per_second = job.rows_per_second
+    chunk_size = BULK_CREATE_BATCH_SIZE
+    if rows_per_second:
+        chunk_size = min(chunk_size, rows_per_second)
+
+    start = time.perf_counter()
+    created = 0
+    try:
+        chat_ids = get_audience_chat_ids(job.audience, after=job.last_chat_id)
+        for chunk in iter_chunks(chat_ids, chunk_size):
+            with transaction.atomic():
+                Message.objects.bulk_create(
+                    [
+                        Message(
+                            chat_id=chat_id,
+                            content=job.content,
+                            image=job.image_path,
+                            banner_job=job,
+                        )
+                        for chat_id in chunk
+                    ],
+                    ignore_conflicts=True,
+                )
+                Chat.objects.filter(id__in=chunk).update(
+                    message_count=F("message_count") + 1,
+                    last_message_at=timezone.now(),
+                )
+                BannerJob.objects.filter(id=job.id).update(
+                    last_chat_id=chunk[-1],
+                    messages_created=F("messages_created") + len(chunk),
+                    updated_at=timezone.now(),
+                )
+            job.last_chat_id = chunk[-1]
+            job.messages_created += len(chunk)
+            created += len(chunk)
+            publish_event(get_job_channel(job.id), get_job_progress(job))
+            if rows_per_second:
+                delay = start + created / rows_per_second - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    except Exception as e:
+        BannerJob.objects.filter(id=job.id).update(
+            status=BannerJob.STATUS_FAILED,
+            error=str(e),
+            updated_at=timezone.now(),
+        )
+        job.status, job.error = BannerJob.STATUS_FAILED, str(e)
+        publish_event(get_job_channel(job.id), get_job_progress(job))
+        raise
+    finally:
+        if created:
+            invalidate_counts(Message)
+
+    now = timezone.now()
+    BannerJob.objects.filter(id=job.id).update(
+        status=BannerJob.STATUS_COMPLETED, completed_at=now, updated_at=now
+    )
+    job.status = BannerJob.STATUS_COMPLETED
+    publish_event(get_job_channel(job.id), get_job_progress(job))
+    BANNER_SEND_DURATION.observe(time.perf_counter() - start)
+    BANNER_MESSAGES_CREATED.inc(created)
+    return created
+
+
+def get_banner_task_name(job_id: Union[str, uuid.UUID]) -> str:
+    """
+    Get the name of the clocked task sending a scheduled banner job.
+
+    :param job_id: The id of the job.
+    :return: Name of the periodic task.
+    """
+    return f"Send banner {job_id}"
+
+
+def schedule_banner(
+    job: BannerJob, send_at: Optional[datetime] = None
+) -> Optional[PeriodicTask]:
+    """
+    Run a banner job from a Celery worker, at ``send_at`` through a
+    one-off django_celery_beat clocked task, or right away.
+
+    :param job: The job to run.
+    :param send_at: When to send the banner. None to send it now.
+    :return: The periodic task of a scheduled banner, None otherwise.
+    """
+    from chat.tasks import deliver_banner
+
+    if send_at is None:
+        deliver_banner.delay(str(job.id))
+        return None
+
+    clocked = ClockedSchedule.objects.create(clocked_time=send_at)
+    return PeriodicTask.objects.create(
+        name=get_banner_task_name(job.id),
+        task=deliver_banner.name,
+        clocked=clocked,
+        one_off=True,
+        kwargs=json.dumps({"job_id": str(job.id)}),
+    )
+
+
+def get_scheduled_banner(job: BannerJob) -> Optional[PeriodicTask]:
+    """
+    Get the clocked task of a pending banner job that was scheduled and
+    not sent yet.
+
+    :param job: The job.
+    :return: The enabled periodic task of the job, None if there is
+        none or the job is not pending.
+    """
+    if job.status != BannerJob.STATUS_PENDING:
+        return None
+    return (
+        PeriodicTask.objects.select_related("clocked")
+        .filter(name=get_banner_task_name(job.id), enabled=True)
+        .first()
+    )
+
+
+def reschedule_banner(job: BannerJob, content: str, send_at: datetime) -> bool:
+    """
+    Change the content and the send date of a scheduled banner job,
+    as long as it is pending. The conditional update loses against a
+    worker that claimed the job first.
+
+    :param job: The job to change.
+    :param content: New content of the banner message.
+    :param send_at: New date to send the banner at.
+    :return: True if the job was changed.
+    """
+    with transaction.atomic():
+        task = get_scheduled_banner(job)
+        if not task or not BannerJob.objects.filter(
+            id=job.id, status=BannerJob.STATUS_PENDING
+        ).update(content=content, updated_at=timezone.now()):
+            return False
+        # Saving the schedule notifies the beat scheduler of the change.
+        task.clocked.clocked_time = send_at
+        task.clocked.save(update_fields=["clocked_time"])
+    job.content = content
+    return True
+
+
+def cancel_banner(job: BannerJob) -> bool:
+    """
+    Cancel a pending banner job and disable its clocked task. A job
+    already claimed by a worker is not cancelled.
+
+    :param job: The job to cancel.
+    :return: True if the job was cancelled.
+    """
+    with transaction.atomic():
+        if not BannerJob.objects.filter(
+            id=job.id, status=BannerJob.STATUS_PENDING
+        ).update(status=BannerJob.STATUS_CANCELLED, updated_at=timezone.now()):
+            return False
+        PeriodicTask.objects.filter(name=get_banner_task_name(job.id)).update(
+            enabled=False
+        )
+        # Queryset updates skip the signals notifying the beat scheduler.
+        PeriodicTasks.update_changed()
+    job.status = BannerJob.STATUS_CANCELLED
+    return True
@@ -0,0 +1,259 @@
+import resource
+import time
+import tracemalloc
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from account.models import CustomUser
+from chat.models import Chat, ExternalImage, Message
+from chat.providers.sling_academy import SlingAcademyProvider
+from utils.profiling import OperationTracker
+from utils.redis import cache_decorator, pack_image_record
+
+BENCHMARK_CACHE_KEY = "benchmark:available_banner_images"
+
+
+@dataclass
+class Scenario:
+    """
+    A benchmarked operation.
+
+    ``setup`` receives the dataset size and a Redis client and returns
+    the state passed to ``run``. Only ``run`` is measured.
+    """
+
+    name: str
+    setup: Callable[[int, Any], Dict[str, Any]]
+    run: Callable[[Dict[str, Any]], Any]
+
+
+def reset_data(redis_client) -> None:
+    """
+    Remove every row and cache key touched by the scenarios.
+
+    :param redis_client: Redis client used by the scenarios.
+    """
+    Message.objects.all().delete()
+    Chat.objects.all().delete()
+    ExternalImage.objects.all().delete()
+    CustomUser.objects.all().delete()
+    redis_client.delete(BENCHMARK_CACHE_KEY)
+
+
+def _create_superuser() -> CustomUser:
+    return CustomUser.objects.create_superuser(
+        f"bench_{uuid.uuid4().hex[:8]}", "bench@example.com", "password"
+    )
+
+
+def _create_chats(size: int, num_users: int = 10) -> List[Chat]:
+    users = CustomUser.objects.bulk_create(
+        [
+            CustomUser(username=f"bench_user_{i}_{uuid.uuid4().hex[:8]}")
+            for i in range(num_users)
+        ]
+    )
+    return Chat.objects.bulk_create(
+        [Chat(user=users[i % num_users]) for i in range(size)],
+        batch_size=500,
+    )
+
+
+def _create_images(size: int) -> List[ExternalImage]:
+    # bulk_create skips ExternalImage.save(), so nothing is downloaded.
+    return ExternalImage.objects.bulk_create(
+        [
+            ExternalImage(
+                external_id=i,
+                url=f"https://example.com/{i}.jpeg",
+                image=f"images/{i}.jpeg",
+            )
+            for i in range(1, size + 1)
+        ],
+        batch_size=500,
+    )
+
+
+def _image_record(image: ExternalImage) -> bytes:
+    return pack_image_record(
+        {
+            "id": str(image.id),
+            "external_id": image.external_id,
+            "url": image.url,
+            "image_path": image.image.name,
+        }
+    )
+
+
+def setup_banner_send(size: int, redis_client) -> Dict[str, Any]:
+    _create_chats(size)
+    _create_images(10)
+    request = RequestFactory().post("/", {"content": "Benchmark banner"})
+    request.user = _create_superuser()
+    request._messages = CookieStorage(request)
+    return {"request": request, "model_admin": admin.site._registry[Chat]}
+
+
+def run_banner_send(state: Dict[str, Any]) -> None:
+    # The cache refill runs in a background thread and is measured on its
+    # own by the cache_refill scenario.
+    with patch("chat.admin.threading.Thread"):
+        state["model_admin"].process_send_banner_form(
+            state["request"], cache_key=BENCHMARK_CACHE_KEY
+        )
+
+
+def setup_provider_ingestion(size: int, redis_client) -> Dict[str, Any]:
+    return {
+        "payload": {
+            "photos": [
+                {"id": i, "url": f"https://example.com/{i}.jpeg"}
+                for i in range(1, size + 1)
+            ]
+        }
+    }
+
+
+def run_provider_ingestion(state: Dict[str, Any]) -> None:
+    provider = SlingAcademyProvider()
+    with patch(
+        "chat.providers.sling_academy.make_get_request",
+        return_value=state["payload"],
+    ), patch("chat.models.image.download_blob", return_value=nullcontext()):
+        data = provider.fetch_data()
+        provider.save_data(provider.process_data(data))
+
+
+def setup_cache_decorator(size: int, redis_client) -> Dict[str, Any]:
+    images = _create_images(size)
+    redis_client.rpush(
+        BENCHMARK_CACHE_KEY, *[_image_record(image) for image in images]
+    )
+
+    @cache_decorator()
+    def consume(self, request, image_data, cache_key):
+        return image_data
+
+    return {"consume": consume}
+
+
+def run_cache_decorator(state: Dict[str, Any]) -> None:
+    state["consume"](None, None, cache_key=BENCHMARK_CACHE_KEY)
+
+
+def setup_cache_refill(size: int, redis_client) -> Dict[str, Any]:
+    _create_images(size)
+    return {"model_admin": admin.site._registry[Chat]}
+
+
+def run_cache_refill(state: Dict[str, Any]) -> None:
+    state["model_admin"]._update_redis_cache(BENCHMARK_CACHE_KEY)
+
+
+def _setup_changelist(size: int, url_name: str) -> Dict[str, Any]:
+    chats = _create_chats(size)
+    Message.objects.bulk_create(
+        [Message(chat=chat, content="Benchmark message") for chat in chats],
+        batch_size=500,
+    )
+    client = Client()
+    client.force_login(_create_superuser())
+    return {"client": client, "url": reverse(url_name)}
+
+
+def setup_chat_changelist(size: int, redis_client) -> Dict[str, Any]:
+    return _setup_changelist(size, "admin:chat_chat_changelist")
+
+
+def setup_message_changelist(size: int, redis_client) -> Dict[str, Any]:
+    return _setup_changelist(size, "admin:chat_message_changelist")
+
+
+def run_changelist(state: Dict[str, Any]) -> None:
+    response = state["client"].get(state["url"])
+    assert response.status_code == 200
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("banner_send", setup_banner_send, run_banner_send),
+        Scenario(
+            "provider_ingestion",
+            setup_provider_ingestion,
+            run_provider_ingestion,
+        ),
+        Scenario(
+            "cache_decorator", setup_cache_decorator, run_cache_decorator
+        ),
+        Scenario("cache_refill", setup_cache_refill, run_cache_refill),
+        Scenario("chat_changelist", setup_chat_changelist, run_changelist),
+        Scenario(
+            "message_changelist", setup_message_changelist, run_changelist
+        ),
+    )
+}
+
+
+def run_scenario(
+    scenario: Scenario, size: int, redis_client, repeat: int = 3
+) -> Dict[str, Any]:
+    """
+    Run a scenario ``repeat`` times on a fresh dataset and report the
+    median wall time, the operation counts of the last run and the
+    memory used.
+
+    Allocations are traced in an extra run so tracemalloc does not
+    inflate the wall time. ``peak_alloc_kb`` is the peak of the
+    scenario, while ``process_peak_rss_kb`` is the peak resident size
+    of the whole process so far, so it includes the previous scenarios.
+
+    :param scenario: The scenario to run.
+    :param size: Dataset size passed to the scenario setup.
+    :param redis_client: Redis client used by the scenario.
+    :param repeat: Number of timed runs.
+    :return: Dictionary with the measured values.
+    """
+    wall_times = []
+    for _ in range(repeat):
+        reset_data(redis_client)
+        state = scenario.setup(size, redis_client)
+        with OperationTracker() as tracker:
+            start = time.perf_counter()
+            scenario.run(state)
+            wall_times.append(time.perf_counter() - start)
+
+    reset_data(redis_client)
+    state = scenario.setup(size, redis_client)
+    tracemalloc.start()
+    try:
+        scenario.run(state)
+        _, peak_alloc = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    reset_data(redis_client)
+
+    wall_times.sort()
+    return {
+        "scenario": scenario.name,
+        "size": size,
+        "repeat": repeat,
+        "wall_time_s": wall_times[len(wall_times) // 2],
+        "wall_time_min_s": wall_times[0],
+        "db_queries": tracker.stats.sql_count,
+        "db_time_s": tracker.stats.sql_time,
+        "redis_round_trips": tracker.stats.redis_count,
+        "redis_time_s": tracker.stats.redis_time,
+        "peak_alloc_kb": peak_alloc // 1024,
+        "process_peak_rss_kb": resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss,
+    }
@@ -0,0 +1,106 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Iterable, Tuple
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import CharField, Exists, F, OuterRef, Value
+from django.db.models.functions import Concat, Greatest, Substr
+from django.utils import timezone
+
+from chat.models import BannerJob, ImageBlob, ImageRendition
+from utils.storage import BLOB_DIRECTORY, list_blob_files
+
+logger = logging.getLogger(__name__)
+
+
+def release_blobs(blob_ids: Iterable) -> None:
+    """
+    Remove one reference per given id from the blobs, making the blobs
+    left without references collectable by collect_blobs.
+
+    :param blob_ids: Ids of the blobs, repeated once per reference.
+    """
+    for blob_id, count in Counter(blob_ids).items():
+        ImageBlob.objects.filter(id=blob_id).update(
+            ref_count=Greatest(F("ref_count") - count, 0),
+            updated_at=timezone.now(),
+        )
+
+
+def get_blob_prefix(sha256: Any) -> Concat:
+    """
+    Build the common prefix of the storage names of a blob and of its
+    renditions, see utils.storage.get_blob_name, in SQL.
+
+    :param sha256: Expression of the hex digest of the blob.
+    :return: The prefix expression.
+    """
+    return Concat(
+        Value(f"{BLOB_DIRECTORY}/"),
+        Substr(sha256, 1, 2),
+        Value("/"),
+        Substr(sha256, 3, 2),
+        Value("/"),
+        sha256,
+        output_field=CharField(),
+    )
+
+
+def collect_blobs(
+    grace_seconds: int, dry_run: bool = False
+) -> Tuple[int, int]:
+    """
+    Delete the blobs without references, and their files with the
+    renditions of their content. Blobs released within
+    ``grace_seconds`` are kept, as an image may be about to reference
+    them again, and so are the blobs whose file or renditions banner
+    jobs still send.
+
+    :param grace_seconds: Minimum age of the last release, in seconds.
+    :param dry_run: Only count the collectable blobs.
+    :return: The number of blobs deleted and of bytes freed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    collectable = (
+        ImageBlob.objects.filter(
+            ref_count=0, updated_at__lt=cutoff, images__isnull=True
+        )
+        .exclude(
+            Exists(
+                BannerJob.objects.filter(
+                    image_path__startswith=get_blob_prefix(OuterRef("sha256"))
+                )
+            )
+        )
+        .order_by("id")
+    )
+
+    deleted = freed = 0
+    for blob in collectable.only("id", "sha256", "name", "size").iterator():
+        if not dry_run:
+            with transaction.atomic():
+                # Skipped if the blob was referenced again meanwhile.
+                # The lock makes references added concurrently wait,
+                # then ImageBlob.acquire creates the blob again.
+                locked = collectable.select_for_update(of=("self",))
+                if not locked.filter(id=blob.id):
+                    continue
+                collectable.filter(id=blob.id).delete()
+                # Deleted under the lock, so an image acquiring the
+                # blob again meanwhile waits, then writes the file again.
+                # Renditions of uploaded images with the same content
+                # have no blob and keep their files.
+                names = {blob.name, *list_blob_files(blob.sha256)}
+                names -= set(
+                    ImageRendition.objects.filter(file__in=names).values_list(
+                        "file", flat=True
+                    )
+                )
+                for name in names:
+                    default_storage.delete(name)
+            logger.info(f"Deleted blob {blob.name}")
+        deleted += 1
+        freed += blob.size
+    return deleted, freed
@@ -0,0 +1,68 @@
+from typing import Iterable, List, Optional, Tuple
+
+from django.db.models import Count, Max
+
+from chat.models import Chat, Message
+
+
+def _refresh_counters(chats: List[Chat]) -> int:
+    totals = {
+        row["chat_id"]: row
+        for row in Message.objects.filter(chat_id__in=[c.id for c in chats])
+        .values("chat_id")
+        .annotate(count=Count("id"), last=Max("created_at"))
+        .order_by()
+    }
+    changed = []
+    for chat in chats:
+        row = totals.get(chat.id, {"count": 0, "last": None})
+        if (chat.message_count, chat.last_message_at) != (
+            row["count"],
+            row["last"],
+        ):
+            chat.message_count = row["count"]
+            chat.last_message_at = row["last"]
+            changed.append(chat)
+    Chat.objects.bulk_update(changed, ["message_count", "last_message_at"])
+    return len(changed)
+
+
+def refresh_chat_counters(chat_ids: Iterable) -> int:
+    """
+    Recompute the message_count and last_message_at of the given chats,
+    after messages were inserted without Message.save().
+
+    :param chat_ids: Ids of the chats.
+    :return: The number of chats whose counters changed.
+    """
+    return _refresh_counters(
+        list(
+            Chat.objects.filter(id__in=list(chat_ids)).only(
+                "id", "message_count", "last_message_at"
+            )
+        )
+    )
+
+
+def reconcile_chat_counters(
+    batch_size: int, after: Optional[str] = None
+) -> Tuple[int, int, Optional[str]]:
+    """
+    Recompute the message_count and last_message_at of one batch of
+    chats from chat_message, fixing the drift left by bulk deletes or
+    failed updates.
+
+    :param batch_size: Number of chats checked.
+    :param after: Only check the chats with a greater id, if given.
+    :return: The number of chats checked and fixed, and the id of the
+        last chat checked, None once every chat was checked.
+    """
+    chats = Chat.objects.order_by("id")
+    if after:
+        chats = chats.filter(id__gt=after)
+    chats = list(
+        chats.only("id", "message_count", "last_message_at")[:batch_size]
+    )
+    if not chats:
+        return 0, 0, None
+    return len(chats), _refresh_counters(chats), chats[-1].id
@@ -0,0 +1,102 @@
+import logging
+from typing import Iterable, List, Optional
+
+from django.db.models import Q
+
+from chat.models import ExternalImage
+from core.settings import IMAGE_DUPLICATE_MAX_DISTANCE
+from utils.image import dhash, hamming_distance
+
+logger = logging.getLogger(__name__)
+
+HASH_BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def get_hash_bands(value: int) -> List[int]:
+    """
+    Split a 64-bit perceptual hash in 16-bit bands, from the most
+    significant one. Two hashes at a Hamming distance lower than the
+    number of bands have at least one equal band, so near-duplicates are
+    found with an exact match on any indexed band.
+
+    :param value: The hash.
+    :return: The bands.
+    """
+    return [
+        (value >> (BAND_BITS * (HASH_BANDS - 1 - band))) & BAND_MASK
+        for band in range(HASH_BANDS)
+    ]
+
+
+def find_duplicate(
+    image: ExternalImage,
+    value: int,
+    max_distance: int = IMAGE_DUPLICATE_MAX_DISTANCE,
+) -> Optional[ExternalImage]:
+    """
+    Find the original image an image is a near-duplicate of.
+
+    :param image: The image.
+    :param value: The perceptual hash of the image.
+    :param max_distance: Maximum Hamming distance of the hashes.
+    :return: The first hashed original within ``max_distance``, None if
+        there is none.
+    """
+    matches_band = Q()
+    for band, band_value in enumerate(get_hash_bands(value)):
+        matches_band |= Q(**{f"dhash_band_{band}": band_value})
+    candidates = (
+        ExternalImage.objects.filter(matches_band, duplicate_of__isnull=True)
+        .exclude(id=image.id)
+        .order_by("external_id")
+        .only("id", "external_id", "dhash")
+    )
+    for candidate in candidates:
+        if hamming_distance(value, int(candidate.dhash, 16)) <= max_distance:
+            return candidate
+    return None
+
+
+def flag_duplicates(images: Iterable[ExternalImage]) -> List[ExternalImage]:
+    """
+    Hash the downloaded images not hashed yet and flag those that are
+    near-duplicates of another image, so they are never sent in banners.
+
+    :param images: The images. Those without a file are skipped.
+    :return: The images that are not duplicates.
+    """
+    from PIL import Image
+
+    originals = []
+    for image in images:
+        if not image.image:
+            continue
+        if image.dhash is None:
+            try:
+                with image.image.open("rb") as file:
+                    value = dhash(file.read())
+            except (OSError, Image.DecompressionBombError) as e:
+                logger.error(f"Failed to hash image {image.image.name}: {e}")
+                continue
+            image.dhash = f"{value:016x}"
+            for band, band_value in enumerate(get_hash_bands(value)):
+                setattr(image, f"dhash_band_{band}", band_value)
+            image.duplicate_of = find_duplicate(image, value)
+            image.save(
+                update_fields=[
+                    "dhash",
+                    *(f"dhash_band_{band}" for band in range(HASH_BANDS)),
+                    "duplicate_of",
+                    "updated_at",
+                ]
+            )
+            if image.duplicate_of_id:
+                logger.info(
+                    f"Image {image.external_id} is a duplicate of "
+                    f"{image.duplicate_of_id}"
+                )
+        if not image.duplicate_of_id:
+            originals.append(image)
+    return originals
@@ -1,4 +1,19 @@
+from datetime import datetime
+from typing import Any, Dict
+
 from django import forms
+from django.utils import timezone
+
+from account.models import CustomUser
+from chat.banners import (
+    AUDIENCE_ALL,
+    AUDIENCE_CHOICES,
+    AUDIENCE_CREATED,
+    AUDIENCE_SEGMENT,
+    AUDIENCE_USER,
+    get_scheduled_banner,
+)
+from chat.models import BannerJob, BannerSegment
 
 
 class BannerMessageForm(forms.Form):
@@ -7,3 +22,120 @@ class BannerMessageForm(forms.Form):
     content = forms.CharField(
         widget=forms.Textarea, label="Message Content", required=True
     )
+    audience = forms.ChoiceField(
+        choices=AUDIENCE_CHOICES, initial=AUDIENCE_ALL, required=False
+    )
+    username = forms.CharField(
+        label="Username",
+        required=False,
+        help_text="Only used when targeting the chats of a user.",
+    )
+    created_from = forms.DateTimeField(
+        label="Chats created from",
+        required=False,
+        widget=forms.DateTimeInput(attrs={"type": "datetime-local"}),
+    )
+    created_to = forms.DateTimeField(
+        label="Chats created until",
+        required=False,
+        widget=forms.DateTimeInput(attrs={"type": "datetime-local"}),
+    )
+    segment = forms.ModelChoiceField(
+        queryset=BannerSegment.objects.filter(is_deleted=False),
+        required=False,
+    )
+    send_at = forms.DateTimeField(
+        label="Send at",
+        required=False,
+        widget=forms.DateTimeInput(attrs={"type": "datetime-local"}),
+        help_text="Leave empty to send the banner now.",
+    )
+    rows_per_second = forms.IntegerField(
+        label="Messages per second",
+        required=False,
+        min_value=1,
+        help_text="Throttle the delivery. Leave empty to send at full speed.",
+    )
+    dedup_key = forms.CharField(
+        max_length=64, required=False, widget=forms.HiddenInput
+    )
+
+    def clean(self) -> Dict[str, Any]:
+        """
+        Validate that the fields of the selected audience are filled in.
+
+        :return: The cleaned data.
+        """
+        cleaned_data = super().clean()
+        audience = cleaned_data.get("audience") or AUDIENCE_ALL
+        cleaned_data["audience"] = audience
+        if audience == AUDIENCE_USER:
+            user = CustomUser.objects.filter(
+                username=cleaned_data.get("username")
+            ).first()
+            if not user:
+                self.add_error("username", "User not found.")
+            cleaned_data["user"] = user
+        elif audience == AUDIENCE_CREATED:
+            if not (
+                cleaned_data.get("created_from")
+                or cleaned_data.get("created_to")
+            ):
+                self.add_error(
+                    "created_from", "Set the start or the end of the window."
+                )
+        elif audience == AUDIENCE_SEGMENT and not cleaned_data.get("segment"):
+            self.add_error("segment", "Select a segment.")
+
+        send_at = cleaned_data.get("send_at")
+        if send_at and send_at <= timezone.now():
+            self.add_error("send_at", "The send date must be in the future.")
+        return cleaned_data
+
+    def get_audience(self) -> Dict[str, Any]:
+        """
+        Describe the selected audience with JSON serializable values.
+
+        :return: Dictionary describing the audience.
+        """
+        data = self.cleaned_data
+        audience = {"type": data["audience"]}
+        if data["audience"] == AUDIENCE_USER:
+            audience["user_id"] = str(data["user"].id)
+        elif data["audience"] == AUDIENCE_CREATED:
+            for field in ("created_from", "created_to"):
+                if data.get(field):
+                    audience[field] = data[field].isoformat()
+        elif data["audience"] == AUDIENCE_SEGMENT:
+            audience["segment_id"] = str(data["segment"].id)
+        return audience
+
+
+class ScheduledBannerJobForm(forms.ModelForm):
+    """Change form of a scheduled banner job that was not sent yet"""
+
+    send_at = forms.DateTimeField(
+        label="Send at",
+        widget=forms.DateTimeInput(attrs={"type": "datetime-local"}),
+    )
+
+    class Meta:
+        model = BannerJob
+        fields = ["content"]
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        task = get_scheduled_banner(self.instance)
+        if task:
+            self.initial.setdefault("send_at", task.clocked.clocked_time)
+
+    def clean_send_at(self) -> datetime:
+        """
+        Validate that the banner is still sent in the future.
+
+        :return: The send date.
+        """
+        send_at = self.cleaned_data["send_at"]
+        if send_at <= timezone.now():
+            raise forms.ValidationError("The send date must be in the future.")
+        return send_at
@@ -0,0 +1,234 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from chat.counters import refresh_chat_counters
+from chat.models import Chat, ExternalImage, Message
+from utils.counts import invalidate_counts
+
+IMPORT_FORMATS = ("csv", "jsonl")
+CONFLICT_SKIP = "skip"
+CONFLICT_UPDATE = "update"
+
+# (line number, record, error) of every row read from an import file.
+ImportRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+# (line number, record, errors) of every rejected row.
+RejectedRow = Tuple[int, Optional[Dict[str, Any]], str]
+
+
+def read_rows(file: IO[str], import_format: str) -> Iterator[ImportRow]:
+    """
+    Stream the rows of a CSV or JSON lines file, one at a time.
+
+    :param file: The open file.
+    :param import_format: Either "csv" or "jsonl".
+    :return: Iterator over the line number, the record and the parse
+        error of every row.
+    :raises ValueError: If the format is not supported.
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record, None
+    elif import_format == "jsonl":
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(record, dict):
+                yield line_number, record, None
+            else:
+                yield line_number, None, "Expected a JSON object"
+    else:
+        raise ValueError(f"Unsupported import format: {import_format}")
+
+
+class BaseImporter(ABC):
+    """
+    Abstract base class for the bulk importers of a model.
+
+    Rows are validated field by field with the model fields, then as a
+    batch against the database, and inserted with a single bulk_create.
+    """
+
+    model = None
+    required_fields: Tuple[str, ...] = ()
+    optional_fields: Tuple[str, ...] = ()
+
+    def __init__(self, on_conflict: str = CONFLICT_SKIP):
+        self.on_conflict = on_conflict
+
+    def clean_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert and validate the values of a record with the model
+        fields. Unknown columns are ignored.
+
+        :param record: The raw record.
+        :return: The cleaned values.
+        :raises ValidationError: If a value is missing or invalid.
+        """
+        cleaned, errors = {}, {}
+        for name in self.required_fields + self.optional_fields:
+            field = self.model._meta.get_field(name)
+            # Foreign keys are read from either column name, so files
+            # written by export_data can be imported back.
+            value = record.get(name, record.get(field.attname))
+            if value in (None, ""):
+                if name in self.required_fields:
+                    errors[name] = ["This field is required."]
+                continue
+            # Foreign keys are only converted here, their existence is
+            # checked once per batch by check_batch.
+            target = field.target_field if field.is_relation else field
+            try:
+                cleaned[field.attname] = target.clean(value, None)
+            except ValidationError as e:
+                errors[name] = e.messages
+        if errors:
+            raise ValidationError(errors)
+        return cleaned
+
+    def import_batch(
+        self, rows: List[ImportRow]
+    ) -> Tuple[int, int, List[RejectedRow]]:
+        """
+        Validate and insert a batch of rows in one transaction.
+
+        :param rows: The rows read from the import file.
+        :return: The number of rows imported and skipped, and the
+            rejected rows.
+        """
+        valid, rejected = [], []
+        for line_number, record, error in rows:
+            if error:
+                rejected.append((line_number, record, error))
+                continue
+            try:
+                valid.append((line_number, record, self.clean_record(record)))
+            except ValidationError as e:
+                rejected.append((line_number, record, "; ".join(e.messages)))
+
+        valid, batch_rejected, skipped = self.check_batch(valid)
+        rejected += batch_rejected
+        if valid:
+            with transaction.atomic():
+                self.save_batch([values for _, _, values in valid])
+        return len(valid), skipped, sorted(rejected, key=lambda row: row[0])
+
+    @abstractmethod
+    def check_batch(
+        self, valid: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]
+    ) -> Tuple[List, List[RejectedRow], int]:
+        """
+        Validate the cleaned rows of a batch against each other and the
+        database, with a constant number of queries.
+
+        :param valid: Line number, record and cleaned values of the rows.
+        :return: The rows to insert, the rejected rows and the number of
+            skipped rows.
+        """
+
+    @abstractmethod
+    def save_batch(self, values: List[Dict[str, Any]]) -> None:
+        """
+        Insert a batch of cleaned rows.
+
+        :param values: The cleaned values of the rows.
+        """
+
+
+class ExternalImageImporter(BaseImporter):
+    """
+    Importer of image catalogues. Rows whose external_id already exists
+    are skipped, or updated with ``on_conflict="update"``. Images are
+    not downloaded.
+    """
+
+    model = ExternalImage
+    required_fields = ("external_id", "url")
+    optional_fields = ("image", "was_sent")
+
+    def check_batch(
+        self, valid: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]
+    ) -> Tuple[List, List[RejectedRow], int]:
+        rows, rejected, seen = [], [], set()
+        for line_number, record, values in valid:
+            if values["external_id"] in seen:
+                rejected.append(
+                    (line_number, record, "Duplicate external_id in file")
+                )
+                continue
+            seen.add(values["external_id"])
+            rows.append((line_number, record, values))
+        if self.on_conflict == CONFLICT_UPDATE:
+            return rows, rejected, 0
+
+        existing = set(
+            ExternalImage.objects.filter(external_id__in=seen).values_list(
+                "external_id", flat=True
+            )
+        )
+        rows = [row for row in rows if row[2]["external_id"] not in existing]
+        return rows, rejected, len(existing)
+
+    def save_batch(self, values: List[Dict[str, Any]]) -> None:
+        images = [ExternalImage(**row) for row in values]
+        if self.on_conflict == CONFLICT_UPDATE:
+            # Optional columns are only updated when every row has them.
+            ExternalImage.objects.bulk_create(
+                images,
+                update_conflicts=True,
+                unique_fields=["external_id"],
+                update_fields=["url"]
+                + [
+                    name
+                    for name in self.optional_fields
+                    if all(name in row for row in values)
+                ],
+            )
+        else:
+            # Rows inserted concurrently since check_batch are skipped too.
+            ExternalImage.objects.bulk_create(images, ignore_conflicts=True)
+
+
+class MessageImporter(BaseImporter):
+    """
+    Importer of messages. Rows of unknown chats are rejected. The
+    counters of the chats are refreshed after every batch.
+    """
+
+    model = Message
+    required_fields = ("chat", "content")
+    optional_fields = ("image",)
+
+    def check_batch(
+        self, valid: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]
+    ) -> Tuple[List, List[RejectedRow], int]:
+        chat_ids = set(
+            Chat.objects.filter(
+                id__in={values["chat_id"] for _, _, values in valid}
+            ).values_list("id", flat=True)
+        )
+        rows, rejected = [], []
+        for line_number, record, values in valid:
+            if values["chat_id"] in chat_ids:
+                rows.append((line_number, record, values))
+            else:
+                rejected.append((line_number, record, "Unknown chat"))
+        return rows, rejected, 0
+
+    def save_batch(self, values: List[Dict[str, Any]]) -> None:
+        Message.objects.bulk_create([Message(**row) for row in values])
+        refresh_chat_counters({row["chat_id"] for row in values})
+        invalidate_counts(Message)
+
+
+IMPORTERS = {"image": ExternalImageImporter, "message": MessageImporter}
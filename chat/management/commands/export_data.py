@@ -0,0 +1,117 @@
+from typing import Any, Dict, List
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.models import Chat, Message
+from utils.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_CONTENT_TYPES,
+    get_export_fields,
+    iter_export,
+)
+from utils.replicas import get_read_database
+
+EXPORT_MODELS = {"chat": Chat, "message": Message}
+
+
+class Command(BaseCommand):
+    """
+    Django management command to export chats or messages as CSV or
+    JSON lines, streaming the rows from the database.
+    """
+
+    help = "Exports chats or messages as CSV or JSON lines"
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add command line arguments to the parser.
+
+        :param parser: The argument parser.
+        """
+        parser.add_argument(
+            "model", choices=sorted(EXPORT_MODELS), help="Model to export"
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_CONTENT_TYPES),
+            default="csv",
+            help="Output format (default: csv)",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write the export to (default: stdout)",
+        )
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="LOOKUP=VALUE",
+            help="Queryset filter, e.g. is_deleted=False. Repeatable",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f"Rows fetched at a time (default: {EXPORT_CHUNK_SIZE})",
+        )
+        parser.add_argument(
+            "--database",
+            default=get_read_database(),
+            help="Database to read from (default: the replica, if any)",
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Handle the execution of the command.
+
+        :param args: Additional positional arguments.
+        :param kwargs: Additional keyword arguments.
+        """
+        model = EXPORT_MODELS[kwargs["model"]]
+        queryset = (
+            model.objects.using(kwargs["database"])
+            .filter(**self.parse_filters(kwargs["filter"]))
+            .order_by("pk")
+        )
+        model_admin = admin.site._registry.get(model)
+        fields = getattr(model_admin, "export_fields", None)
+        lines = iter_export(
+            queryset,
+            fields or get_export_fields(model),
+            kwargs["format"],
+            chunk_size=kwargs["chunk_size"],
+        )
+
+        output = kwargs["output"]
+        if not output:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        count = 0
+        with open(output, "w", newline="") as file:
+            for line in lines:
+                file.write(line)
+                count += 1
+        if kwargs["format"] == "csv":
+            count -= 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Exported {count} rows to {output}")
+        )
+
+    def parse_filters(self, filters: List[str]) -> Dict[str, str]:
+        """
+        Parse the LOOKUP=VALUE filters of the command line.
+
+        :param filters: The filters as given on the command line.
+        :return: Dictionary of queryset filters.
+        :raises CommandError: If a filter is malformed.
+        """
+        parsed = {}
+        for item in filters:
+            lookup, separator, value = item.partition("=")
+            if not separator or not lookup:
+                raise CommandError(f"Invalid filter: {item}")
+            parsed[lookup] = value
+        return parsed
@@ -0,0 +1,49 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from chat.blobs import collect_blobs
+from core.settings import BLOB_GC_GRACE_SECONDS
+
+
+class Command(BaseCommand):
+    """
+    Django management command to delete the content-addressed image
+    files no image references anymore.
+    """
+
+    help = "Deletes the image blobs without references, and their files"
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add command line arguments to the parser.
+
+        :param parser: The argument parser.
+        """
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=BLOB_GC_GRACE_SECONDS,
+            help="Keep the blobs released more recently "
+            f"(default: {BLOB_GC_GRACE_SECONDS})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the blobs that would be deleted",
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Handle the execution of the command.
+
+        :param args: Additional positional arguments.
+        :param kwargs: Additional keyword arguments.
+        """
+        deleted, freed = collect_blobs(
+            kwargs["grace_seconds"], dry_run=kwargs["dry_run"]
+        )
+        verb = "Would delete" if kwargs["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {deleted} blobs, {freed} bytes")
+        )
@@ -0,0 +1,152 @@
+import json
+import os
+import time
+from typing import IO, Any, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.importers import (
+    CONFLICT_SKIP,
+    CONFLICT_UPDATE,
+    IMPORT_FORMATS,
+    IMPORTERS,
+    BaseImporter,
+    ImportRow,
+    read_rows,
+)
+from core.settings import BULK_CREATE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Django management command to bulk import messages or external
+    images from CSV or JSON lines files.
+    """
+
+    help = (
+        "Imports messages or external images from a CSV or JSON lines "
+        "file, writing the rejected rows to a side file"
+    )
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add command line arguments to the parser.
+
+        :param parser: The argument parser.
+        """
+        parser.add_argument(
+            "model", choices=sorted(IMPORTERS), help="Model to import"
+        )
+        parser.add_argument("path", help="File to import")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="Input format (default: from the file extension)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BULK_CREATE_BATCH_SIZE,
+            help=f"Rows per batch (default: {BULK_CREATE_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--on-conflict",
+            choices=(CONFLICT_SKIP, CONFLICT_UPDATE),
+            default=CONFLICT_SKIP,
+            help="What to do with images whose external_id already exists "
+            "(default: skip)",
+        )
+        parser.add_argument(
+            "--rejected",
+            help="File to write the rejected rows to "
+            "(default: <path>.rejected.jsonl)",
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Handle the execution of the command.
+
+        :param args: Additional positional arguments.
+        :param kwargs: Additional keyword arguments.
+        """
+        path = kwargs["path"]
+        import_format = kwargs["format"] or os.path.splitext(path)[1][1:]
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(
+                f"Unknown format for {path}, use --format to set it"
+            )
+        importer = IMPORTERS[kwargs["model"]](kwargs["on_conflict"])
+        rejected_path = kwargs["rejected"] or f"{path}.rejected.jsonl"
+
+        self.verbosity = kwargs["verbosity"]
+        self.imported = self.skipped = self.rejected = 0
+        self.rejected_file = None
+        self.start = time.perf_counter()
+        try:
+            with open(path, newline="", encoding="utf-8") as file:
+                batch = []
+                for row in read_rows(file, import_format):
+                    batch.append(row)
+                    if len(batch) >= kwargs["batch_size"]:
+                        self.import_batch(importer, batch, rejected_path)
+                        batch = []
+                if batch:
+                    self.import_batch(importer, batch, rejected_path)
+        finally:
+            if self.rejected_file:
+                self.rejected_file.close()
+
+        elapsed = time.perf_counter() - self.start
+        total = self.imported + self.skipped + self.rejected
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} rows, skipped {self.skipped}, "
+                f"rejected {self.rejected} in {elapsed:.2f}s "
+                f"({total / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+        )
+        if self.rejected:
+            self.stdout.write(
+                self.style.WARNING(f"Rejected rows written to {rejected_path}")
+            )
+
+    def import_batch(
+        self, importer: BaseImporter, batch: List[ImportRow], path: str
+    ) -> None:
+        """
+        Import a batch of rows and record the rejected ones.
+
+        :param importer: The importer of the model.
+        :param batch: The rows of the batch.
+        :param path: File the rejected rows are written to.
+        """
+        imported, skipped, rejected = importer.import_batch(batch)
+        self.imported += imported
+        self.skipped += skipped
+        self.rejected += len(rejected)
+        if rejected:
+            file = self.get_rejected_file(path)
+            for line_number, record, error in rejected:
+                file.write(
+                    json.dumps(
+                        {"line": line_number, "error": error, "row": record}
+                    )
+                    + "\n"
+                )
+        if self.verbosity > 1:
+            elapsed = time.perf_counter() - self.start
+            self.stdout.write(
+                f"{self.imported + self.skipped + self.rejected} rows read, "
+                f"{self.imported / max(elapsed, 1e-9):.0f} rows/s"
+            )
+
+    def get_rejected_file(self, path: str) -> IO[str]:
+        """
+        Open the side file of the rejected rows on the first rejection.
+
+        :param path: Path of the side file.
+        :return: The open file.
+        """
+        if self.rejected_file is None:
+            self.rejected_file = open(path, "w", encoding="utf-8")
+        return self.rejected_file
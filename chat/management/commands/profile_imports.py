@@ -0,0 +1,101 @@
+import subprocess  # nosec B404
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.profiling import ImportTime, profile_imports
+
+# Code loading what each kind of process loads before serving anything.
+IMPORT_TARGETS = {
+    "web": "import core.wsgi; import core.urls",
+    "asgi": "import core.asgi; import core.urls",
+    "worker": (
+        "import django; django.setup(); from core.celery import app; "
+        "app.loader.import_default_modules()"
+    ),
+    "manage": "import django; django.setup()",
+}
+
+
+class Command(BaseCommand):
+    """
+    Django management command to report the modules that slow down the
+    start of the web and worker processes, from ``python -X importtime``.
+    """
+
+    help = (
+        "Reports the total import time of a web, worker or manage.py "
+        "process and its slowest modules and packages"
+    )
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add command line arguments to the parser.
+
+        :param parser: The argument parser.
+        """
+        parser.add_argument(
+            "target",
+            nargs="?",
+            choices=sorted(IMPORT_TARGETS),
+            default="web",
+            help="Process whose imports are profiled (default: web)",
+        )
+        parser.add_argument(
+            "--module",
+            action="append",
+            default=[],
+            help="Profile importing this module instead. Repeatable",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of modules and packages listed (default: 20)",
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Handle the execution of the command.
+
+        :param args: Additional positional arguments.
+        :param kwargs: Additional keyword arguments.
+        """
+        code = IMPORT_TARGETS[kwargs["target"]]
+        if kwargs["module"]:
+            code = "import django; django.setup(); " + "; ".join(
+                f"import {module}" for module in kwargs["module"]
+            )
+        try:
+            times = profile_imports(code)
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"Importing failed:\n{e.stderr}")
+
+        limit = kwargs["limit"]
+        total = sum(time.self_us for time in times)
+        self.stdout.write(
+            f"{len(times)} modules imported in {total / 1000:.1f}ms"
+        )
+        self.stdout.write("\nSlowest modules, with their imports:")
+        slowest = sorted(times, key=lambda time: -time.cumulative_us)
+        for time in slowest[:limit]:
+            self.stdout.write(
+                f"{time.cumulative_us / 1000:>9.1f}ms  {time.module}"
+            )
+        self.stdout.write("\nSlowest packages, by own import time:")
+        for package, self_us in self.get_package_times(times)[:limit]:
+            self.stdout.write(f"{self_us / 1000:>9.1f}ms  {package}")
+
+    def get_package_times(self, times: List[ImportTime]) -> List:
+        """
+        Sum the own import time of the modules of every top-level
+        package.
+
+        :param times: The import time of every module.
+        :return: Package names and times, the slowest first.
+        """
+        packages: Dict[str, int] = defaultdict(int)
+        for time in times:
+            packages[time.module.split(".")[0]] += time.self_us
+        return sorted(packages.items(), key=lambda item: -item[1])
@@ -0,0 +1,55 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from chat.counters import reconcile_chat_counters
+from core.settings import BULK_CREATE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Django management command to recompute the denormalized message
+    counters of every chat, in batches.
+    """
+
+    help = (
+        "Recomputes the message count and last message date of every chat "
+        "in batches"
+    )
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add command line arguments to the parser.
+
+        :param parser: The argument parser.
+        """
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BULK_CREATE_BATCH_SIZE,
+            help=f"Chats per batch (default: {BULK_CREATE_BATCH_SIZE})",
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Handle the execution of the command.
+
+        :param args: Additional positional arguments.
+        :param kwargs: Additional keyword arguments.
+        """
+        checked_total = fixed_total = 0
+        after = None
+        while True:
+            checked, fixed, after = reconcile_chat_counters(
+                kwargs["batch_size"], after=after
+            )
+            if after is None:
+                break
+            checked_total += checked
+            fixed_total += fixed
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked_total} chats, fixed {fixed_total}"
+            )
+        )
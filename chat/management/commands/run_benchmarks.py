@@ -0,0 +1,228 @@
+import json
+import platform
+import subprocess  # nosec B404
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import redis
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from chat.benchmarks import SCENARIOS, run_scenario
+from core.settings import REDIS_HOST, REDIS_PORT
+from utils.redis import REDIS_CLIENT_TARGETS
+
+# Cache of the --fake-redis runs, which never reach a Redis server.
+FAKE_REDIS_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark the banner, ingestion,
+    cache and admin changelist hot paths at several dataset sizes.
+    """
+
+    help = (
+        "Benchmarks the hot paths on a throwaway test database and "
+        "writes the results as JSON"
+    )
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add command line arguments to the parser.
+
+        :param parser: The argument parser.
+        """
+        parser.add_argument(
+            "--scenarios",
+            nargs="+",
+            choices=sorted(SCENARIOS),
+            default=sorted(SCENARIOS),
+            help="Scenarios to run (default: all)",
+        )
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[100, 1000, 10000],
+            help="Dataset sizes (default: 100 1000 10000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Timed runs per scenario and size (default: 3)",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write the JSON results to (default: stdout)",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Previous JSON results to print the differences against",
+        )
+        parser.add_argument(
+            "--fake-redis",
+            action="store_true",
+            help="Use fakeredis and an in-memory cache instead of Redis",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database between runs",
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Handle the execution of the command.
+
+        :param args: Additional positional arguments.
+        :param kwargs: Additional keyword arguments.
+        """
+        redis_client = self.get_redis_client(kwargs["fake_redis"])
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=kwargs["keepdb"]
+        )
+        try:
+            with ExitStack() as stack:
+                for target in REDIS_CLIENT_TARGETS:
+                    stack.enter_context(patch(target, redis_client))
+                if kwargs["fake_redis"]:
+                    stack.enter_context(
+                        override_settings(CACHES=FAKE_REDIS_CACHES)
+                    )
+                results = self.run_benchmarks(
+                    kwargs["scenarios"],
+                    kwargs["sizes"],
+                    kwargs["repeat"],
+                    redis_client,
+                )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=kwargs["keepdb"]
+            )
+            teardown_test_environment()
+
+        report = {"meta": self.get_metadata(kwargs), "results": results}
+        output = json.dumps(report, indent=2)
+        if kwargs["output"]:
+            with open(kwargs["output"], "w") as file:
+                file.write(output)
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {kwargs['output']}")
+            )
+        else:
+            self.stdout.write(output)
+
+        if kwargs["compare"]:
+            self.compare(kwargs["compare"], results)
+
+    def get_redis_client(self, fake: bool):
+        """
+        Get the Redis client the scenarios run against.
+
+        :param fake: Whether to use an in-memory fakeredis server.
+        :return: A Redis client.
+        """
+        if not fake:
+            return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+        try:
+            import fakeredis
+        except ImportError:
+            raise CommandError("--fake-redis requires the fakeredis package")
+        return fakeredis.FakeRedis()
+
+    def run_benchmarks(
+        self,
+        scenarios: List[str],
+        sizes: List[int],
+        repeat: int,
+        redis_client,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run every scenario at every dataset size.
+
+        :param scenarios: Names of the scenarios to run.
+        :param sizes: Dataset sizes.
+        :param repeat: Timed runs per scenario and size.
+        :param redis_client: Redis client used by the scenarios.
+        :return: List with one result per scenario and size.
+        """
+        results = []
+        for name in scenarios:
+            for size in sizes:
+                result = run_scenario(
+                    SCENARIOS[name], size, redis_client, repeat=repeat
+                )
+                self.stderr.write(
+                    f"{name:<20} size={size:<8} "
+                    f"wall={result['wall_time_s'] * 1000:9.2f}ms "
+                    f"queries={result['db_queries']:<6} "
+                    f"redis={result['redis_round_trips']:<6} "
+                    f"peak_alloc={result['peak_alloc_kb']}KB"
+                )
+                results.append(result)
+        return results
+
+    def get_metadata(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Describe the environment the benchmarks ran in.
+
+        :param options: The command options.
+        :return: Dictionary with the run metadata.
+        """
+        try:
+            commit = subprocess.check_output(  # nosec B603 B607
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            commit = commit.decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "db_vendor": connection.vendor,
+            "fake_redis": options["fake_redis"],
+            "repeat": options["repeat"],
+        }
+
+    def compare(self, path: str, results: List[Dict[str, Any]]) -> None:
+        """
+        Print the wall time ratio and the query and Redis deltas
+        against a previous report.
+
+        :param path: Path of the previous JSON report.
+        :param results: Results of the current run.
+        """
+        with open(path) as file:
+            previous = {
+                (result["scenario"], result["size"]): result
+                for result in json.load(file)["results"]
+            }
+        for result in results:
+            old = previous.get((result["scenario"], result["size"]))
+            if not old:
+                continue
+            ratio = result["wall_time_s"] / max(old["wall_time_s"], 1e-9)
+            self.stdout.write(
+                f"{result['scenario']:<20} size={result['size']:<8} "
+                f"wall x{ratio:.2f} "
+                f"queries {result['db_queries'] - old['db_queries']:+d} "
+                f"redis "
+                f"{result['redis_round_trips'] - old['redis_round_trips']:+d}"
+            )
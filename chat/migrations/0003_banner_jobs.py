@@ -0,0 +1,92 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:43
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0002_banner_segments"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BannerJob",
+            fields=[
+                ("is_deleted", models.BooleanField(default=False)),
+                ("deleted_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("dedup_key", models.CharField(max_length=64, unique=True)),
+                ("content", models.TextField()),
+                (
+                    "image_path",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("audience", models.JSONField(default=dict)),
+                (
+                    "rows_per_second",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                    ),
+                ),
+                ("last_chat_id", models.UUIDField(blank=True, null=True)),
+                ("messages_created", models.PositiveIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "image",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="banner_jobs",
+                        to="chat.externalimage",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="banner_job",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="messages",
+                to="chat.bannerjob",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="message",
+            constraint=models.UniqueConstraint(
+                fields=("banner_job", "chat"), name="unique_banner_job_chat"
+            ),
+        ),
+    ]
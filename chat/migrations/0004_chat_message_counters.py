@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0003_banner_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chat",
+            name="last_message_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="chat",
+            name="message_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
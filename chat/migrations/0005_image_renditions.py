@@ -0,0 +1,53 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:58
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0004_chat_message_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageRendition",
+            fields=[
+                ("is_deleted", models.BooleanField(default=False)),
+                ("deleted_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("name", models.CharField(max_length=32)),
+                ("file", models.ImageField(upload_to="images/")),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                ("size", models.PositiveIntegerField()),
+                (
+                    "image",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="chat.externalimage",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="imagerendition",
+            constraint=models.UniqueConstraint(
+                fields=("image", "name"), name="unique_image_rendition"
+            ),
+        ),
+    ]
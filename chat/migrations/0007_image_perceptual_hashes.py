@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0006_image_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="externalimage",
+            name="dhash",
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name="externalimage",
+            name="dhash_band_0",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="externalimage",
+            name="dhash_band_1",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="externalimage",
+            name="dhash_band_2",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="externalimage",
+            name="dhash_band_3",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="externalimage",
+            name="duplicate_of",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="duplicates",
+                to="chat.externalimage",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0007_image_perceptual_hashes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bannerjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("running", "Running"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                    ("cancelled", "Cancelled"),
+                ],
+                default="pending",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -1,4 +1,8 @@
 """Init model file"""
+from .banner_job import BannerJob  # noqa: F401
+from .blob import ImageBlob  # noqa: F401
 from .chat import Chat  # noqa: F401
 from .image import ExternalImage  # noqa: F401
 from .message import Message  # noqa: F401
+from .rendition import ImageRendition  # noqa: F401
+from .segment import BannerSegment, SegmentMembership  # noqa: F401
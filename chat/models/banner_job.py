@@ -0,0 +1,52 @@
+import uuid
+
+from django.db import models
+
+from chat.models.image import ExternalImage
+from core.models import BaseModel
+
+
+class BannerJob(BaseModel):
+    """Banner send job"""
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_CANCELLED, "Cancelled"),
+    ]
+
+    id = models.UUIDField(
+        default=uuid.uuid4,
+        unique=True,
+        primary_key=True,
+        editable=False,
+    )
+    dedup_key = models.CharField(max_length=64, unique=True)
+    content = models.TextField()
+    image = models.ForeignKey(
+        ExternalImage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="banner_jobs",
+    )
+    image_path = models.CharField(max_length=255, null=True, blank=True)
+    audience = models.JSONField(default=dict)
+    rows_per_second = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    last_chat_id = models.UUIDField(null=True, blank=True)
+    messages_created = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Banner job {self.id} ({self.status})"
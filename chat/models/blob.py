@@ -0,0 +1,108 @@
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Set
+
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import BaseModel
+from utils.storage import StoredBlob
+
+
+class ImageBlob(BaseModel):
+    """Content-addressed image file, shared by identical images"""
+
+    id = models.UUIDField(
+        default=uuid.uuid4,
+        unique=True,
+        primary_key=True,
+        editable=False,
+    )
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    # Number of images referencing the file, see chat.blobs
+    ref_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def acquire(cls, sha256: str, name: str, size: int) -> "ImageBlob":
+        """
+        Get or create the blob of a stored file and add a reference to it,
+        see :meth:`acquire_all`.
+
+        :param sha256: The hex digest of the content of the file.
+        :param name: The storage name of the file.
+        :param size: The size of the file, in bytes.
+        :return: The blob.
+        """
+        return cls.acquire_all([StoredBlob(sha256, name, size)])[sha256]
+
+    @classmethod
+    def acquire_all(cls, files: Iterable) -> Dict[str, "ImageBlob"]:
+        """
+        Get or create the blobs of stored files and add a reference to
+        them per file, in three queries whatever the number of files.
+        A blob collected in between is created again.
+
+        :param files: Digest, storage name and size of every file, e.g.
+            StoredBlob or SpooledBlob.
+        :return: The blobs by digest.
+        """
+        pending = list(files)
+        blobs: Dict[str, ImageBlob] = {}
+        while pending:
+            new = {
+                file.sha256: cls(
+                    sha256=file.sha256, name=file.name, size=file.size
+                )
+                for file in pending
+            }
+            cls.objects.bulk_create(new.values(), ignore_conflicts=True)
+            found = {
+                blob.sha256: blob
+                for blob in cls.objects.filter(sha256__in=new)
+            }
+            referenced = cls.add_references(
+                found[file.sha256].id for file in pending
+            )
+            blobs.update(
+                (sha256, blob)
+                for sha256, blob in found.items()
+                if blob.id in referenced
+            )
+            pending = [file for file in pending if file.sha256 not in blobs]
+        return blobs
+
+    @classmethod
+    def add_references(cls, blob_ids: Iterable) -> Set:
+        """
+        Add references to blobs, postponing their garbage collection.
+
+        :param blob_ids: Ids of the blobs, repeated once per reference.
+        :return: The ids of the blobs referenced, without those that no
+            longer exist.
+        """
+        counts = Counter(blob_ids)
+        ids_by_count = defaultdict(list)
+        for blob_id, count in counts.items():
+            ids_by_count[count].append(blob_id)
+        updated = sum(
+            cls.objects.filter(id__in=ids).update(
+                ref_count=F("ref_count") + count, updated_at=timezone.now()
+            )
+            for count, ids in ids_by_count.items()
+        )
+        if updated == len(counts):
+            return set(counts)
+        return set(
+            cls.objects.filter(id__in=counts).values_list("id", flat=True)
+        )
+
+    def add_reference(self) -> bool:
+        """
+        Add a reference to the blob, postponing its garbage collection.
+
+        :return: False if the blob no longer exists.
+        """
+        return self.id in ImageBlob.add_references([self.id])
@@ -18,3 +18,8 @@ class Chat(BaseModel):
     user = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name="chats"
     )
+    # Denormalized from chat_message, see chat.counters
+    message_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(
+        null=True, blank=True, db_index=True
+    )
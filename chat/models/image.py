@@ -1,9 +1,13 @@
 import uuid
+from contextlib import ExitStack
+from typing import List
 
 from django.db import models
 
+from chat.models.blob import ImageBlob
 from core.models import BaseModel
-from utils.image import download_image
+from utils.image import download_blob
+from utils.storage import write_blob
 
 
 class ExternalImage(BaseModel):
@@ -16,11 +20,97 @@ class ExternalImage(BaseModel):
         editable=False,
     )
     external_id = models.IntegerField(unique=True)
-    url = models.URLField()
+    url = models.URLField(db_index=True)
     image = models.ImageField(upload_to="images/", null=True, blank=True)
+    blob = models.ForeignKey(
+        ImageBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="images",
+    )
     was_sent = models.BooleanField(default=False)
+    # Perceptual hash of the image and its 16-bit bands, see
+    # chat.duplicates
+    dhash = models.CharField(max_length=16, null=True, blank=True)
+    dhash_band_0 = models.PositiveIntegerField(
+        null=True, blank=True, db_index=True
+    )
+    dhash_band_1 = models.PositiveIntegerField(
+        null=True, blank=True, db_index=True
+    )
+    dhash_band_2 = models.PositiveIntegerField(
+        null=True, blank=True, db_index=True
+    )
+    dhash_band_3 = models.PositiveIntegerField(
+        null=True, blank=True, db_index=True
+    )
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="duplicates",
+    )
 
     def save(self, *args, **kwargs):
         if self.url and not self.image:
-            download_image(self.url, self)
+            self.attach_blob()
         super().save(*args, **kwargs)
+
+    def attach_blob(self) -> None:
+        """
+        Point the image at the content-addressed file of its URL, see
+        :meth:`attach_blobs`.
+        """
+        ExternalImage.attach_blobs([self])
+
+    @classmethod
+    def attach_blobs(cls, images: List["ExternalImage"]) -> None:
+        """
+        Point images without a file at the content-addressed files of
+        their URLs, in a few queries whatever their number. A file is
+        reused when another image has the same URL, downloaded
+        otherwise. The blob of the content names the file, whatever the
+        extension of the URL.
+
+        :param images: The images, not saved yet.
+        """
+        images = [image for image in images if image.url and not image.image]
+        if not images:
+            return
+        same_url = {
+            image.url: image.blob
+            for image in cls.objects.filter(
+                url__in={image.url for image in images}, blob__isnull=False
+            )
+            .exclude(id__in=[image.id for image in images])
+            .select_related("blob")
+        }
+        reused = [image for image in images if image.url in same_url]
+        referenced = ImageBlob.add_references(
+            same_url[image.url].id for image in reused
+        )
+        for image in reused:
+            # Downloaded below if the blob was collected meanwhile.
+            if same_url[image.url].id in referenced:
+                image.blob = same_url[image.url]
+                image.image = image.blob.name
+
+        with ExitStack() as stack:
+            downloads = [
+                (image, stack.enter_context(download_blob(image.url)))
+                for image in images
+                if image.blob_id is None
+            ]
+            downloads = [
+                (image, spooled) for image, spooled in downloads if spooled
+            ]
+            blobs = ImageBlob.acquire_all(spooled for _, spooled in downloads)
+            for image, spooled in downloads:
+                image.blob = blobs[spooled.sha256]
+                # Written once referenced: collect_blobs deletes the
+                # file of a blob with the blob, under its row lock, so
+                # a file missing here is written again.
+                write_blob(image.blob.name, spooled.file)
+                image.image = image.blob.name
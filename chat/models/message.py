@@ -1,8 +1,9 @@
 import uuid
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
-from chat.models import Chat
+from chat.models import BannerJob, Chat
 from core.models import BaseModel
 
 
@@ -20,3 +21,27 @@ class Message(BaseModel):
     )
     content = models.TextField()
     image = models.ImageField(upload_to="images/", null=True, blank=True)
+    banner_job = models.ForeignKey(
+        BannerJob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="messages",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["banner_job", "chat"], name="unique_banner_job_chat"
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Chat.objects.filter(id=self.chat_id).update(
+                message_count=F("message_count") + 1,
+                last_message_at=self.created_at,
+            )
@@ -0,0 +1,32 @@
+import uuid
+
+from django.db import models
+
+from chat.models.image import ExternalImage
+from core.models import BaseModel
+
+
+class ImageRendition(BaseModel):
+    """Resized rendition of an external image"""
+
+    id = models.UUIDField(
+        default=uuid.uuid4,
+        unique=True,
+        primary_key=True,
+        editable=False,
+    )
+    image = models.ForeignKey(
+        ExternalImage, on_delete=models.CASCADE, related_name="renditions"
+    )
+    name = models.CharField(max_length=32)
+    file = models.ImageField(upload_to="images/")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["image", "name"], name="unique_image_rendition"
+            )
+        ]
@@ -0,0 +1,44 @@
+import uuid
+
+from django.db import models
+
+from account.models import CustomUser
+from chat.models import Chat
+from core.models import BaseModel
+
+
+class BannerSegment(BaseModel):
+    """Saved banner audience"""
+
+    id = models.UUIDField(
+        default=uuid.uuid4,
+        unique=True,
+        primary_key=True,
+        editable=False,
+    )
+    name = models.CharField(max_length=255, unique=True)
+    users = models.ManyToManyField(
+        CustomUser, blank=True, related_name="banner_segments"
+    )
+    created_from = models.DateTimeField(null=True, blank=True)
+    created_to = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return self.name
+
+
+class SegmentMembership(models.Model):
+    """Precomputed chat ids of a banner segment"""
+
+    segment = models.ForeignKey(
+        BannerSegment, on_delete=models.CASCADE, related_name="memberships"
+    )
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["segment", "chat"], name="unique_segment_chat"
+            )
+        ]
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List
 
+from chat.models.image import ExternalImage
+
 
 class BaseProvider(ABC):
     """
@@ -25,10 +27,12 @@ class BaseProvider(ABC):
         """
 
     @abstractmethod
-    def save_data(self, processed_data: List[Dict[str, Any]]) -> None:
+    def save_data(
+        self, processed_data: List[Dict[str, Any]]
+    ) -> List[ExternalImage]:
         """
         Save processed data.
 
         :param processed_data: List of dictionaries containing processed data.
-        :return: None
+        :return: List of the saved images.
         """
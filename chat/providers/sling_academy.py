@@ -39,12 +39,15 @@ class SlingAcademyProvider(BaseProvider):
                 )
         return new_images
 
-    def save_data(self, processed_data: List[Dict[str, Any]]) -> None:
+    def save_data(
+        self, processed_data: List[Dict[str, Any]]
+    ) -> List[ExternalImage]:
         """
         Save the processed data to the database.
 
         :param processed_data: List of dictionaries containing processed data.
+        :return: List of the saved images.
         """
-        for image_data in processed_data:
-            image = ExternalImage(**image_data)
-            image.save()
+        images = [ExternalImage(**image_data) for image_data in processed_data]
+        ExternalImage.attach_blobs(images)
+        return ExternalImage.objects.bulk_create(images)
@@ -0,0 +1,87 @@
+import hashlib
+import io
+import logging
+from typing import Iterable, List, Optional
+
+from chat.models import ExternalImage, ImageRendition
+from core.settings import IMAGE_RENDITION_FORMAT, IMAGE_RENDITIONS
+from utils.image import render_images
+from utils.storage import get_rendition_name, write_blob
+
+logger = logging.getLogger(__name__)
+
+BANNER_RENDITION = "banner"
+
+
+def create_renditions(images: Iterable[ExternalImage]) -> List[ImageRendition]:
+    """
+    Create or replace the IMAGE_RENDITIONS of downloaded images. The
+    files are named after the digest of the original content and the
+    size, next to its blob, so images sharing content share their
+    renditions and collect_blobs deletes them with the blob. Each
+    content is resized once, in parallel in the rendition process pool.
+
+    :param images: The images. Those without a file are skipped.
+    :return: The saved renditions.
+    """
+    images = {image.id: image for image in images if image.image}
+    digests = {}
+    sources = {}
+    for image_id, image in images.items():
+        try:
+            with image.image.open("rb") as file:
+                data = file.read()
+        except OSError as e:
+            logger.error(f"Failed to read image {image.image.name}: {e}")
+            continue
+        digest = hashlib.sha256(data).hexdigest()
+        digests[image_id] = digest
+        sources.setdefault(digest, data)
+
+    extension = f".{IMAGE_RENDITION_FORMAT.lower()}"
+    rendered = {}
+    for (digest, name), (data, width, height) in render_images(
+        sources, IMAGE_RENDITIONS
+    ).items():
+        file_name = get_rendition_name(
+            digest, IMAGE_RENDITIONS[name], extension
+        )
+        write_blob(file_name, io.BytesIO(data))
+        rendered[digest, name] = (file_name, width, height, len(data))
+
+    existing = {
+        (rendition.image_id, rendition.name): rendition
+        for rendition in ImageRendition.objects.filter(image_id__in=digests)
+    }
+    renditions = []
+    for image_id, digest in digests.items():
+        for name in IMAGE_RENDITIONS:
+            if (digest, name) not in rendered:
+                continue
+            rendition = existing.get((image_id, name)) or ImageRendition(
+                image=images[image_id], name=name
+            )
+            (
+                rendition.file,
+                rendition.width,
+                rendition.height,
+                rendition.size,
+            ) = rendered[digest, name]
+            rendition.save()
+            renditions.append(rendition)
+    return renditions
+
+
+def get_rendition_path(image_id: str, name: str) -> Optional[str]:
+    """
+    Get the path of a rendition of an image.
+
+    :param image_id: The id of the image.
+    :param name: The name of the rendition.
+    :return: The path of the rendition file, None if it does not exist.
+    """
+    return (
+        ImageRendition.objects.filter(image_id=image_id, name=name)
+        .values_list("file", flat=True)
+        .first()
+    )
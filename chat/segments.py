@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from chat.models import BannerSegment, Chat, SegmentMembership
+from core.settings import BULK_CREATE_BATCH_SIZE
+
+# Chats created shortly before the last refresh are checked again, in
+# case their transaction committed after it. Duplicates are ignored.
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+def get_segment_chats(segment: BannerSegment) -> QuerySet:
+    """
+    Get the chats matching the definition of a segment.
+
+    :param segment: The banner segment.
+    :return: QuerySet of the matching, not deleted, chats.
+    """
+    chats = Chat.objects.filter(is_deleted=False)
+    user_ids = list(segment.users.values_list("id", flat=True))
+    if user_ids:
+        chats = chats.filter(user_id__in=user_ids)
+    if segment.created_from:
+        chats = chats.filter(created_at__gte=segment.created_from)
+    if segment.created_to:
+        chats = chats.filter(created_at__lte=segment.created_to)
+    return chats
+
+
+def _add_members(segment: BannerSegment, chats: QuerySet) -> None:
+    batch = []
+    for chat_id in chats.values_list("id", flat=True).iterator(
+        chunk_size=BULK_CREATE_BATCH_SIZE
+    ):
+        batch.append(SegmentMembership(segment=segment, chat_id=chat_id))
+        if len(batch) >= BULK_CREATE_BATCH_SIZE:
+            SegmentMembership.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        SegmentMembership.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def refresh_segment(segment: BannerSegment, full: bool = False) -> None:
+    """
+    Bring the precomputed memberships of a segment up to date.
+
+    A segment that was never refreshed, or was edited since its last
+    refresh, is rebuilt. Otherwise only chats created since the last
+    refresh are added and deleted chats are removed.
+
+    :param segment: The banner segment.
+    :param full: Whether to rebuild the memberships from scratch.
+    """
+    now = timezone.now()
+    chats = get_segment_chats(segment)
+    rebuild = (
+        full
+        or segment.refreshed_at is None
+        or segment.updated_at > segment.refreshed_at
+    )
+    with transaction.atomic():
+        if rebuild:
+            segment.memberships.all().delete()
+        else:
+            segment.memberships.filter(chat__is_deleted=True).delete()
+            chats = chats.filter(
+                created_at__gt=segment.refreshed_at - REFRESH_OVERLAP
+            )
+        _add_members(segment, chats)
+        # update() keeps updated_at untouched, so edits stay detectable.
+        BannerSegment.objects.filter(id=segment.id).update(refreshed_at=now)
+    segment.refreshed_at = now
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from chat.blobs import release_blobs
+from chat.models import Chat, ExternalImage, Message
+from utils.counts import invalidate_counts
+
+
+@receiver(post_delete, sender=ExternalImage)
+def release_image_blob(sender, instance: ExternalImage, **kwargs) -> None:
+    """
+    Release the blob of a deleted image.
+
+    :param sender: The model class.
+    :param instance: The deleted image.
+    """
+    if instance.blob_id:
+        release_blobs([instance.blob_id])
+
+
+# Deletes invalidate once per delete instead, see
+# ApproximateCountMixin: a delete receiver would load and signal every
+# cascaded message of a deleted chat.
+@receiver(post_save, sender=Chat)
+@receiver(post_save, sender=Message)
+def invalidate_admin_counts(sender, **kwargs) -> None:
+    """
+    Drop the cached changelist counts of a saved model.
+
+    :param sender: The model class.
+    """
+    invalidate_counts(sender)
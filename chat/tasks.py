@@ -1,29 +1,145 @@
+from datetime import timedelta
+from typing import List
+
 from celery import shared_task
 from celery.utils.log import get_task_logger
+from django.utils import timezone
 
+from chat.banners import claim_banner_job, run_banner_job
+from chat.duplicates import flag_duplicates
+from chat.models import BannerJob, BannerSegment, ExternalImage
 from chat.providers.factory import ProviderFactory
+from chat.renditions import create_renditions
+from chat.segments import refresh_segment
+from core.settings import BANNER_JOB_STALE_SECONDS
+from utils.jobs import JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED, set_job_status
+from utils.metrics import (
+    PROVIDER_FETCH_DURATION,
+    PROVIDER_FETCH_ERRORS,
+    PROVIDER_IMAGES_SAVED,
+)
 
 logger = get_task_logger(__name__)
 
 
-@shared_task
+@shared_task(acks_late=True, reject_on_worker_lost=True)
 def fetch_photos_from_api(provider_name: str) -> None:
     """
     Fetches photos from the specified provider API
-    and saves them to the database.
+    and saves them to the database. The status of the last fetch of
+    each provider is recorded under the provider name.
 
     :param provider_name: The name of the provider to fetch data from.
     :return: None
     :raises Exception: If there is an error during the fetch or save process.
     """
+    job_kind = "fetch_photos_from_api"
+    set_job_status(job_kind, provider_name, JOB_RUNNING)
     try:
         provider = ProviderFactory.get_provider(provider_name)
-        data = provider.fetch_data()
+        with PROVIDER_FETCH_DURATION.labels(provider_name).time():
+            data = provider.fetch_data()
         processed_data = provider.process_data(data)
-        provider.save_data(processed_data)
+        images = provider.save_data(processed_data)
+        PROVIDER_IMAGES_SAVED.labels(provider_name).inc(len(images))
+        image_ids = [str(image.id) for image in images if image.image]
+        if image_ids:
+            generate_image_renditions.delay(image_ids)
+        set_job_status(
+            job_kind, provider_name, JOB_SUCCEEDED, images=len(images)
+        )
         logger.info(
-            f"Successfully fetched and saved {len(processed_data)}"
+            f"Successfully fetched and saved {len(images)} "
             f"new images from {provider_name}"
         )
     except Exception as e:
+        PROVIDER_FETCH_ERRORS.labels(provider_name).inc()
+        set_job_status(job_kind, provider_name, JOB_FAILED, error=e)
         logger.error(f"Error fetching photos from {provider_name}: {str(e)}")
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def generate_image_renditions(self, image_ids: List[str]) -> None:
+    """
+    Flags the near-duplicates among downloaded images and generates the
+    resized renditions of the others. Its status is recorded under its
+    task id.
+
+    :param image_ids: The ids of the images.
+    :return: None
+    """
+    job_kind, job_id = "generate_image_renditions", self.request.id
+    set_job_status(job_kind, job_id, JOB_RUNNING, images=len(image_ids))
+    try:
+        originals = flag_duplicates(
+            ExternalImage.objects.filter(id__in=image_ids).order_by(
+                "external_id"
+            )
+        )
+        renditions = create_renditions(originals)
+        set_job_status(
+            job_kind, job_id, JOB_SUCCEEDED, renditions=len(renditions)
+        )
+        logger.info(f"Successfully generated {len(renditions)} renditions")
+    except Exception as e:
+        set_job_status(job_kind, job_id, JOB_FAILED, error=e)
+        logger.error(f"Error generating image renditions: {str(e)}")
+
+
+@shared_task
+def refresh_banner_segments() -> None:
+    """
+    Incrementally refreshes the precomputed memberships
+    of every banner segment.
+
+    :return: None
+    """
+    for segment in BannerSegment.objects.filter(is_deleted=False):
+        try:
+            refresh_segment(segment)
+        except Exception as e:
+            logger.error(f"Error refreshing segment {segment.name}: {str(e)}")
+
+
+# A banner job can outlast the visibility timeout of the broker, which
+# would deliver a late acknowledged message again while it runs. It is
+# acknowledged on start instead: the job is claimed in the database and
+# resume_banner_jobs requeues it if its worker dies.
+@shared_task
+def deliver_banner(job_id: str) -> None:
+    """
+    Runs a banner job, resuming it after its last committed chunk.
+    Jobs already running or completed are skipped.
+
+    :param job_id: The id of the banner job.
+    :return: None
+    """
+    job = BannerJob.objects.filter(id=job_id).first()
+    if not job or not claim_banner_job(job):
+        logger.info(f"Banner job {job_id} is not pending, skipping")
+        return
+    try:
+        created = run_banner_job(job)
+        logger.info(f"Successfully sent banner to {created} chats")
+    except Exception as e:
+        logger.error(f"Error sending banner: {str(e)}")
+
+
+@shared_task
+def resume_banner_jobs() -> None:
+    """
+    Requeues the banner jobs whose worker died: running jobs that did
+    not commit a chunk for BANNER_JOB_STALE_SECONDS.
+
+    :return: None
+    """
+    stale = timezone.now() - timedelta(seconds=BANNER_JOB_STALE_SECONDS)
+    for job_id in BannerJob.objects.filter(
+        status=BannerJob.STATUS_RUNNING, updated_at__lt=stale
+    ).values_list("id", flat=True):
+        # The conditional update keeps two beats from requeuing a job twice.
+        if BannerJob.objects.filter(
+            id=job_id, status=BannerJob.STATUS_RUNNING, updated_at__lt=stale
+        ).update(status=BannerJob.STATUS_PENDING, updated_at=timezone.now()):
+            logger.info(f"Resuming banner job {job_id}")
+            deliver_banner.delay(str(job_id))
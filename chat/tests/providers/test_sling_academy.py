@@ -1,3 +1,4 @@
+from contextlib import nullcontext
 from unittest.mock import patch
 
 import pytest
@@ -6,6 +7,7 @@ from chat.models.image import ExternalImage
 from chat.providers.sling_academy import SlingAcademyProvider
 from core.settings import API_SLING_ACADEMY_URL
 
+SLING_ACADEMY_URL = "https://api.slingacademy.com/v1/sample-data/photos"
 MOCK_SLING_ACADEMY_API_RESPONSE = {
     "success": True,
     "total_photos": 132,
@@ -49,6 +51,16 @@ def test_fetch_data(mock_request, sling_provider):
     )
 
 
+@pytest.mark.django_db
+@patch("chat.providers.sling_academy.API_SLING_ACADEMY_URL", SLING_ACADEMY_URL)
+def test_fetch_data_recorded(recorded_http, sling_provider):
+    recorded_http("sling_academy")
+    result = sling_provider.fetch_data()
+    assert result == MOCK_SLING_ACADEMY_API_RESPONSE
+    data = sling_provider.process_data(result)
+    assert [image["external_id"] for image in data] == [1, 2]
+
+
 @patch("chat.models.image.ExternalImage.objects.filter")
 def test_process_data(mock_filter, sling_provider):
     mock_filter.return_value.exists.return_value = False
@@ -58,13 +70,13 @@ def test_process_data(mock_filter, sling_provider):
 
 
 @pytest.mark.django_db
-@patch("chat.models.image.download_image")
-def test_save_data(mock_download_image, sling_provider):
+@patch("chat.models.image.download_blob", return_value=nullcontext())
+def test_save_data(mock_download_blob, sling_provider):
     mock_data = [
         {"external_id": 1, "url": "http://test.com/1.jpg"},
         {"external_id": 2, "url": "http://test.com/2.jpg"},
     ]
-    sling_provider.save_data(mock_data)
-    mock_download_image.return_value = ""
-    assert mock_download_image.called
+    images = sling_provider.save_data(mock_data)
+    assert mock_download_blob.called
     assert ExternalImage.objects.all().count() == 2
+    assert [image.external_id for image in images] == [1, 2]
@@ -1,14 +1,18 @@
-import json
+from datetime import timedelta
 from unittest.mock import patch
 
 import pytest
 from django.contrib.admin.sites import AdminSite
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
 
 from account.models import CustomUser
 from chat.admin import ChatAdmin
-from chat.models import Chat, ExternalImage, Message
+from chat.banners import create_banner_job, schedule_banner
+from chat.models import BannerJob, Chat, ExternalImage, Message
+from utils.redis import unpack_image_record
 
 MOCK_URL_IMAGE = "http://example.com/another_image.jpg"
 
@@ -132,7 +136,7 @@ def test_update_redis_cache(mock_redis):
     for call in calls:
         args = call[0]
         assert args[0] == "test_cache_key"
-        image_data = json.loads(args[1])
+        image_data = unpack_image_record(args[1])
         assert "id" in image_data
         assert "external_id" in image_data
         assert "url" in image_data
@@ -174,6 +178,27 @@ def test_process_send_banner_form_success(mock_redis, admin_client, chat):
     assert mock_redis.llen.called
 
 
+@pytest.mark.django_db
+@patch("chat.admin.threading.Thread")
+def test_process_send_banner_form_duplicate(
+    mock_thread, admin_client, fake_redis, chat
+):
+    images = ExternalImage.objects.bulk_create(
+        [ExternalImage(external_id=i, url=MOCK_URL_IMAGE) for i in (1, 2)]
+    )
+    url = reverse("admin:process_send_banner_form")
+    data = {"content": "Test banner message", "dedup_key": "key"}
+    admin_client.post(url, data)
+    response = admin_client.post(url, data)
+    assert "This banner was already submitted." in [
+        m.message for m in response.wsgi_request._messages
+    ]
+    assert Message.objects.count() == 1
+    assert BannerJob.objects.get().status == BannerJob.STATUS_COMPLETED
+    assert ExternalImage.objects.filter(was_sent=True).count() == 1
+    assert not ExternalImage.objects.get(id=images[1].id).was_sent
+
+
 @pytest.mark.django_db
 @patch("chat.admin.redis_client")
 @patch("threading.Thread")
@@ -205,3 +230,58 @@ def test_send_banner_to_all_chats_exception(mock, admin_client):
     with pytest.raises(Exception) as excinfo:
         assert response.status_code == 302
         assert "Error sending banners" in excinfo.value.message
+
+
+@pytest.fixture
+def scheduled_job():
+    image = ExternalImage.objects.bulk_create(
+        [ExternalImage(external_id=1, url="http://test.com/1.jpg")]
+    )[0]
+    job, _ = create_banner_job(
+        "key", "Banner", {"id": str(image.id)}, {"type": "all"}
+    )
+    schedule_banner(job, timezone.now() + timedelta(hours=2))
+    return job
+
+
+@pytest.mark.django_db
+def test_change_scheduled_banner_job(admin_client, scheduled_job):
+    url = reverse("admin:chat_bannerjob_change", args=[scheduled_job.id])
+    response = admin_client.get(url)
+    assert 'name="content"' in response.content.decode()
+    assert 'name="send_at"' in response.content.decode()
+
+    send_at = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+    response = admin_client.post(
+        url,
+        {
+            "content": "New banner",
+            "send_at": send_at.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+    )
+    assert response.status_code == 302
+    assert BannerJob.objects.get().content == "New banner"
+    assert PeriodicTask.objects.get().clocked.clocked_time == send_at
+
+
+@pytest.mark.django_db
+def test_change_sent_banner_job_is_read_only(admin_client, scheduled_job):
+    BannerJob.objects.update(status=BannerJob.STATUS_COMPLETED)
+    url = reverse("admin:chat_bannerjob_change", args=[scheduled_job.id])
+    content = admin_client.get(url).content.decode()
+    assert 'name="content"' not in content
+    assert 'name="send_at"' not in content
+
+
+@pytest.mark.django_db
+def test_cancel_jobs_action(admin_client, scheduled_job):
+    response = admin_client.post(
+        reverse("admin:chat_bannerjob_changelist"),
+        {"action": "cancel_jobs", "_selected_action": [scheduled_job.id]},
+        follow=True,
+    )
+    assert "1 jobs cancelled." in [
+        m.message for m in response.context["messages"]
+    ]
+    assert BannerJob.objects.get().status == BannerJob.STATUS_CANCELLED
+    assert not PeriodicTask.objects.get().enabled
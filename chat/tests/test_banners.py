@@ -0,0 +1,301 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
+
+from account.models import CustomUser
+from chat.banners import (
+    cancel_banner,
+    claim_banner_job,
+    create_banner_job,
+    get_audience_chat_ids,
+    get_job_channel,
+    get_scheduled_banner,
+    reschedule_banner,
+    run_banner_job,
+    schedule_banner,
+)
+from chat.forms import BannerMessageForm
+from chat.models import BannerJob, BannerSegment, Chat, ExternalImage, Message
+
+
+@pytest.fixture
+def users():
+    return [CustomUser.objects.create_user(f"testuser_{i}") for i in range(2)]
+
+
+@pytest.fixture
+def chats(users):
+    return [Chat.objects.create(user=user) for user in users]
+
+
+@pytest.mark.django_db
+class TestAudienceChatIds:
+    def test_all_chats(self, chats):
+        Chat.objects.filter(id=chats[1].id).update(is_deleted=True)
+        assert set(get_audience_chat_ids({"type": "all"})) == {chats[0].id}
+
+    def test_user_chats(self, chats, users):
+        audience = {"type": "user", "user_id": str(users[1].id)}
+        assert set(get_audience_chat_ids(audience)) == {chats[1].id}
+
+    def test_creation_window(self, chats):
+        Chat.objects.filter(id=chats[0].id).update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+        audience = {
+            "type": "created",
+            "created_from": (timezone.now() - timedelta(days=1)).isoformat(),
+        }
+        assert set(get_audience_chat_ids(audience)) == {chats[1].id}
+
+    def test_segment_reads_memberships(self, chats, users):
+        segment = BannerSegment.objects.create(name="Segment")
+        segment.users.add(users[0])
+        audience = {"type": "segment", "segment_id": str(segment.id)}
+        assert set(get_audience_chat_ids(audience)) == {chats[0].id}
+        assert segment.memberships.count() == 1
+
+
+@pytest.fixture
+def image():
+    # bulk_create skips ExternalImage.save(), so nothing is downloaded.
+    return ExternalImage.objects.bulk_create(
+        [ExternalImage(external_id=1, url="http://test.com/1.jpg")]
+    )[0]
+
+
+def _create_job(image, rows_per_second=None, dedup_key="key"):
+    job, _ = create_banner_job(
+        dedup_key,
+        "Banner",
+        {"id": str(image.id), "image_path": "images/banner.jpg"},
+        {"type": "all"},
+        rows_per_second=rows_per_second,
+    )
+    return job
+
+
+@pytest.mark.django_db
+def test_audience_chat_ids_after(chats):
+    chat_ids = sorted(chat.id for chat in chats)
+    assert list(get_audience_chat_ids({"type": "all"})) == chat_ids
+    assert (
+        list(get_audience_chat_ids({"type": "all"}, after=chat_ids[0]))
+        == chat_ids[1:]
+    )
+
+
+@pytest.mark.django_db
+def test_create_banner_job_is_idempotent(image):
+    job = _create_job(image)
+    image.refresh_from_db()
+    assert image.was_sent
+
+    ExternalImage.objects.filter(id=image.id).update(was_sent=False)
+    job_again, created = create_banner_job(
+        "key", "Other", {"id": str(image.id)}, {"type": "all"}
+    )
+    assert not created
+    assert job_again == job
+    image.refresh_from_db()
+    assert not image.was_sent
+
+
+@pytest.mark.django_db
+def test_run_banner_job(chats, image):
+    job = _create_job(image)
+    assert claim_banner_job(job)
+    assert not claim_banner_job(job)
+    assert run_banner_job(job) == 2
+    job.refresh_from_db()
+    assert job.status == BannerJob.STATUS_COMPLETED
+    assert job.messages_created == 2
+    assert job.last_chat_id == max(chat.id for chat in chats)
+    assert all(
+        chat.message_count == 1 and chat.last_message_at
+        for chat in Chat.objects.all()
+    )
+    assert (
+        Message.objects.filter(
+            content="Banner", image="images/banner.jpg", banner_job=job
+        ).count()
+        == 2
+    )
+
+
+@pytest.mark.django_db
+@patch("chat.banners.BULK_CREATE_BATCH_SIZE", 2)
+def test_run_banner_job_publishes_progress(chats, image, fake_redis):
+    job = _create_job(image)
+    pubsub = fake_redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(get_job_channel(job.id))
+    pubsub.get_message()
+    claim_banner_job(job)
+    run_banner_job(job)
+
+    events = [json.loads(pubsub.get_message()["data"]) for _ in range(2)]
+    assert events == [
+        {
+            "id": str(job.id),
+            "status": BannerJob.STATUS_RUNNING,
+            "messages_created": 2,
+            "error": "",
+        },
+        {
+            "id": str(job.id),
+            "status": BannerJob.STATUS_COMPLETED,
+            "messages_created": 2,
+            "error": "",
+        },
+    ]
+
+
+@pytest.mark.django_db
+@patch("chat.banners.BULK_CREATE_BATCH_SIZE", 2)
+def test_run_banner_job_resumes_after_crash(chats, users, image):
+    chats += [Chat.objects.create(user=users[0]) for _ in range(3)]
+    job = _create_job(image)
+    claim_banner_job(job)
+    bulk_create = Message.objects.bulk_create
+    calls = []
+
+    def crash_on_second_chunk(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 1:
+            raise Exception("Crash")
+        return bulk_create(*args, **kwargs)
+
+    with patch(
+        "chat.banners.Message.objects.bulk_create", crash_on_second_chunk
+    ), pytest.raises(Exception, match="Crash"):
+        run_banner_job(job)
+    job.refresh_from_db()
+    assert job.status == BannerJob.STATUS_FAILED
+    assert job.messages_created == 2
+    assert Message.objects.count() == 2
+
+    assert claim_banner_job(job)
+    assert run_banner_job(job) == 3
+    job.refresh_from_db()
+    assert job.status == BannerJob.STATUS_COMPLETED
+    assert job.messages_created == 5
+    assert Message.objects.count() == 5
+    assert Message.objects.values("chat").distinct().count() == 5
+
+
+@pytest.mark.django_db
+@patch("chat.banners.time.sleep")
+def test_run_banner_job_throttled(mock_sleep, chats, users, image):
+    chats += [Chat.objects.create(user=users[0]) for _ in range(3)]
+    job = _create_job(image, rows_per_second=2)
+    claim_banner_job(job)
+    assert run_banner_job(job) == 5
+    assert Message.objects.count() == 5
+    # Sleep is mocked, so each delay targets the total elapsed time.
+    assert mock_sleep.call_count == 3
+    assert 2 < mock_sleep.call_args.args[0] <= 2.5
+
+
+@pytest.mark.django_db
+def test_schedule_banner_creates_clocked_task(image):
+    job = _create_job(image, rows_per_second=100)
+    send_at = timezone.now() + timedelta(hours=2)
+    task = schedule_banner(job, send_at)
+    assert task == PeriodicTask.objects.get()
+    assert task.task == "chat.tasks.deliver_banner"
+    assert task.one_off
+    assert task.clocked.clocked_time == send_at
+    assert json.loads(task.kwargs) == {"job_id": str(job.id)}
+
+
+@pytest.mark.django_db
+@patch("chat.tasks.deliver_banner.delay")
+def test_schedule_banner_now(mock_delay, image):
+    job = _create_job(image)
+    assert schedule_banner(job) is None
+    mock_delay.assert_called_once_with(str(job.id))
+
+
+@pytest.mark.django_db
+def test_reschedule_banner(image):
+    job = _create_job(image)
+    schedule_banner(job, timezone.now() + timedelta(hours=2))
+    send_at = timezone.now() + timedelta(days=1)
+    assert reschedule_banner(job, "New banner", send_at)
+    assert BannerJob.objects.get().content == "New banner"
+    assert PeriodicTask.objects.get().clocked.clocked_time == send_at
+
+
+@pytest.mark.django_db
+def test_reschedule_claimed_banner(image):
+    job = _create_job(image)
+    schedule_banner(job, timezone.now() + timedelta(hours=2))
+    stale = BannerJob.objects.get()
+    claim_banner_job(job)
+    assert not reschedule_banner(stale, "New banner", timezone.now())
+    assert BannerJob.objects.get().content == "Banner"
+
+
+@pytest.mark.django_db
+def test_cancel_banner(image):
+    job = _create_job(image)
+    schedule_banner(job, timezone.now() + timedelta(hours=2))
+    assert get_scheduled_banner(job)
+    assert cancel_banner(job)
+    assert BannerJob.objects.get().status == BannerJob.STATUS_CANCELLED
+    assert not PeriodicTask.objects.get().enabled
+    assert get_scheduled_banner(job) is None
+    # A cancelled job is never claimed by the clocked task.
+    assert not claim_banner_job(job)
+
+
+@pytest.mark.django_db
+def test_cancel_claimed_banner(image):
+    job = _create_job(image)
+    claim_banner_job(job)
+    assert not cancel_banner(job)
+    assert BannerJob.objects.get().status == BannerJob.STATUS_RUNNING
+
+
+@pytest.mark.django_db
+class TestBannerMessageForm:
+    def test_defaults_to_all_chats(self):
+        form = BannerMessageForm({"content": "Banner"})
+        assert form.is_valid()
+        assert form.get_audience() == {"type": "all"}
+
+    def test_user_audience(self, users):
+        form = BannerMessageForm(
+            {"content": "Banner", "audience": "user", "username": "testuser_0"}
+        )
+        assert form.is_valid()
+        assert form.get_audience() == {
+            "type": "user",
+            "user_id": str(users[0].id),
+        }
+
+    def test_unknown_user(self):
+        form = BannerMessageForm(
+            {"content": "Banner", "audience": "user", "username": "unknown"}
+        )
+        assert not form.is_valid()
+        assert "username" in form.errors
+
+    @pytest.mark.parametrize("audience", ["created", "segment"])
+    def test_missing_audience_fields(self, audience):
+        form = BannerMessageForm({"content": "Banner", "audience": audience})
+        assert not form.is_valid()
+
+    def test_send_at_in_the_past(self):
+        form = BannerMessageForm(
+            {
+                "content": "Banner",
+                "send_at": timezone.now() - timedelta(hours=1),
+            }
+        )
+        assert not form.is_valid()
+        assert "send_at" in form.errors
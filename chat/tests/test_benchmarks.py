@@ -0,0 +1,68 @@
+import pkgutil
+from io import StringIO
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from chat.benchmarks import SCENARIOS, reset_data, run_scenario
+from chat.management.commands.run_benchmarks import Command
+from utils.redis import REDIS_CLIENT_TARGETS
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_run_scenario(fake_redis, name):
+    result = run_scenario(SCENARIOS[name], 3, fake_redis, repeat=1)
+    assert result["scenario"] == name
+    assert result["size"] == 3
+    assert result["wall_time_s"] > 0
+    assert result["db_queries"] >= 0
+    assert result["process_peak_rss_kb"] > 0
+
+
+@pytest.mark.django_db
+def test_provider_ingestion_scales_queries_with_size(fake_redis):
+    small = run_scenario(SCENARIOS["provider_ingestion"], 2, fake_redis, 1)
+    large = run_scenario(SCENARIOS["provider_ingestion"], 4, fake_redis, 1)
+    assert large["db_queries"] > small["db_queries"]
+
+
+@pytest.mark.django_db
+def test_run_benchmarks_fake_redis(settings):
+    # The Redis cache of the settings must not be reached either.
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://unreachable.invalid:6379/0",
+        }
+    }
+    seen = {}
+
+    def run_benchmarks(scenarios, sizes, repeat, redis_client):
+        seen["clients"] = {
+            target: pkgutil.resolve_name(target)
+            for target in REDIS_CLIENT_TARGETS
+        }
+        reset_data(redis_client)
+        cache.set("key", "value")
+        seen["cached"] = cache.get("key")
+        return []
+
+    command = "chat.management.commands.run_benchmarks"
+    with patch.object(
+        Command, "run_benchmarks", side_effect=run_benchmarks
+    ) as mock_run, patch(f"{command}.connection.creation"), patch(
+        f"{command}.setup_test_environment"
+    ), patch(
+        f"{command}.teardown_test_environment"
+    ):
+        call_command(
+            "run_benchmarks", "--fake-redis", "--sizes", "1", stdout=StringIO()
+        )
+    redis_client = mock_run.call_args.args[3]
+    assert isinstance(redis_client, fakeredis.FakeRedis)
+    assert set(seen["clients"].values()) == {redis_client}
+    assert seen["cached"] == "value"
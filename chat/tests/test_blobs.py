@@ -0,0 +1,190 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+
+from chat.banners import create_banner_job
+from chat.blobs import collect_blobs, release_blobs
+from chat.models import BannerJob, ExternalImage, ImageBlob
+
+
+@pytest.fixture
+def mock_get():
+    with patch("requests.get") as mock:
+        mock.return_value = MagicMock(
+            **{"iter_content.return_value": [b"fake image content"]}
+        )
+        yield mock
+
+
+def make_image(external_id, url=None):
+    return ExternalImage.objects.create(
+        external_id=external_id,
+        url=url or f"https://example.com/{external_id}.jpg",
+    )
+
+
+def age_blobs(seconds=7200):
+    ImageBlob.objects.update(
+        updated_at=timezone.now() - timedelta(seconds=seconds)
+    )
+
+
+@pytest.mark.django_db
+def test_identical_images_share_blob(mock_get, media_root):
+    first = make_image(1)
+    second = make_image(2)
+
+    blob = ImageBlob.objects.get()
+    assert first.blob == second.blob == blob
+    assert first.image.name == second.image.name == blob.name
+    assert blob.name.startswith("images/sha256/")
+    assert blob.ref_count == 2
+    assert [p.name for p in media_root.rglob("*") if p.is_file()] == [
+        f"{blob.sha256}.jpg"
+    ]
+
+
+@pytest.mark.django_db
+def test_extensions_share_blob_file(mock_get, media_root):
+    first = make_image(1, "https://example.com/photo.jpg")
+    second = make_image(2, "https://example.com/photo.jpeg")
+
+    blob = ImageBlob.objects.get()
+    assert first.image.name == second.image.name == blob.name
+    assert blob.ref_count == 2
+    assert [p.name for p in media_root.rglob("*") if p.is_file()] == [
+        f"{blob.sha256}.jpg"
+    ]
+
+
+@pytest.mark.django_db
+def test_same_url_is_not_downloaded_again(mock_get):
+    make_image(1, "https://example.com/photo.jpg")
+    image = make_image(2, "https://example.com/photo.jpg")
+
+    assert mock_get.call_count == 1
+    assert image.blob.name == image.image.name
+    assert ImageBlob.objects.get().ref_count == 2
+
+
+@pytest.mark.django_db
+def test_deleting_images_releases_blob(mock_get):
+    make_image(1)
+    make_image(2)
+
+    ExternalImage.objects.filter(external_id=1).delete()
+    assert ImageBlob.objects.get().ref_count == 1
+    ExternalImage.objects.get(external_id=2).delete()
+    assert ImageBlob.objects.get().ref_count == 0
+
+    release_blobs([ImageBlob.objects.get().id])
+    assert ImageBlob.objects.get().ref_count == 0
+
+
+@pytest.mark.django_db
+def test_acquire_recreates_collected_blob():
+    collected = ImageBlob.objects.create(sha256="a" * 64, name="a", size=1)
+    add_references = ImageBlob.add_references
+
+    def collect_meanwhile(blob_ids):
+        # collect_blobs deletes the unreferenced blob before acquire
+        # adds its reference.
+        ImageBlob.objects.filter(id=collected.id).delete()
+        return add_references(blob_ids)
+
+    with patch.object(
+        ImageBlob, "add_references", side_effect=collect_meanwhile
+    ) as mock_add_references:
+        blob = ImageBlob.acquire("a" * 64, "a", 1)
+
+    assert mock_add_references.call_count == 2
+    assert blob.id != collected.id
+    assert ImageBlob.objects.get().ref_count == 1
+
+
+@pytest.mark.django_db
+def test_acquired_blob_file_is_written_again(mock_get):
+    blob = make_image(1).blob
+    acquire = ImageBlob.acquire
+
+    def collect_meanwhile(*args):
+        # collect_blobs deletes the file while the image downloads.
+        default_storage.delete(blob.name)
+        return acquire(*args)
+
+    with patch.object(ImageBlob, "acquire", side_effect=collect_meanwhile):
+        image = make_image(2, "https://example.com/other.jpg")
+
+    assert image.blob == blob
+    assert default_storage.exists(image.image.name)
+
+
+@pytest.mark.django_db
+def test_same_url_downloads_collected_blob(mock_get):
+    make_image(1, "https://example.com/photo.jpg")
+    add_references = ImageBlob.add_references
+    calls = []
+
+    def collected_first(blob_ids):
+        # The blob of the URL is collected before the reference.
+        calls.append(list(blob_ids))
+        return add_references(calls[-1]) if len(calls) > 1 else set()
+
+    with patch.object(
+        ImageBlob, "add_references", side_effect=collected_first
+    ):
+        image = make_image(2, "https://example.com/photo.jpg")
+
+    assert len(calls) == 2
+    assert mock_get.call_count == 2
+    assert image.blob == ImageBlob.objects.get()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_collect_blobs(mock_get):
+    make_image(1).delete()
+    blob = ImageBlob.objects.get()
+    assert collect_blobs(3600) == (0, 0)
+
+    age_blobs()
+    assert collect_blobs(3600, dry_run=True) == (1, blob.size)
+    assert ImageBlob.objects.exists()
+
+    assert collect_blobs(3600) == (1, blob.size)
+    assert not ImageBlob.objects.exists()
+    assert not default_storage.exists(blob.name)
+
+
+@pytest.mark.django_db
+def test_collect_blobs_keeps_referenced(mock_get):
+    image = make_image(1)
+    ImageBlob.objects.update(ref_count=0)
+    age_blobs()
+    assert collect_blobs(3600) == (0, 0)
+
+    create_banner_job(
+        "key",
+        "Banner",
+        {"id": str(image.id), "image_path": image.image.name},
+        {"type": "all"},
+    )
+    image.delete()
+    age_blobs()
+    assert BannerJob.objects.get().image_path == image.image.name
+    assert collect_blobs(3600) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_gc_image_blobs_command(mock_get, capsys):
+    make_image(1).delete()
+    age_blobs()
+
+    call_command("gc_image_blobs", "--dry-run")
+    assert "Would delete 1 blobs, 18 bytes" in capsys.readouterr().out
+    call_command("gc_image_blobs", "--grace-seconds", "0")
+    assert "Deleted 1 blobs, 18 bytes" in capsys.readouterr().out
+    assert not ImageBlob.objects.exists()
@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import call_command
+
+from account.models import CustomUser
+from chat.counters import reconcile_chat_counters
+from chat.models import Chat, Message
+
+
+@pytest.fixture
+def chats():
+    user = CustomUser.objects.create_user("testuser")
+    return [Chat.objects.create(user=user) for _ in range(3)]
+
+
+@pytest.mark.django_db
+def test_message_save_updates_counters(chats):
+    Message.objects.create(chat=chats[0], content="First")
+    message = Message.objects.create(chat=chats[0], content="Second")
+    message.content = "Edited"
+    message.save()
+
+    chat = Chat.objects.get(id=chats[0].id)
+    assert chat.message_count == 2
+    assert chat.last_message_at == message.created_at
+
+
+@pytest.mark.django_db
+def test_reconcile_chat_counters(chats):
+    # bulk_create skips Message.save(), leaving the counters stale.
+    messages = Message.objects.bulk_create(
+        [Message(chat=chats[0], content="Test") for _ in range(2)]
+    )
+    Chat.objects.filter(id=chats[1].id).update(message_count=5)
+
+    assert reconcile_chat_counters(10) == (3, 2, max(c.id for c in chats))
+    counters = {
+        chat.id: (chat.message_count, chat.last_message_at)
+        for chat in Chat.objects.all()
+    }
+    assert counters[chats[0].id] == (
+        2,
+        max(message.created_at for message in messages),
+    )
+    assert counters[chats[1].id] == (0, None)
+    assert reconcile_chat_counters(10) == (3, 0, max(c.id for c in chats))
+
+
+@pytest.mark.django_db
+def test_reconcile_chat_counters_command(chats, capsys):
+    Message.objects.bulk_create([Message(chat=chats[2], content="Test")])
+    call_command("reconcile_chat_counters", "--batch-size", "2")
+    assert "Checked 3 chats, fixed 1" in capsys.readouterr().out
+    assert Chat.objects.get(id=chats[2].id).message_count == 1
@@ -0,0 +1,85 @@
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from chat.duplicates import find_duplicate, flag_duplicates, get_hash_bands
+from chat.models import ExternalImage
+
+
+def make_image(external_id, image, image_format="PNG"):
+    output = io.BytesIO()
+    image.save(output, format=image_format)
+    return ExternalImage.objects.create(
+        external_id=external_id,
+        image=SimpleUploadedFile(f"{external_id}.jpg", output.getvalue()),
+    )
+
+
+@pytest.fixture
+def radial():
+    return Image.radial_gradient("L").convert("RGB").resize((800, 600))
+
+
+def test_get_hash_bands():
+    assert get_hash_bands(0x0123456789ABCDEF) == [
+        0x0123,
+        0x4567,
+        0x89AB,
+        0xCDEF,
+    ]
+
+
+@pytest.mark.django_db
+def test_flag_duplicates(radial):
+    original = make_image(1, radial)
+    copy = make_image(2, radial.resize((400, 300)), "JPEG")
+    other = make_image(3, Image.linear_gradient("L").resize((800, 600)))
+    unsaved = ExternalImage(external_id=4)
+
+    originals = flag_duplicates([original, copy, other, unsaved])
+
+    assert originals == [original, other]
+    copy.refresh_from_db()
+    assert copy.duplicate_of == original
+    assert copy.dhash is not None
+    assert ExternalImage.objects.filter(duplicate_of__isnull=True).count() == 2
+
+
+@pytest.mark.django_db
+def test_flag_duplicates_is_idempotent(radial):
+    original = make_image(1, radial)
+    copy = make_image(2, radial.resize((400, 300)), "JPEG")
+    flag_duplicates([original, copy])
+
+    images = ExternalImage.objects.order_by("external_id")
+    assert flag_duplicates(images) == [original]
+
+
+@pytest.mark.django_db
+def test_find_duplicate_max_distance(radial):
+    original = make_image(1, radial)
+    flag_duplicates([original])
+    original.refresh_from_db()
+    value = int(original.dhash, 16)
+    image = ExternalImage(external_id=2)
+
+    # Differs from the original in one bit of three bands.
+    changed = value ^ 0x0001000100010000
+    assert find_duplicate(image, changed) == original
+    assert find_duplicate(image, changed, max_distance=2) is None
+    assert find_duplicate(original, value) is None
+
+
+@pytest.mark.django_db
+def test_banner_selection_skips_duplicates(admin_client, radial):
+    original = make_image(1, radial)
+    copy = make_image(2, radial.resize((400, 300)), "JPEG")
+    flag_duplicates([original, copy])
+    ExternalImage.objects.filter(id=original.id).update(was_sent=True)
+
+    response = admin_client.post(
+        "/banners/jobs/", {"content": "Banner", "audience": "all"}
+    )
+    assert response.status_code == 409
@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from account.models import CustomUser
+from chat.models import Chat, Message
+
+
+@pytest.fixture
+def messages():
+    user = CustomUser.objects.create_user("testuser")
+    chat = Chat.objects.create(user=user)
+    return [
+        Message.objects.create(chat=chat, content=f"Message {i}")
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+def test_export_messages_csv(messages):
+    Message.objects.filter(id=messages[0].id).update(is_deleted=True)
+    out = io.StringIO()
+    call_command(
+        "export_data", "message", "--filter=is_deleted=False", stdout=out
+    )
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert {row["content"] for row in rows} == {"Message 1", "Message 2"}
+    assert rows[0]["chat__user__username"] == "testuser"
+
+
+@pytest.mark.django_db
+def test_export_chats_jsonl_to_file(messages, tmp_path):
+    output = tmp_path / "chats.jsonl"
+    out = io.StringIO()
+    call_command(
+        "export_data",
+        "chat",
+        "--format=jsonl",
+        f"--output={output}",
+        stdout=out,
+    )
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert records[0]["message_count"] == 3
+    assert "Exported 1 rows" in out.getvalue()
+
+
+def test_export_invalid_filter():
+    with pytest.raises(CommandError):
+        call_command("export_data", "chat", "--filter=is_deleted")
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from account.models import CustomUser
+from chat.models import Chat, ExternalImage, Message
+
+
+@pytest.fixture
+def chat():
+    user = CustomUser.objects.create_user("testuser")
+    return Chat.objects.create(user=user)
+
+
+def read_rejected(path):
+    return [json.loads(line) for line in open(f"{path}.rejected.jsonl")]
+
+
+@pytest.mark.django_db
+def test_import_images_csv(tmp_path, capsys):
+    ExternalImage.objects.bulk_create(
+        [ExternalImage(external_id=1, url="http://test.com/old.jpg")]
+    )
+    path = tmp_path / "images.csv"
+    path.write_text(
+        "external_id,url,image\n"
+        "1,http://test.com/1.jpg,\n"
+        "2,http://test.com/2.jpg,images/2.jpg\n"
+        "2,http://test.com/2b.jpg,\n"
+        "x,http://test.com/3.jpg,\n"
+        "4,not a url,\n"
+    )
+    call_command("import_data", "image", str(path))
+
+    assert "Imported 1 rows, skipped 1, rejected 3" in capsys.readouterr().out
+    image = ExternalImage.objects.get(external_id=2)
+    assert image.image.name == "images/2.jpg"
+    assert not image.was_sent
+    assert ExternalImage.objects.get(external_id=1).url.endswith("old.jpg")
+    assert [row["line"] for row in read_rejected(path)] == [4, 5, 6]
+
+
+@pytest.mark.django_db
+def test_import_images_update_conflicts(tmp_path):
+    ExternalImage.objects.bulk_create(
+        [
+            ExternalImage(
+                external_id=1, url="http://test.com/old.jpg", image="a.jpg"
+            )
+        ]
+    )
+    path = tmp_path / "images.jsonl"
+    path.write_text('{"external_id": 1, "url": "http://test.com/new.jpg"}\n')
+    call_command("import_data", "image", str(path), "--on-conflict=update")
+
+    image = ExternalImage.objects.get(external_id=1)
+    assert image.url == "http://test.com/new.jpg"
+    assert image.image.name == "a.jpg"
+
+
+@pytest.mark.django_db
+def test_import_messages_jsonl(chat, tmp_path, capsys):
+    path = tmp_path / "messages.jsonl"
+    path.write_text(
+        f'{{"chat": "{chat.id}", "content": "First"}}\n'
+        f'{{"chat_id": "{chat.id}", "content": "Second"}}\n'
+        '{"chat": "8d7f1c1e-2f6b-4f44-9a53-3b5d6c1b0f00", "content": "x"}\n'
+        f'{{"chat": "{chat.id}"}}\n'
+        "not json\n"
+    )
+    call_command("import_data", "message", str(path), "--batch-size=2")
+
+    assert "Imported 2 rows, skipped 0, rejected 3" in capsys.readouterr().out
+    assert set(Message.objects.values_list("content", flat=True)) == {
+        "First",
+        "Second",
+    }
+    chat.refresh_from_db()
+    assert chat.message_count == 2
+    errors = [row["error"] for row in read_rejected(path)]
+    assert errors[0] == "Unknown chat"
+    assert "required" in errors[1]
+    assert errors[2].startswith("Invalid JSON")
+
+
+def test_import_unknown_format(tmp_path):
+    with pytest.raises(CommandError):
+        call_command("import_data", "image", str(tmp_path / "images.txt"))
@@ -1,4 +1,5 @@
 import uuid
+from contextlib import nullcontext
 from unittest.mock import patch
 
 import pytest
@@ -58,12 +59,13 @@ class TestExternalImageModel:
         with pytest.raises(IntegrityError):
             ExternalImage.objects.create(external_id=1, url=MOCK_URL_IMAGE_1)
 
-    @patch("chat.models.image.download_image")
+    @patch("chat.models.image.download_blob", return_value=nullcontext())
     def test_external_image_download(self, mock_download):
         image = ExternalImage.objects.create(
             external_id=2, url=MOCK_URL_IMAGE_2
         )
-        mock_download.assert_called_once_with(MOCK_URL_IMAGE_2, image)
+        mock_download.assert_called_once_with(MOCK_URL_IMAGE_2)
+        assert not image.image
 
 
 @pytest.mark.django_db
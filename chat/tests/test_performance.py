@@ -0,0 +1,143 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from django.contrib.admin.sites import AdminSite
+from django.core.cache import cache
+from django.urls import reverse
+from requests.models import Response
+
+from account.models import CustomUser
+from chat.admin import ChatAdmin
+from chat.models import Chat, ExternalImage, Message
+from chat.tasks import fetch_photos_from_api
+
+MOCK_API_URL = "https://api.example.com/photos"
+
+
+@pytest.fixture(params=[5, 50])
+def chats(request):
+    user = CustomUser.objects.create_user("testuser")
+    return Chat.objects.bulk_create(
+        [Chat(user=user) for _ in range(request.param)]
+    )
+
+
+@pytest.fixture
+def messages(chats):
+    return Message.objects.bulk_create(
+        [Message(chat=chat, content="Test message") for chat in chats]
+    )
+
+
+@pytest.fixture
+def images():
+    return ExternalImage.objects.bulk_create(
+        [
+            ExternalImage(
+                external_id=i,
+                url=f"http://test.com/{i}.jpg",
+                image=f"images/{i}.jpg",
+            )
+            for i in range(1, 41)
+        ]
+    )
+
+
+def fake_http_send(adapter, request, **kwargs):
+    response = Response()
+    response.status_code = 200
+    response.url = request.url
+    if request.url.startswith(MOCK_API_URL):
+        photos = [
+            {"id": i, "url": f"http://test.com/{i}.jpg"} for i in range(1, 11)
+        ]
+        response._content = json.dumps({"photos": photos}).encode()
+    else:
+        response._content = b"fake image content"
+    response._content_consumed = True
+    return response
+
+
+@pytest.mark.django_db
+@patch("chat.admin.threading.Thread")
+def test_banner_send_budget(
+    mock_thread, admin_client, fake_redis, chats, images, operation_budget
+):
+    url = reverse("admin:process_send_banner_form")
+    # Constant per job, whatever the audience size:
+    # - the session user and the image to send;
+    # - the job creation: savepoint, rendition and dedup key lookups,
+    #   get_or_create's insert with its savepoint, the image update and
+    #   release;
+    # - the running and completed status updates, which make sends
+    #   resumable, and the audience query;
+    # - per chunk, a savepoint, the insert, the counters and the resume
+    #   checkpoint, then release;
+    # - Redis: the progress events of the chunk and of the completion.
+    with operation_budget(sql=18, redis=5):
+        admin_client.post(url, {"content": "Test banner"})
+    assert Message.objects.count() == len(chats)
+
+
+@pytest.mark.django_db
+@patch("chat.providers.sling_academy.API_SLING_ACADEMY_URL", MOCK_API_URL)
+@patch("requests.adapters.HTTPAdapter.send", fake_http_send)
+@patch("chat.tasks.generate_image_renditions.delay")
+def test_provider_fetch_budget(mock_renditions, operation_budget):
+    # The offset count and an existence check per photo, then the URL
+    # lookup, the blobs (insert, select, reference) and the insert of
+    # the images, batched.
+    with operation_budget(sql=16, http=11):
+        fetch_photos_from_api("sling_academy")
+    assert ExternalImage.objects.count() == 10
+    assert len(mock_renditions.call_args.args[0]) == 10
+
+
+@pytest.mark.django_db
+def test_chat_cascade_delete_budget(operation_budget):
+    chat = Chat.objects.create(user=CustomUser.objects.create_user("test"))
+    Message.objects.bulk_create(
+        [Message(chat=chat, content="Test message") for _ in range(200)]
+    )
+    # The messages and segment memberships are deleted in one query
+    # each, without loading them, and the cached counts are not
+    # invalidated per row.
+    with patch.object(cache, "incr") as mock_incr, operation_budget(sql=3):
+        chat.delete()
+    mock_incr.assert_not_called()
+    assert not Message.objects.exists()
+
+
+@pytest.mark.django_db
+def test_cache_refill_budget(fake_redis, images, operation_budget):
+    admin_instance = ChatAdmin(Chat, AdminSite())
+    # One RPUSH of every packed record and the EXPIRE.
+    with operation_budget(sql=1, redis=2):
+        admin_instance._update_redis_cache("test_cache_key")
+    assert fake_redis.llen("test_cache_key") == 30
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "admin_url",
+    ["admin:chat_chat_changelist", "admin:chat_message_changelist"],
+)
+def test_changelist_budget(
+    admin_client, messages, admin_url, operation_budget
+):
+    url = reverse(admin_url)
+    # The username filter loads no username.
+    with operation_budget(sql=4, redis=0):
+        response = admin_client.get(url)
+    assert response.status_code == 200
+    # The result and full counts are then cached.
+    with operation_budget(sql=2, redis=0):
+        response = admin_client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.operation_budget(sql=1, redis=0, http=0)
+def test_operation_budget_marker(chats):
+    assert Chat.objects.count() == len(chats)
@@ -0,0 +1,20 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+
+
+def test_profile_imports_module():
+    out = io.StringIO()
+    call_command(
+        "profile_imports", "--module=chat.importers", "--limit=3", stdout=out
+    )
+    output = out.getvalue()
+    assert "modules imported in" in output
+    assert "django" in output
+    assert "Slowest packages" in output
+
+
+def test_profile_imports_failing_import():
+    with pytest.raises(CommandError, match="Importing failed"):
+        call_command("profile_imports", "--module=not_a_module")
@@ -0,0 +1,133 @@
+import hashlib
+import io
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
+
+from chat.banners import create_banner_job
+from chat.blobs import collect_blobs
+from chat.models import ExternalImage, ImageBlob, ImageRendition
+from chat.renditions import create_renditions
+from utils.image import render_images
+from utils.storage import get_rendition_name
+
+
+def make_jpeg():
+    output = io.BytesIO()
+    Image.new("RGB", (1600, 1200), "blue").save(output, format="JPEG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def image():
+    return ExternalImage.objects.create(
+        external_id=1,
+        image=SimpleUploadedFile("photo.jpg", make_jpeg()),
+    )
+
+
+@pytest.fixture
+def downloaded_images():
+    content = make_jpeg()
+    with patch("requests.get") as mock_get:
+        mock_get.return_value = MagicMock(
+            **{"iter_content.return_value": [content]}
+        )
+        return [
+            ExternalImage.objects.create(
+                external_id=external_id,
+                url=f"https://example.com/{external_id}.jpg",
+            )
+            for external_id in (1, 2)
+        ]
+
+
+def age_blobs():
+    ImageBlob.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+
+
+@pytest.mark.django_db
+def test_create_renditions(image):
+    renditions = create_renditions([image, ExternalImage(external_id=2)])
+    sha256 = hashlib.sha256(make_jpeg()).hexdigest()
+    assert {(r.name, r.width, r.height, r.file.name) for r in renditions} == {
+        (
+            "thumbnail",
+            200,
+            150,
+            get_rendition_name(sha256, (200, 200), ".webp"),
+        ),
+        ("banner", 800, 600, get_rendition_name(sha256, (800, 800), ".webp")),
+    }
+    banner = ImageRendition.objects.get(image=image, name="banner")
+    assert banner.size == banner.file.size
+    assert banner.size < image.image.size
+
+    create_renditions([image])
+    assert ImageRendition.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_banner_job_uses_banner_rendition(image):
+    create_renditions([image])
+    job, _ = create_banner_job(
+        "key",
+        "Banner",
+        {"id": str(image.id), "image_path": image.image.name},
+        {"type": "all"},
+    )
+    assert job.image_path == ImageRendition.objects.get(name="banner").file
+
+
+@pytest.mark.django_db
+@patch("chat.renditions.render_images", wraps=render_images)
+def test_images_sharing_blob_share_renditions(mock_render, downloaded_images):
+    renditions = create_renditions(downloaded_images)
+    assert len(renditions) == 4
+    assert len({rendition.file.name for rendition in renditions}) == 2
+    # Each content is resized once.
+    assert len(mock_render.call_args.args[0]) == 1
+    blob = ImageBlob.objects.get()
+    for rendition in renditions:
+        assert rendition.file.name.startswith(blob.name.rsplit(".", 1)[0])
+        assert default_storage.exists(rendition.file.name)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_collect_blobs_deletes_renditions(downloaded_images):
+    renditions = create_renditions(downloaded_images)
+    blob = ImageBlob.objects.get()
+    downloaded_images[0].delete()
+    age_blobs()
+    # Still used by the other image.
+    assert collect_blobs(0) == (0, 0)
+    assert default_storage.exists(renditions[0].file.name)
+
+    downloaded_images[1].delete()
+    age_blobs()
+    assert collect_blobs(0) == (1, blob.size)
+    assert not default_storage.exists(blob.name)
+    for rendition in renditions:
+        assert not default_storage.exists(rendition.file.name)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_collect_blobs_keeps_rendition_sent_by_banner_job(downloaded_images):
+    create_renditions(downloaded_images)
+    image = downloaded_images[0]
+    job, _ = create_banner_job(
+        "key",
+        "Banner",
+        {"id": str(image.id), "image_path": image.image.name},
+        {"type": "all"},
+    )
+    for image in downloaded_images:
+        image.delete()
+    age_blobs()
+    assert collect_blobs(0) == (0, 0)
+    assert default_storage.exists(job.image_path)
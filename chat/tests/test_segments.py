@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from account.models import CustomUser
+from chat.models import BannerSegment, Chat, SegmentMembership
+from chat.segments import get_segment_chats, refresh_segment
+
+
+@pytest.fixture
+def users():
+    return [CustomUser.objects.create_user(f"testuser_{i}") for i in range(2)]
+
+
+@pytest.fixture
+def chats(users):
+    return [Chat.objects.create(user=user) for user in users for _ in range(2)]
+
+
+@pytest.fixture
+def segment(users):
+    segment = BannerSegment.objects.create(name="First user")
+    segment.users.add(users[0])
+    return segment
+
+
+def member_ids(segment):
+    return set(segment.memberships.values_list("chat_id", flat=True))
+
+
+@pytest.mark.django_db
+class TestSegmentChats:
+    def test_filters_by_user(self, segment, chats, users):
+        assert set(get_segment_chats(segment)) == {
+            chat for chat in chats if chat.user == users[0]
+        }
+
+    def test_filters_by_creation_window(self, chats):
+        segment = BannerSegment.objects.create(
+            name="Window", created_from=timezone.now() + timedelta(days=1)
+        )
+        assert not get_segment_chats(segment).exists()
+
+    def test_excludes_deleted_chats(self, segment, chats):
+        Chat.objects.filter(id=chats[0].id).update(is_deleted=True)
+        assert chats[0] not in get_segment_chats(segment)
+
+
+@pytest.mark.django_db
+class TestRefreshSegment:
+    def test_first_refresh_builds_memberships(self, segment, chats):
+        refresh_segment(segment)
+        assert member_ids(segment) == {chats[0].id, chats[1].id}
+        segment.refresh_from_db()
+        assert segment.refreshed_at is not None
+
+    def test_incremental_refresh_adds_new_chats(self, segment, chats, users):
+        refresh_segment(segment)
+        new_chat = Chat.objects.create(user=users[0])
+        Chat.objects.create(user=users[1])
+        refresh_segment(segment)
+        assert member_ids(segment) == {chats[0].id, chats[1].id, new_chat.id}
+
+    def test_incremental_refresh_removes_deleted_chats(self, segment, chats):
+        refresh_segment(segment)
+        Chat.objects.filter(id=chats[0].id).update(is_deleted=True)
+        refresh_segment(segment)
+        assert member_ids(segment) == {chats[1].id}
+
+    def test_incremental_refresh_only_scans_recent_chats(
+        self, segment, chats, users
+    ):
+        refresh_segment(segment)
+        old_chat = Chat.objects.create(user=users[0])
+        Chat.objects.filter(id=old_chat.id).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        refresh_segment(segment)
+        assert old_chat.id not in member_ids(segment)
+        refresh_segment(segment, full=True)
+        assert old_chat.id in member_ids(segment)
+
+    def test_edited_segment_is_rebuilt(self, segment, chats, users):
+        refresh_segment(segment)
+        segment.users.set([users[1]])
+        segment.save()
+        refresh_segment(segment)
+        assert member_ids(segment) == {chats[2].id, chats[3].id}
+
+    def test_memberships_are_unique(self, segment, chats):
+        refresh_segment(segment)
+        refresh_segment(segment)
+        assert SegmentMembership.objects.count() == 2
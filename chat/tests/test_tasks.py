@@ -1,8 +1,18 @@
+from datetime import timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
+from django.utils import timezone
 
-from chat.tasks import fetch_photos_from_api
+from chat.models import BannerJob, ExternalImage
+from chat.tasks import (
+    deliver_banner,
+    fetch_photos_from_api,
+    generate_image_renditions,
+    resume_banner_jobs,
+)
+from core.celery import app, make_psycopg_cooperative
+from utils.jobs import JOB_FAILED, JOB_SUCCEEDED, get_job_status
 
 
 @pytest.fixture
@@ -14,6 +24,9 @@ def mock_provider():
     provider.process_data.return_value = [
         {"external_id": 1, "url": "http://test.com/1.jpg"}
     ]
+    provider.save_data.return_value = [
+        ExternalImage(external_id=1, url="http://test.com/1.jpg")
+    ]
     return provider
 
 
@@ -24,6 +37,9 @@ def test_fetch_photos_from_api(mock_get_provider, mock_provider):
     mock_provider.fetch_data.assert_called_once()
     mock_provider.process_data.assert_called_once()
     mock_provider.save_data.assert_called_once()
+    status = get_job_status("fetch_photos_from_api", "sling_academy")
+    assert status["status"] == JOB_SUCCEEDED
+    assert status["images"] == "1"
 
 
 @patch("chat.tasks.ProviderFactory.get_provider")
@@ -32,3 +48,115 @@ def test_fetch_photos_from_api_exception(mock_get_provider):
     with pytest.raises(Exception) as excinfo:
         fetch_photos_from_api("sling_academy")
         assert "Error" in excinfo.value.message
+    status = get_job_status("fetch_photos_from_api", "sling_academy")
+    assert status["status"] == JOB_FAILED
+    assert status["error"] == "Error test"
+
+
+@pytest.fixture
+def banner_job():
+    return BannerJob.objects.create(
+        dedup_key="key", content="Banner", audience={"type": "all"}
+    )
+
+
+@pytest.mark.django_db
+@patch("chat.tasks.run_banner_job")
+def test_deliver_banner(mock_run_banner_job, banner_job):
+    deliver_banner(str(banner_job.id))
+    mock_run_banner_job.assert_called_once_with(banner_job)
+    banner_job.refresh_from_db()
+    assert banner_job.status == BannerJob.STATUS_RUNNING
+
+
+@pytest.mark.django_db
+@patch("chat.tasks.run_banner_job")
+def test_deliver_banner_skips_completed_job(mock_run_banner_job, banner_job):
+    BannerJob.objects.filter(id=banner_job.id).update(
+        status=BannerJob.STATUS_COMPLETED
+    )
+    deliver_banner(str(banner_job.id))
+    mock_run_banner_job.assert_not_called()
+
+
+@pytest.mark.django_db
+@patch("chat.tasks.deliver_banner.delay")
+def test_resume_banner_jobs(mock_delay, banner_job):
+    BannerJob.objects.filter(id=banner_job.id).update(
+        status=BannerJob.STATUS_RUNNING,
+        updated_at=timezone.now() - timedelta(hours=1),
+    )
+    running = BannerJob.objects.create(
+        dedup_key="running", status=BannerJob.STATUS_RUNNING
+    )
+    resume_banner_jobs()
+    mock_delay.assert_called_once_with(str(banner_job.id))
+    banner_job.refresh_from_db()
+    assert banner_job.status == BannerJob.STATUS_PENDING
+    running.refresh_from_db()
+    assert running.status == BannerJob.STATUS_RUNNING
+
+
+@pytest.mark.django_db
+@patch("chat.tasks.create_renditions")
+@patch("chat.tasks.flag_duplicates")
+def test_generate_image_renditions(
+    mock_flag_duplicates, mock_create_renditions
+):
+    image, duplicate = ExternalImage.objects.bulk_create(
+        [
+            ExternalImage(external_id=1, url="http://test.com/1.jpg"),
+            ExternalImage(external_id=2, url="http://test.com/2.jpg"),
+        ]
+    )
+    mock_flag_duplicates.return_value = [image]
+    result = generate_image_renditions.apply(
+        args=[[str(image.id), str(duplicate.id)]], task_id="task"
+    )
+    assert result.successful()
+    assert list(mock_flag_duplicates.call_args.args[0]) == [image, duplicate]
+    mock_create_renditions.assert_called_once_with([image])
+    status = get_job_status("generate_image_renditions", "task")
+    assert status["status"] == JOB_SUCCEEDED
+
+
+@pytest.mark.parametrize(
+    "task,queue,priority",
+    [
+        (deliver_banner, "fanout", 0),
+        (fetch_photos_from_api, "ingestion", 6),
+        (generate_image_renditions, "renditions", 6),
+        (resume_banner_jobs, "maintenance", 3),
+    ],
+)
+def test_task_routes(task, queue, priority):
+    route = app.amqp.router.route({}, task.name)
+    assert route["queue"].name == queue
+    assert route["priority"] == priority
+
+
+def test_long_tasks_are_acknowledged_late():
+    assert fetch_photos_from_api.acks_late
+    assert generate_image_renditions.acks_late
+    assert not resume_banner_jobs.acks_late
+
+
+def test_banner_deliveries_are_acknowledged_on_start():
+    # They can outlast the visibility timeout, resume_banner_jobs
+    # recovers the jobs of dead workers.
+    assert not deliver_banner.acks_late
+
+
+def test_psycopg_is_patched_under_gevent():
+    pytest.importorskip("gevent")
+    pytest.importorskip("psycogreen")
+    with patch("gevent.monkey.is_module_patched", return_value=True), patch(
+        "psycogreen.gevent.patch_psycopg"
+    ) as mock_patch:
+        make_psycopg_cooperative()
+    mock_patch.assert_called_once_with()
+
+
+def test_results_are_ignored_and_expire():
+    assert app.conf.task_ignore_result
+    assert app.conf.result_expires
@@ -0,0 +1,126 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+
+from account.models import CustomUser
+from chat.models import BannerJob, Chat, ExternalImage
+
+
+@pytest.fixture
+def image():
+    # bulk_create skips ExternalImage.save(), so nothing is downloaded.
+    return ExternalImage.objects.bulk_create(
+        [ExternalImage(external_id=1, url="http://test.com/1.jpg")]
+    )[0]
+
+
+@pytest.fixture
+def job():
+    return BannerJob.objects.create(
+        dedup_key="key",
+        content="Banner",
+        status=BannerJob.STATUS_RUNNING,
+        messages_created=10,
+    )
+
+
+def read_events(response):
+    async def consume():
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    return [
+        json.loads(line.removeprefix("data: "))
+        for line in async_to_sync(consume)().decode().splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+@pytest.mark.django_db
+@patch("chat.tasks.deliver_banner.delay")
+def test_start_banner_job(mock_delay, admin_client, image):
+    Chat.objects.create(user=CustomUser.objects.create_user("testuser"))
+    url = reverse("start_banner_job")
+    data = {"content": "Banner", "dedup_key": "key"}
+
+    response = admin_client.post(url, data)
+    assert response.status_code == 202
+    job = BannerJob.objects.get()
+    assert response.json()["id"] == str(job.id)
+    assert response.json()["events_url"] == reverse(
+        "banner_job_events", args=[job.id]
+    )
+    mock_delay.assert_called_once_with(str(job.id))
+    image.refresh_from_db()
+    assert image.was_sent
+
+    ExternalImage.objects.filter(id=image.id).update(was_sent=False)
+    assert admin_client.post(url, data).status_code == 200
+    assert mock_delay.call_count == 1
+
+
+@pytest.mark.django_db
+def test_start_banner_job_no_image(admin_client):
+    response = admin_client.post(
+        reverse("start_banner_job"), {"content": "Banner"}
+    )
+    assert response.status_code == 409
+
+
+@pytest.mark.django_db
+def test_banner_views_require_staff(client, job):
+    client.force_login(CustomUser.objects.create_user("testuser"))
+    response = client.get(reverse("banner_job_status", args=[job.id]))
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_banner_job_status_long_poll_timeout(admin_client, job):
+    response = admin_client.get(
+        reverse("banner_job_status", args=[job.id]),
+        {"since": "10", "timeout": "0.05"},
+    )
+    assert response.status_code == 200
+    assert response.json()["messages_created"] == 10
+    assert response.json()["status"] == BannerJob.STATUS_RUNNING
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("timeout", ["abc", "nan", "inf", "-1", "0"])
+def test_banner_job_status_invalid_timeout(admin_client, job, timeout):
+    response = admin_client.get(
+        reverse("banner_job_status", args=[job.id]),
+        {"since": "10", "timeout": timeout},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_banner_job_status_not_found(admin_client):
+    url = reverse(
+        "banner_job_status", args=["00000000-0000-0000-0000-000000000000"]
+    )
+    assert admin_client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_banner_job_events(admin_client, job):
+    completed = {
+        "id": str(job.id),
+        "status": BannerJob.STATUS_COMPLETED,
+        "messages_created": 20,
+        "error": "",
+    }
+    with patch(
+        "chat.views._next_progress", AsyncMock(side_effect=[None, completed])
+    ):
+        response = admin_client.get(
+            reverse("banner_job_events", args=[job.id])
+        )
+        assert response["Content-Type"] == "text/event-stream"
+        events = read_events(response)
+
+    assert [event["messages_created"] for event in events] == [10, 20]
+    assert events[-1]["status"] == BannerJob.STATUS_COMPLETED
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from chat.views import banner_job_events, banner_job_status, start_banner_job
+
+urlpatterns = [
+    path("jobs/", start_banner_job, name="start_banner_job"),
+    path("jobs/<uuid:job_id>/", banner_job_status, name="banner_job_status"),
+    path(
+        "jobs/<uuid:job_id>/events/",
+        banner_job_events,
+        name="banner_job_events",
+    ),
+]
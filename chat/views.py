@@ -0,0 +1,184 @@
+import json
+import math
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+
+from chat.banners import (
+    create_banner_job,
+    get_job_channel,
+    get_job_progress,
+    schedule_banner,
+)
+from chat.forms import BannerMessageForm
+from chat.models import BannerJob, ExternalImage
+from utils.permissions import has_modify_permissions
+from utils.redis import get_async_redis_client
+
+ACTIVE_STATUSES = (BannerJob.STATUS_PENDING, BannerJob.STATUS_RUNNING)
+LONG_POLL_TIMEOUT = 25
+SSE_KEEPALIVE_SECONDS = 15
+
+
+async def _has_banner_permissions(request) -> bool:
+    user = await request.auser()
+    if not (user.is_active and user.is_staff):
+        return False
+    return await sync_to_async(has_modify_permissions)(user, "chat", "message")
+
+
+def _forbidden() -> JsonResponse:
+    return JsonResponse({"error": "Permission denied"}, status=403)
+
+
+async def _get_job(job_id: str) -> BannerJob:
+    job = await BannerJob.objects.filter(id=job_id).afirst()
+    if job is None:
+        raise Http404("Banner job not found")
+    return job
+
+
+async def _next_progress(pubsub, timeout: float) -> Optional[Dict[str, Any]]:
+    """
+    Wait for the next progress event of a subscribed job channel.
+
+    :param pubsub: The subscribed asyncio pubsub.
+    :param timeout: Maximum time to wait, in seconds.
+    :return: The published progress, None on timeout.
+    """
+    message = await pubsub.get_message(
+        ignore_subscribe_messages=True, timeout=timeout
+    )
+    return json.loads(message["data"]) if message else None
+
+
+@require_POST
+async def start_banner_job(request) -> JsonResponse:
+    """
+    Validate a banner form and queue its job on the Celery workers.
+
+    :param request: The current request object.
+    :return: JSON progress of the job with the URLs to follow it.
+    """
+    if not await _has_banner_permissions(request):
+        return _forbidden()
+    form = BannerMessageForm(request.POST)
+    if not await sync_to_async(form.is_valid)():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    image = await (
+        ExternalImage.objects.filter(was_sent=False, duplicate_of__isnull=True)
+        .order_by("external_id")
+        .afirst()
+    )
+    if not image:
+        return JsonResponse(
+            {"error": "No new image available to send in banners"},
+            status=409,
+        )
+    job, created = await sync_to_async(create_banner_job)(
+        form.cleaned_data.get("dedup_key") or uuid.uuid4().hex,
+        form.cleaned_data["content"],
+        {
+            "id": str(image.id),
+            "image_path": image.image.name if image.image else None,
+        },
+        form.get_audience(),
+        rows_per_second=form.cleaned_data.get("rows_per_second"),
+    )
+    if created:
+        await sync_to_async(schedule_banner)(
+            job, send_at=form.cleaned_data.get("send_at")
+        )
+
+    progress = get_job_progress(job)
+    progress["status_url"] = reverse("banner_job_status", args=[job.id])
+    progress["events_url"] = reverse("banner_job_events", args=[job.id])
+    return JsonResponse(progress, status=202 if created else 200)
+
+
+@require_GET
+async def banner_job_status(request, job_id: str) -> JsonResponse:
+    """
+    Long poll the progress of a banner job. With ``since`` set to the
+    last seen number of messages, wait until the job progresses or
+    ``timeout`` seconds, positive and at most ``LONG_POLL_TIMEOUT``,
+    pass before answering.
+
+    :param request: The current request object.
+    :param job_id: The id of the job.
+    :return: JSON progress of the job.
+    """
+    if not await _has_banner_permissions(request):
+        return _forbidden()
+    since = request.GET.get("since")
+    try:
+        timeout = float(request.GET.get("timeout", LONG_POLL_TIMEOUT))
+    except ValueError:
+        timeout = math.nan
+    if not (math.isfinite(timeout) and timeout > 0):
+        return JsonResponse({"error": "Invalid timeout"}, status=400)
+    timeout = min(timeout, LONG_POLL_TIMEOUT)
+
+    client = get_async_redis_client()
+    pubsub = client.pubsub()
+    try:
+        # Subscribe before reading the job so no event is missed.
+        await pubsub.subscribe(get_job_channel(job_id))
+        progress = get_job_progress(await _get_job(job_id))
+        if (
+            since is not None
+            and progress["status"] in ACTIVE_STATUSES
+            and str(progress["messages_created"]) == since
+        ):
+            progress = await _next_progress(pubsub, timeout) or progress
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+    return JsonResponse(progress)
+
+
+async def _iter_job_events(job_id: str) -> AsyncIterator[str]:
+    client = get_async_redis_client()
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(get_job_channel(job_id))
+        progress = get_job_progress(await _get_job(job_id))
+        yield f"data: {json.dumps(progress)}\n\n"
+        while progress["status"] in ACTIVE_STATUSES:
+            event = await _next_progress(pubsub, SSE_KEEPALIVE_SECONDS)
+            if event is None:
+                # Events are best effort, the database has the truth.
+                event = get_job_progress(await _get_job(job_id))
+            if event == progress:
+                yield ": keepalive\n\n"
+                continue
+            progress = event
+            yield f"data: {json.dumps(progress)}\n\n"
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+@require_GET
+async def banner_job_events(request, job_id: str):
+    """
+    Stream the progress of a banner job as Server-Sent Events until it
+    completes or fails. Waiting for events does not hold a thread.
+
+    :param request: The current request object.
+    :param job_id: The id of the job.
+    :return: The event stream.
+    """
+    if not await _has_banner_permissions(request):
+        return _forbidden()
+    await _get_job(job_id)
+    return StreamingHttpResponse(
+        _iter_job_events(job_id),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
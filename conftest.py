@@ -0,0 +1,315 @@
+import base64
+import json
+import os
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.base.creation import TEST_DATABASE_PREFIX
+from pytest_django.plugin import blocking_manager_key
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from utils.profiling import operation_budget as budget
+from utils.redis import REDIS_CLIENT_TARGETS
+from utils.replicas import REPLICA_DATABASE
+
+# Environment variable giving the xdist workers the name of the
+# pre-migrated template database their test databases are copied from.
+TEMPLATE_DB_ENV = "PYTEST_TEMPLATE_DB"
+# Recorded responses are read from this directory next to the tests.
+HTTP_RECORDINGS_DIRECTORY = "recordings"
+
+
+def pytest_addoption(parser) -> None:
+    """
+    Add the --record-http option.
+
+    :param parser: The pytest argument parser.
+    """
+    parser.addoption(
+        "--record-http",
+        action="store_true",
+        default=False,
+        help="Send the requests of the recorded_http fixture to the real "
+        "servers and overwrite their recordings.",
+    )
+
+
+def pytest_configure(config) -> None:
+    """
+    Register the operation_budget marker, use an in-memory cache and no
+    replica database.
+
+    :param config: The pytest config object.
+    """
+    # Tests never reach the Redis cache, each process gets its own.
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    # Tests run against the primary only, as without a replica.
+    if settings.DATABASES.pop(REPLICA_DATABASE, None):
+        settings.MIDDLEWARE = [
+            name
+            for name in settings.MIDDLEWARE
+            if name != "utils.middleware.ReplicaPinningMiddleware"
+        ]
+    # Hashing the passwords of the test users with PBKDF2 dominates the
+    # fixtures creating them.
+    settings.PASSWORD_HASHERS = [
+        "django.contrib.auth.hashers.MD5PasswordHasher"
+    ]
+    config.addinivalue_line(
+        "markers",
+        "operation_budget(sql=None, redis=None, http=None, seconds=None): "
+        "fail the test when its body exceeds the given number of SQL "
+        "queries, Redis commands, HTTP requests or seconds.",
+    )
+
+
+def pytest_sessionstart(session) -> None:
+    """
+    Migrate the template database once in the xdist controller, before
+    the workers start, so each worker copies it instead of running every
+    migration. Only PostgreSQL creates databases from a template.
+
+    :param session: The pytest session.
+    """
+    config = session.config
+    if hasattr(config, "workerinput"):
+        return
+    if getattr(config.option, "dist", "no") == "no":
+        return
+    connection = connections["default"]
+    if connection.vendor != "postgresql":
+        return
+
+    settings_dict = connection.settings_dict
+    name, test_name = settings_dict["NAME"], settings_dict["TEST"]["NAME"]
+    template_name = f"{test_name or TEST_DATABASE_PREFIX + name}_template"
+    settings_dict["TEST"]["NAME"] = template_name
+    try:
+        with config.stash[blocking_manager_key].unblock():
+            # Kept between runs, only new migrations are applied to it.
+            connection.creation.create_test_db(
+                verbosity=0,
+                autoclobber=True,
+                serialize=False,
+                keepdb=not config.getoption("create_db"),
+            )
+            # Databases are not copied while a session is connected.
+            connection.close()
+    finally:
+        settings_dict["NAME"], settings_dict["TEST"]["NAME"] = name, test_name
+        settings.DATABASES[connection.alias]["NAME"] = name
+    os.environ[TEMPLATE_DB_ENV] = template_name
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix,
+) -> None:
+    """
+    Create the test database of every xdist worker, named after the
+    worker, from the template database migrated by the controller.
+    """
+    template_name = os.environ.get(TEMPLATE_DB_ENV)
+    if template_name:
+        connections["default"].settings_dict["TEST"][
+            "TEMPLATE"
+        ] = template_name
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """
+    Enforce the operation_budget marker around the test body only, so
+    fixture setup does not count against the budget.
+
+    :param item: The test item being run.
+    """
+    marker = item.get_closest_marker("operation_budget")
+    if marker is None:
+        return (yield)
+    with budget(*marker.args, **marker.kwargs):
+        return (yield)
+
+
+@pytest.fixture
+def operation_budget():
+    """
+    Fixture giving access to the operation_budget context manager, to
+    limit a single operation within a test.
+    """
+    return budget
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path) -> Path:
+    """
+    Store the files saved by every test in its own temporary directory
+    instead of the project's media directory.
+    """
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Start every test with an empty cache.
+    """
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def fake_redis():
+    """
+    Replace the shared Redis clients, sync and asyncio, with an empty
+    in-memory fakeredis server for every test, so tests never reach a
+    Redis server and never see each other's keys.
+    """
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    with ExitStack() as stack:
+        for target in REDIS_CLIENT_TARGETS:
+            stack.enter_context(patch(target, client))
+        stack.enter_context(
+            patch(
+                "chat.views.get_async_redis_client",
+                lambda: fakeredis.aioredis.FakeRedis(server=server),
+            )
+        )
+        yield client
+
+
+class HTTPRecording:
+    """
+    Outbound HTTP requests of a test, answered from a recording: a JSON
+    list of the method, URL, status, headers and body of the responses.
+    When recording, the requests are sent and the recording overwritten.
+    """
+
+    def __init__(self, path: Path, record: bool):
+        self.path = path
+        self.record = record
+        self.entries: List[Dict[str, Any]] = []
+        if not record:
+            with open(path, encoding="utf-8") as file:
+                self.entries = json.load(file)
+        self.unmatched: List[str] = []
+        self._send = HTTPAdapter.send
+
+    def send(
+        self, adapter: HTTPAdapter, request, **kwargs
+    ) -> requests.Response:
+        """
+        Answer a request from the recording, or send and record it.
+
+        :param adapter: The transport adapter of the session.
+        :param request: The prepared request.
+        :param kwargs: Other arguments of the adapter.
+        :return: The response.
+        :raises requests.ConnectionError: If the request is not recorded.
+        """
+        if self.record:
+            response = self._send(adapter, request, **kwargs)
+            self.entries.append(self._to_entry(request, response))
+            return response
+        for entry in self.entries:
+            if (entry["method"], entry["url"]) == (
+                request.method,
+                request.url,
+            ):
+                return self._to_response(request, entry)
+        self.unmatched.append(f"{request.method} {request.url}")
+        raise requests.ConnectionError(
+            f"No recorded response for {request.method} {request.url}"
+        )
+
+    def _to_entry(self, request, response: requests.Response) -> Dict:
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "headers": {
+                "Content-Type": response.headers.get("Content-Type", "")
+            },
+        }
+        if "json" in entry["headers"]["Content-Type"]:
+            entry["json"] = response.json()
+        else:
+            entry["body_base64"] = base64.b64encode(response.content).decode()
+        return entry
+
+    def _to_response(self, request, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        if "json" in entry:
+            response._content = json.dumps(entry["json"]).encode()
+        else:
+            response._content = base64.b64decode(entry.get("body_base64", ""))
+        response._content_consumed = True
+        return response
+
+    def save(self) -> None:
+        """
+        Write the recorded responses.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(self.entries, file, indent=2)
+            file.write("\n")
+
+
+@pytest.fixture
+def recorded_http(request):
+    """
+    Fixture answering the outbound HTTP requests of a test from a
+    recording in the ``recordings`` directory next to the test module.
+    Requests missing from the recording fail the test. Run pytest with
+    ``--record-http`` to send them to the real servers and overwrite
+    the recordings::
+
+        def test_fetch_data(recorded_http):
+            recorded_http("sling_academy")
+    """
+    recordings = []
+
+    def use(name: str) -> HTTPRecording:
+        recording = HTTPRecording(
+            request.path.parent / HTTP_RECORDINGS_DIRECTORY / f"{name}.json",
+            request.config.getoption("record_http"),
+        )
+        recordings.append(recording)
+        patcher = patch.object(
+            HTTPAdapter,
+            "send",
+            lambda adapter, *args, **kwargs: recording.send(
+                adapter, *args, **kwargs
+            ),
+        )
+        patcher.start()
+        request.addfinalizer(patcher.stop)
+        return recording
+
+    yield use
+    for recording in recordings:
+        if recording.record:
+            recording.save()
+        assert (
+            not recording.unmatched
+        ), f"Requests missing from {recording.path}: {recording.unmatched}"
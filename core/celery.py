@@ -1,11 +1,115 @@
 from __future__ import absolute_import, unicode_literals
 
 import os
+import sys
 
 from celery import Celery
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+    worker_ready,
+)
+from kombu import Queue
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
+# Queues by workload, so an ingestion backlog never delays banners:
+# - fanout: banner deliveries, long and time-sensitive
+# - ingestion: provider fetches and image downloads, I/O bound
+# - renditions: processing of the downloaded images, CPU bound
+# - maintenance: periodic housekeeping
+# Workers pick their queues with -Q, see the worker services of
+# docker-compose.yml.
+TASK_QUEUES = (
+    Queue("fanout"),
+    Queue("ingestion"),
+    Queue("renditions"),
+    Queue("maintenance"),
+    Queue("celery"),
+)
+
+# With the Redis broker, priority 0 is the highest. Messages are
+# grouped in the PRIORITY_STEPS of their queue.
+PRIORITY_STEPS = [0, 3, 6, 9]
+TASK_ROUTES = {
+    "chat.tasks.deliver_banner": {"queue": "fanout", "priority": 0},
+    "chat.tasks.fetch_photos_from_api": {"queue": "ingestion", "priority": 6},
+    "chat.tasks.generate_image_renditions": {
+        "queue": "renditions",
+        "priority": 6,
+    },
+    "chat.tasks.resume_banner_jobs": {"queue": "maintenance", "priority": 3},
+    "chat.tasks.refresh_banner_segments": {
+        "queue": "maintenance",
+        "priority": 6,
+    },
+}
+
 app = Celery("core")
 app.config_from_object("django.conf:settings", namespace="CELERY")
+app.conf.update(
+    task_queues=TASK_QUEUES,
+    task_routes=TASK_ROUTES,
+    task_default_queue="celery",
+    task_default_priority=6,
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+        "queue_order_strategy": "priority",
+        # Messages not acknowledged within this time are delivered
+        # again, so tasks acknowledged late must finish within it.
+        # Banner deliveries can run for longer: they are acknowledged
+        # when they start and resumed by resume_banner_jobs instead.
+        "visibility_timeout": 3600,
+    },
+)
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def make_psycopg_cooperative(**kwargs):
+    # psycopg2 waits for the database in C, blocking every greenlet of a
+    # gevent pool, unless its wait callback yields to the gevent hub.
+    if "gevent" in sys.modules:
+        from gevent import monkey
+
+        if monkey.is_module_patched("socket"):
+            from psycogreen.gevent import patch_psycopg
+
+            patch_psycopg()
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    from utils.metrics import task_started
+    from utils.profiling import start_task_profiling
+
+    task_started(task_id)
+    start_task_profiling(task_id)
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    from utils.metrics import task_finished
+    from utils.profiling import finish_task_profiling
+
+    finish_task_profiling(task_id, task.name)
+    task_finished(task_id, task.name, state)
+
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs):
+    port = os.getenv("CELERY_METRICS_PORT")
+    if port:
+        from utils.metrics import start_metrics_server
+
+        start_metrics_server(int(port))
+
+
+@worker_process_shutdown.connect
+def release_process_metrics(pid=None, **kwargs):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid or os.getpid())
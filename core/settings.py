@@ -5,6 +5,8 @@ from pathlib import Path
 from celery.schedules import crontab
 from django.core.management.utils import get_random_secret_key
 
+from utils.database import get_database_config, get_replica_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 DEBUG = os.getenv("DEBUG", True)
@@ -51,8 +53,17 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compiled templates are kept in memory by every process.
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -69,17 +80,28 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# Connection settings can be tuned per process type, e.g.
+# WORKER_DB_CONN_MAX_AGE overrides DB_CONN_MAX_AGE in Celery workers.
+PROCESS_TYPE = os.getenv("PROCESS_TYPE", "web")
 
 DATABASES = {
-    "default": {
-        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
-        "NAME": os.getenv("DB_NAME", "pure_app_db"),
-        "USER": os.getenv("DB_USER", "user"),
-        "PASSWORD": os.getenv("DB_PASS", "pure_app_db"),
-        "HOST": os.getenv("DB_HOST", "db"),
-        "PORT": os.getenv("DB_PORT", "5432"),
-    },
+    "default": get_database_config(PROCESS_TYPE),
 }
+# Read replica of the admin changelists, searches and exports, see
+# utils.replicas. Sessions read from the primary for REPLICA_PIN_SECONDS
+# after they write.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+replica_config = get_replica_config(PROCESS_TYPE)
+if replica_config:
+    DATABASES["replica"] = replica_config
+    DATABASE_ROUTERS = ["utils.replicas.ReplicaRouter"]
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index(
+            "django.contrib.sessions.middleware.SessionMiddleware"
+        )
+        + 1,
+        "utils.middleware.ReplicaPinningMiddleware",
+    )
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -120,6 +142,10 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "account.CustomUser"
+AUTHENTICATION_BACKENDS = ["utils.permissions.CachedModelBackend"]
+# Permissions of a user are cached in Redis for this long, see
+# utils.permissions
+PERMISSION_CACHE_TIMEOUT = int(os.getenv("PERMISSION_CACHE_TIMEOUT", 300))
 
 STATIC_URL = "/static/"
 
@@ -128,11 +154,29 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 # Celery
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER", "redis://redis:6379/0")
-CELERY_RESULT_BACKEND = os.environ.get("CELERY_BROKER", "redis://redis:6379/0")
-CELERY_ACCEPT_CONTENT = ["json"]
-CELERY_TASK_SERIALIZER = "json"
-CELERY_RESULT_SERIALIZER = "json"
+CELERY_RESULT_BACKEND = os.environ.get(
+    "CELERY_BACKEND", "redis://redis:6379/2"
+)
+# No task result is stored unless its task sets ignore_result=False, and
+# stored results expire. Long jobs record their status in utils.jobs.
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_EXPIRES = int(os.getenv("CELERY_RESULT_EXPIRES", 3600))
+# Statuses of utils.jobs expire this long after their last update
+JOB_STATUS_TTL = int(os.getenv("JOB_STATUS_TTL", 86400))
+# msgpack payloads are smaller and faster to encode than JSON. JSON is
+# still accepted for the messages queued before the switch.
+CELERY_ACCEPT_CONTENT = ["msgpack", "json"]
+CELERY_TASK_SERIALIZER = "msgpack"
+CELERY_RESULT_SERIALIZER = "msgpack"
+CELERY_RESULT_ACCEPT_CONTENT = ["msgpack", "json"]
 CELERY_TIMEZONE = "UTC"
+# Long tasks should not hold prefetched messages other workers could
+# run. I/O workers raise it with --prefetch-multiplier.
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(
+    os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", 1)
+)
+# Also runs the one-off clocked tasks of scheduled banners.
+CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
 # Celery beat configuration
 PROVIDERS_CONFIG = {
@@ -145,11 +189,83 @@ for provider, config in PROVIDERS_CONFIG.items():
         "schedule": crontab(minute=f'*/{config["interval_minutes"]}'),
         "args": (provider,),
     }
+CELERY_BEAT_SCHEDULE["refresh_banner_segments"] = {
+    "task": "chat.tasks.refresh_banner_segments",
+    "schedule": crontab(minute="*/5"),
+}
+CELERY_BEAT_SCHEDULE["resume_banner_jobs"] = {
+    "task": "chat.tasks.resume_banner_jobs",
+    "schedule": crontab(minute="*/5"),
+}
 API_SLING_ACADEMY_URL = os.getenv("API_SLING_ACADEMY_URL", "")
 
 
 BULK_CREATE_BATCH_SIZE = int(os.getenv("BULK_CREATE_BATCH_SIZE", 500))
+# Running banner jobs without a committed chunk for this long are resumed
+BANNER_JOB_STALE_SECONDS = int(os.getenv("BANNER_JOB_STALE_SECONDS", 600))
+
+# Renditions generated for every downloaded image: name -> maximum size
+IMAGE_RENDITIONS = {
+    "thumbnail": (200, 200),
+    "banner": (800, 800),
+}
+IMAGE_RENDITION_FORMAT = os.getenv("IMAGE_RENDITION_FORMAT", "WEBP")
+IMAGE_RENDITION_QUALITY = int(os.getenv("IMAGE_RENDITION_QUALITY", 80))
+# Processes resizing the images. 0 resizes them in the calling process.
+IMAGE_RENDITION_WORKERS = int(os.getenv("IMAGE_RENDITION_WORKERS", 2))
+# Images whose perceptual hashes differ by at most this many bits are
+# duplicates. Above 3 the 4-band index of chat.duplicates misses some.
+IMAGE_DUPLICATE_MAX_DISTANCE = int(
+    os.getenv("IMAGE_DUPLICATE_MAX_DISTANCE", 3)
+)
+# Image blobs released for less than this are not garbage-collected
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", 3600))
 
 # Redis
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_CACHE_DB = int(os.getenv("REDIS_CACHE_DB", 1))
+
+# Cache, in its own Redis database. Every entry expires, so Redis can
+# evict them under its volatile-lru policy without touching the Celery
+# queues. Bump CACHE_VERSION to drop every entry on deploy.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_CACHE_DB}",
+        "KEY_PREFIX": "pure_app",
+        "VERSION": int(os.getenv("CACHE_VERSION", 1)),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", 300)),
+    }
+}
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+# Admin changelists show the planner estimate of counts above this
+# threshold, and cache exact counts below it, see utils.counts
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", 100000))
+COUNT_CACHE_TIMEOUT = int(os.getenv("COUNT_CACHE_TIMEOUT", 60))
+# Usernames suggested by the changelist username filters
+USERNAME_AUTOCOMPLETE_LIMIT = int(os.getenv("USERNAME_AUTOCOMPLETE_LIMIT", 20))
+
+# Networks of the clients allowed to scrape /metrics, comma separated.
+# Only local clients by default.
+METRICS_ALLOWED_NETWORKS = [
+    network.strip()
+    for network in os.getenv(
+        "METRICS_ALLOWED_NETWORKS", "127.0.0.0/8,::1/128"
+    ).split(",")
+    if network.strip()
+]
+
+# Profiling of requests and Celery tasks, see utils.profiling
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.05"))
+PROFILING_SLOW_MS = int(os.getenv("PROFILING_SLOW_MS", 1000))
+PROFILING_MAX_SQL_QUERIES = int(os.getenv("PROFILING_MAX_SQL_QUERIES", 30))
+PROFILING_SLOW_SQL_MS = int(os.getenv("PROFILING_SLOW_SQL_MS", 300))
+PROFILING_MAX_REDIS_COMMANDS = int(
+    os.getenv("PROFILING_MAX_REDIS_COMMANDS", 50)
+)
+PROFILING_MAX_HTTP_REQUESTS = int(os.getenv("PROFILING_MAX_HTTP_REQUESTS", 10))
+PROFILING_TOP_STATEMENTS = int(os.getenv("PROFILING_TOP_STATEMENTS", 5))
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(0, "utils.middleware.OperationProfilingMiddleware")
@@ -1,8 +1,15 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+from django.urls import include, path
+
+from utils.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("banners/", include("chat.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# The ASGI server does not serve static files like runserver does.
+urlpatterns += staticfiles_urlpatterns()
@@ -1,9 +1,10 @@
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib import admin
 from django.test import RequestFactory
 
 from chat.models import Chat
-from utils.admin_actions import delete_elements
+from utils.admin_actions import delete_elements, export_as_csv, export_as_jsonl
 
 
 @pytest.fixture
@@ -34,3 +35,20 @@ def test_delete_elements(admin_user, chat_instances, num_selected):
     for chat in chat_instances[num_selected:]:
         chat.refresh_from_db()
         assert not chat.is_deleted
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("action", [export_as_csv, export_as_jsonl])
+def test_export_actions(admin_user, chat_instances, action):
+    request = RequestFactory().get("/")
+    request.user = admin_user
+    model_admin = admin.ModelAdmin(Chat, admin.site)
+
+    response = action(model_admin, request, Chat.objects.all())
+
+    async def consume():
+        return b"".join([chunk async for chunk in response])
+
+    lines = async_to_sync(consume)().decode().splitlines()
+    assert len(lines) == len(chat_instances) + (action == export_as_csv)
+    assert "user_id" in lines[0]
@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.urls import reverse
+
+from account.models import CustomUser
+from chat.models import Chat
+
+
+@pytest.fixture
+def users():
+    return [
+        CustomUser.objects.create_user(username, f"{username}@example.com")
+        for username in ("alice", "albert", "bob")
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "admin_url,lookup",
+    [
+        ("admin:chat_chat_changelist", "user__username"),
+        ("admin:chat_message_changelist", "chat__user__username"),
+    ],
+)
+def test_username_filter_renders_no_username(
+    admin_client, users, admin_url, lookup
+):
+    response = admin_client.get(reverse(admin_url), {"is_deleted__exact": 0})
+    content = response.content.decode()
+
+    assert response.status_code == 200
+    assert f'name="{lookup}"' in content
+    assert 'name="is_deleted__exact" value="0"' in content
+    assert "albert" not in content
+    assert reverse("admin:account_customuser_autocomplete") in content
+
+
+@pytest.mark.django_db
+def test_username_filter_filters_changelist(admin_client, users):
+    Chat.objects.bulk_create([Chat(user=user) for user in users])
+    response = admin_client.get(
+        reverse("admin:chat_chat_changelist"), {"user__username": "alice"}
+    )
+    assert response.context["cl"].result_count == 1
+    assert 'value="alice"' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_username_autocomplete(admin_client, users):
+    url = reverse("admin:account_customuser_autocomplete")
+    response = admin_client.get(url, {"term": "al"})
+    assert response.json() == {"results": ["albert", "alice"]}
+
+    with patch("account.admin.USERNAME_AUTOCOMPLETE_LIMIT", 1):
+        assert admin_client.get(url, {"term": "al"}).json() == {
+            "results": ["albert"]
+        }
+
+
+@pytest.mark.django_db
+def test_username_autocomplete_requires_staff(client):
+    response = client.get(reverse("admin:account_customuser_autocomplete"))
+    assert response.status_code == 302
+
+
+@pytest.mark.django_db
+def test_username_autocomplete_requires_view_permission(
+    client, users, django_capture_on_commit_callbacks
+):
+    staff = CustomUser.objects.create_user(
+        "staff", "staff@example.com", "password", is_staff=True
+    )
+    client.force_login(staff)
+    url = reverse("admin:account_customuser_autocomplete")
+    assert client.get(url, {"term": "al"}).status_code == 403
+
+    # The cached permissions are invalidated on commit.
+    with django_capture_on_commit_callbacks(execute=True):
+        staff.user_permissions.add(
+            Permission.objects.get(codename="view_customuser")
+        )
+    response = client.get(url, {"term": "al"})
+    assert response.json() == {"results": ["albert", "alice"]}
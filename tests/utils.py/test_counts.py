@@ -0,0 +1,124 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from chat.banners import claim_banner_job, create_banner_job, run_banner_job
+from chat.models import Chat, Message
+from utils.counts import (
+    CountPaginator,
+    get_count,
+    get_estimated_count,
+    invalidate_counts,
+)
+
+
+@pytest.fixture
+def chats(admin_user):
+    return Chat.objects.bulk_create([Chat(user=admin_user) for _ in range(3)])
+
+
+@pytest.mark.django_db
+def test_get_count_is_cached(chats, django_assert_num_queries):
+    queryset = Chat.objects.all()
+    assert get_count(queryset) == 3
+    with django_assert_num_queries(0):
+        assert get_count(queryset) == 3
+    assert get_count(queryset.filter(id=chats[0].id)) == 1
+
+
+@pytest.mark.django_db
+def test_writes_invalidate_counts(chats, admin_user):
+    assert get_count(Chat.objects.all()) == 3
+    Chat.objects.create(user=admin_user)
+    assert get_count(Chat.objects.all()) == 4
+
+    Chat.objects.bulk_create([Chat(user=admin_user)])
+    assert get_count(Chat.objects.all()) == 4
+    invalidate_counts(Chat)
+    assert get_count(Chat.objects.all()) == 5
+
+
+@pytest.mark.django_db
+@patch("utils.counts.get_estimated_count", return_value=250000)
+def test_get_count_uses_estimate_above_threshold(
+    mock_estimate, chats, django_assert_num_queries
+):
+    with django_assert_num_queries(0):
+        assert get_count(Chat.objects.all()) == 250000
+    assert get_count(Chat.objects.all(), threshold=10**6) == 3
+
+
+@pytest.mark.django_db
+def test_get_estimated_count(chats):
+    assert get_estimated_count(Chat.objects.all()) is None
+
+    cursor = MagicMock()
+    cursor.fetchone.return_value = [json.dumps([{"Plan": {"Plan Rows": 42}}])]
+    with patch.object(connection, "vendor", "postgresql"), patch.object(
+        connection, "cursor"
+    ) as mock_cursor:
+        mock_cursor.return_value.__enter__.return_value = cursor
+        assert get_estimated_count(Chat.objects.all()) == 42
+    assert cursor.execute.call_args.args[0].startswith("EXPLAIN")
+
+
+@pytest.mark.django_db
+def test_count_paginator(chats):
+    paginator = CountPaginator(Chat.objects.order_by("id"), 2)
+    assert paginator.count == 3
+    assert paginator.num_pages == 2
+
+
+@pytest.mark.django_db
+@patch("utils.counts.get_estimated_count", return_value=250000)
+def test_changelist_shows_estimated_counts(mock_estimate, admin_client, chats):
+    response = admin_client.get(reverse("admin:chat_chat_changelist"))
+    changelist = response.context["cl"]
+    assert changelist.result_count == 250000
+    assert changelist.full_result_count == 250000
+    assert changelist.show_full_result_count
+    assert len(changelist.result_list) == 3
+
+
+@pytest.mark.django_db
+def test_banner_job_invalidates_message_counts(chats):
+    assert get_count(Message.objects.all()) == 0
+    job, _ = create_banner_job(
+        "key", "Banner", {"id": None, "image_path": None}, {"type": "all"}
+    )
+    claim_banner_job(job)
+    with patch("chat.banners.publish_event"):
+        run_banner_job(job)
+    assert get_count(Message.objects.all()) == 3
+
+
+@pytest.mark.django_db
+def test_admin_delete_invalidates_counts(admin_client, chats):
+    Message.objects.bulk_create(
+        [Message(chat=chat, content="Test") for chat in chats]
+    )
+    assert get_count(Chat.objects.all()) == 3
+    assert get_count(Message.objects.all()) == 3
+
+    response = admin_client.post(
+        reverse("admin:chat_chat_delete", args=[chats[0].id]), {"post": "yes"}
+    )
+    assert response.status_code == 302
+    assert get_count(Chat.objects.all()) == 2
+    assert get_count(Message.objects.all()) == 2
+
+
+@pytest.mark.django_db
+def test_soft_delete_action_invalidates_counts(admin_client, chats):
+    assert get_count(Chat.objects.filter(is_deleted=False)) == 3
+    admin_client.post(
+        reverse("admin:chat_chat_changelist"),
+        {
+            "action": "delete_elements",
+            "_selected_action": [str(chats[0].id)],
+        },
+    )
+    assert get_count(Chat.objects.filter(is_deleted=False)) == 2
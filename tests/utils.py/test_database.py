@@ -0,0 +1,66 @@
+import pytest
+
+from utils.database import (
+    get_database_config,
+    get_env_setting,
+    get_replica_config,
+)
+
+
+def test_get_env_setting_prefers_process_type():
+    environ = {"DB_CONN_MAX_AGE": "60", "WORKER_DB_CONN_MAX_AGE": "600"}
+    assert get_env_setting("DB_CONN_MAX_AGE", "0", "worker", environ) == "600"
+    assert get_env_setting("DB_CONN_MAX_AGE", "0", "web", environ) == "60"
+    assert get_env_setting("DB_CONN_MAX_AGE", "0", "web", {}) == "0"
+
+
+def test_default_config_uses_persistent_connections():
+    config = get_database_config("web", {})
+    assert config["CONN_MAX_AGE"] == 60
+    assert config["CONN_HEALTH_CHECKS"]
+    assert not config["DISABLE_SERVER_SIDE_CURSORS"]
+    assert config["OPTIONS"] == {"connect_timeout": 5}
+
+
+def test_worker_config_overrides():
+    environ = {
+        "WORKER_DB_CONN_MAX_AGE": "0",
+        "WORKER_DB_CONN_HEALTH_CHECKS": "0",
+    }
+    config = get_database_config("worker", environ)
+    assert config["CONN_MAX_AGE"] == 0
+    assert not config["CONN_HEALTH_CHECKS"]
+    assert get_database_config("web", environ)["CONN_MAX_AGE"] == 60
+
+
+def test_pgbouncer_disables_server_side_cursors():
+    config = get_database_config("web", {"DB_PGBOUNCER": "1"})
+    assert config["DISABLE_SERVER_SIDE_CURSORS"]
+
+
+def test_sqlite_config_has_no_postgres_options():
+    config = get_database_config(
+        "web", {"DB_ENGINE": "django.db.backends.sqlite3"}
+    )
+    assert config["OPTIONS"] == {}
+
+
+def test_pool_falls_back_without_support(monkeypatch):
+    monkeypatch.setattr("utils.database.django.VERSION", (5, 0, 7))
+    with pytest.warns(UserWarning, match="DB_POOL"):
+        config = get_database_config("web", {"DB_POOL": "1"})
+    assert "pool" not in config["OPTIONS"]
+    assert config["CONN_MAX_AGE"] == 60
+
+
+def test_replica_config():
+    assert get_replica_config("web", {}) is None
+    config = get_replica_config(
+        "web", {"DB_REPLICA_HOST": "replica", "DB_NAME": "app"}
+    )
+    assert (config["HOST"], config["PORT"], config["NAME"]) == (
+        "replica",
+        "5432",
+        "app",
+    )
+    assert config["TEST"] == {"MIRROR": "default"}
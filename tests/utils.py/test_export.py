@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import StreamingHttpResponse
+
+from chat.models import Chat
+from utils.export import (
+    get_export_fields,
+    iter_export,
+    streaming_export_response,
+)
+
+
+@pytest.fixture
+def chats(admin_user):
+    return [Chat.objects.create(user=admin_user) for _ in range(3)]
+
+
+def test_get_export_fields():
+    fields = get_export_fields(Chat)
+    assert "user_id" in fields
+    assert "user" not in fields
+
+
+@pytest.mark.django_db
+def test_iter_export_csv(chats):
+    lines = list(
+        iter_export(
+            Chat.objects.order_by("pk"),
+            ["id", "user__username"],
+            "csv",
+            chunk_size=2,
+        )
+    )
+    rows = list(csv.reader(io.StringIO("".join(lines))))
+    assert rows[0] == ["id", "user__username"]
+    assert rows[1:] == [
+        [str(chat.id), "admin"] for chat in sorted(chats, key=lambda c: c.pk)
+    ]
+
+
+@pytest.mark.django_db
+def test_iter_export_jsonl(chats):
+    lines = list(
+        iter_export(Chat.objects.all(), ["id", "created_at"], "jsonl")
+    )
+    assert len(lines) == 3
+    record = json.loads(lines[0])
+    assert set(record) == {"id", "created_at"}
+
+
+def test_iter_export_unsupported_format():
+    with pytest.raises(ValueError):
+        iter_export(Chat.objects.all(), ["id"], "xml")
+
+
+@pytest.mark.django_db
+def test_streaming_export_response(chats):
+    response = streaming_export_response(
+        Chat.objects.all(), ["id"], "jsonl", "chat"
+    )
+    assert isinstance(response, StreamingHttpResponse)
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert response["Content-Disposition"] == (
+        'attachment; filename="chat.jsonl"'
+    )
+    # Streamed by ASGI servers without reading the whole export first.
+    assert response.is_async
+
+    async def consume():
+        return [chunk async for chunk in response]
+
+    chunks = async_to_sync(consume)()
+    assert len(b"".join(chunks).splitlines()) == 3
+
+
+@pytest.mark.django_db
+@patch("utils.export.EXPORT_CHUNK_SIZE", 2)
+def test_streaming_export_response_chunks(chats):
+    response = streaming_export_response(
+        Chat.objects.all(), ["id"], "csv", "chat"
+    )
+
+    async def consume():
+        return [chunk async for chunk in response]
+
+    # The header and two rows, then the last row.
+    assert [len(chunk.splitlines()) for chunk in async_to_sync(consume)()] == [
+        2,
+        2,
+    ]
@@ -1,39 +1,113 @@
+import io
 from unittest.mock import MagicMock, patch
 
+import billiard
 import pytest
+import requests
+from PIL import Image
 
-from chat.models import ExternalImage
-from utils.image import download_image
+from utils.image import (
+    dhash,
+    download_blob,
+    hamming_distance,
+    render_image,
+    render_images,
+)
 
 
 @pytest.fixture
 def mock_response():
     mock = MagicMock()
-    mock.content = b"fake image content"
+    mock.iter_content.return_value = [b"fake image", b" content"]
     return mock
 
 
-@pytest.mark.django_db
-@pytest.mark.parametrize(
-    "url,field_name",
-    [
-        ("http://test.com/photo_test.jpg", "image"),
-    ],
-)
-def test_download_image_success(url, field_name, mock_response):
+def test_download_blob_success(mock_response):
     with patch("requests.get", return_value=mock_response):
-        model_instance = ExternalImage()
-        download_image(url, model_instance, field_name)
-        assert getattr(model_instance, field_name).name.startswith("images/")
+        with download_blob("http://test.com/photo_test.JPG") as blob:
+            assert blob.name.startswith("images/sha256/")
+            assert blob.name.endswith(".jpg")
+            assert blob.size == len(b"fake image content")
+            blob.file.seek(0)
+            assert blob.file.read() == b"fake image content"
 
 
-@pytest.mark.django_db
 @patch("logging.Logger.error")
-@patch("utils.image.requests.get")
-def test_download_image_failure(mock_request, mock_logger):
-    mock_request.side_effect = Exception("Network error")
-    with pytest.raises(Exception):
-        model_instance = ExternalImage()
-        download_image("http://example.com/image.jpg", model_instance)
-        assert mock_logger.assert_called_once()
-        assert not model_instance.image
+@patch("requests.get")
+def test_download_blob_failure(mock_request, mock_logger):
+    mock_request.side_effect = requests.ConnectionError("Network error")
+    with download_blob("http://example.com/image.jpg") as blob:
+        assert blob is None
+    mock_logger.assert_called_once()
+
+
+def make_image(size=(400, 300), mode="RGB", image_format="PNG"):
+    output = io.BytesIO()
+    Image.new(mode, size, "red").save(output, format=image_format)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "P", "L"])
+def test_render_image(mode):
+    data, width, height = render_image(make_image(mode=mode), (200, 200))
+    assert (width, height) == (200, 150)
+    with Image.open(io.BytesIO(data)) as rendition:
+        assert rendition.format == "WEBP"
+        assert rendition.size == (200, 150)
+
+
+def test_render_image_does_not_upscale():
+    _, width, height = render_image(make_image(size=(100, 50)), (200, 200))
+    assert (width, height) == (100, 50)
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_render_images(workers):
+    with patch("utils.image.IMAGE_RENDITION_WORKERS", workers), patch(
+        "utils.image._rendition_executor", None
+    ):
+        renditions = render_images(
+            {"a": make_image(), "broken": b"not an image"},
+            {"small": (40, 40), "large": (200, 200)},
+        )
+    assert {key: value[1:] for key, value in renditions.items()} == {
+        ("a", "small"): (40, 30),
+        ("a", "large"): (200, 150),
+    }
+
+
+def render_in_pool_child(data):
+    with patch("utils.image.IMAGE_RENDITION_WORKERS", 2), patch(
+        "utils.image._rendition_executor", None
+    ):
+        return render_images({"a": data}, {"small": (40, 40)})
+
+
+def test_render_images_in_daemonic_process():
+    # Children of the prefork Celery pool are daemonic and cannot start
+    # the rendition process pool.
+    with billiard.Pool(1) as pool:
+        renditions = pool.apply(render_in_pool_child, (make_image(),))
+    assert renditions[("a", "small")][1:] == (40, 30)
+
+
+def encode(image, image_format="PNG", **kwargs):
+    output = io.BytesIO()
+    image.save(output, format=image_format, **kwargs)
+    return output.getvalue()
+
+
+def test_dhash_matches_resized_copies():
+    original = Image.radial_gradient("L").convert("RGB").resize((800, 600))
+    value = dhash(encode(original))
+    copy = dhash(encode(original.resize((400, 300)), "JPEG", quality=60))
+    other = dhash(encode(Image.linear_gradient("L").resize((800, 600))))
+
+    assert 0 <= value < 2**64
+    assert hamming_distance(value, copy) <= 3
+    assert hamming_distance(value, other) > 10
+
+
+def test_hamming_distance():
+    assert hamming_distance(0b1011, 0b1011) == 0
+    assert hamming_distance(0b1011, 0b0110) == 3
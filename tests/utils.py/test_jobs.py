@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+import redis
+
+from core.settings import JOB_STATUS_TTL
+from utils.jobs import (
+    JOB_FAILED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    get_job_key,
+    get_job_status,
+    set_job_status,
+)
+
+
+def test_set_job_status(fake_redis):
+    set_job_status("fetch", "provider", JOB_RUNNING)
+    set_job_status("fetch", "provider", JOB_SUCCEEDED, images=3)
+    status = get_job_status("fetch", "provider")
+    assert status["status"] == JOB_SUCCEEDED
+    assert status["images"] == "3"
+    assert "updated_at" in status
+    assert (
+        0
+        < fake_redis.ttl(get_job_key("fetch", "provider"))
+        <= (JOB_STATUS_TTL)
+    )
+
+
+def test_new_run_replaces_previous_status(fake_redis):
+    set_job_status("fetch", "provider", JOB_RUNNING)
+    set_job_status("fetch", "provider", JOB_FAILED, error="boom")
+    set_job_status("fetch", "provider", JOB_RUNNING)
+    set_job_status("fetch", "provider", JOB_SUCCEEDED, images=3)
+    status = get_job_status("fetch", "provider")
+    assert status["status"] == JOB_SUCCEEDED
+    assert status["images"] == "3"
+    assert "error" not in status
+
+
+def test_get_job_status_unknown_job(fake_redis):
+    assert get_job_status("fetch", "unknown") is None
+
+
+def test_set_job_status_redis_error():
+    with patch("utils.jobs.redis_client") as mock_redis:
+        mock_redis.pipeline.side_effect = redis.ConnectionError("down")
+        set_job_status("fetch", "provider", JOB_FAILED, error="boom")
@@ -0,0 +1,93 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from prometheus_client import REGISTRY
+
+from chat.models import ExternalImage
+from chat.tasks import fetch_photos_from_api
+from utils.image import download_blob
+from utils.metrics import (
+    is_metrics_client_allowed,
+    task_finished,
+    task_started,
+)
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    content = response.content.decode()
+    assert "banner_messages_created_total" in content
+    assert "provider_fetch_duration_seconds" in content
+
+
+def test_metrics_endpoint_rejects_other_clients(client):
+    response = client.get("/metrics", REMOTE_ADDR="203.0.113.7")
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize(
+    "address,allowed",
+    [
+        ("10.1.2.3", True),
+        ("127.0.0.1", False),
+        ("203.0.113.7", False),
+        ("unknown", False),
+    ],
+)
+def test_is_metrics_client_allowed(address, allowed):
+    with patch("utils.metrics.METRICS_ALLOWED_NETWORKS", ["10.0.0.0/8"]):
+        assert is_metrics_client_allowed(address) is allowed
+
+
+@pytest.mark.django_db
+@patch("requests.get")
+def test_download_blob_metrics(mock_get):
+    mock_get.return_value = MagicMock(
+        **{"iter_content.return_value": [b"123", b"45"]}
+    )
+    downloaded = sample("image_download_bytes_total")
+    count = sample("image_download_duration_seconds_count")
+
+    with download_blob("http://test.com/photo_test.jpg"):
+        pass
+
+    assert sample("image_download_bytes_total") == downloaded + 5
+    assert sample("image_download_duration_seconds_count") == count + 1
+
+
+@patch("chat.tasks.ProviderFactory.get_provider")
+def test_provider_metrics(mock_get_provider):
+    labels = {"provider": "sling_academy"}
+    provider = mock_get_provider.return_value
+    provider.process_data.return_value = [
+        {"external_id": 1},
+        {"external_id": 2},
+    ]
+    # Only the images actually created are counted.
+    provider.save_data.return_value = [ExternalImage(external_id=1)]
+    saved = sample("provider_images_saved_total", labels)
+    errors = sample("provider_fetch_errors_total", labels)
+
+    fetch_photos_from_api("sling_academy")
+    provider.fetch_data.side_effect = Exception("Error test")
+    fetch_photos_from_api("sling_academy")
+
+    assert sample("provider_images_saved_total", labels) == saved + 1
+    assert sample("provider_fetch_errors_total", labels) == errors + 1
+
+
+def test_task_duration_metrics():
+    labels = {"task": "chat.tasks.test", "state": "SUCCESS"}
+    count = sample("celery_task_duration_seconds_count", labels)
+
+    task_started("task-id")
+    task_finished("task-id", "chat.tasks.test", "SUCCESS")
+    task_finished("unknown-id", "chat.tasks.test", "SUCCESS")
+
+    assert sample("celery_task_duration_seconds_count", labels) == count + 1
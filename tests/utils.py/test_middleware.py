@@ -0,0 +1,139 @@
+import logging
+import time
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from account.models import CustomUser
+from utils.middleware import (
+    REPLICA_PIN_SESSION_KEY,
+    OperationProfilingMiddleware,
+    ReplicaPinningMiddleware,
+)
+from utils.replicas import get_read_database
+
+
+@pytest.fixture
+def profiling_settings(settings):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    settings.PROFILING_MAX_SQL_QUERIES = 2
+    return settings
+
+
+def n_plus_one_view(request):
+    for _ in range(3):
+        CustomUser.objects.filter(username="testuser").exists()
+    return HttpResponse("ok")
+
+
+@pytest.mark.django_db
+def test_middleware_logs_slow_request(profiling_settings, caplog):
+    middleware = OperationProfilingMiddleware(n_plus_one_view)
+    with caplog.at_level(logging.WARNING, logger="utils.profiling"):
+        response = middleware(RequestFactory().get("/admin/chat/chat/"))
+    assert response.status_code == 200
+    assert "Slow operation GET /admin/chat/chat/" in caplog.text
+    assert "sql_queries=3" in caplog.text
+    assert "3x" in caplog.text
+    assert "account_customuser" in caplog.text
+
+
+@pytest.mark.django_db
+def test_middleware_logs_slow_async_request(profiling_settings, caplog):
+    async def async_view(request):
+        for _ in range(3):
+            await CustomUser.objects.filter(username="testuser").aexists()
+        return HttpResponse("ok")
+
+    middleware = OperationProfilingMiddleware(async_view)
+    assert iscoroutinefunction(middleware)
+    with caplog.at_level(logging.WARNING, logger="utils.profiling"):
+        response = async_to_sync(middleware)(RequestFactory().get("/"))
+    assert response.status_code == 200
+    assert "Slow operation GET /" in caplog.text
+    assert "sql_queries=3" in caplog.text
+
+
+@pytest.mark.django_db
+def test_middleware_ignores_fast_request(profiling_settings, caplog):
+    profiling_settings.PROFILING_MAX_SQL_QUERIES = 5
+    middleware = OperationProfilingMiddleware(n_plus_one_view)
+    with caplog.at_level(logging.WARNING, logger="utils.profiling"):
+        middleware(RequestFactory().get("/"))
+    assert "Slow operation" not in caplog.text
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("enabled,sample_rate", [(False, 1.0), (True, 0.0)])
+def test_middleware_skips_unsampled_requests(
+    profiling_settings, caplog, enabled, sample_rate
+):
+    profiling_settings.PROFILING_ENABLED = enabled
+    profiling_settings.PROFILING_SAMPLE_RATE = sample_rate
+    middleware = OperationProfilingMiddleware(n_plus_one_view)
+    with caplog.at_level(logging.WARNING, logger="utils.profiling"):
+        middleware(RequestFactory().get("/"))
+    assert "Slow operation" not in caplog.text
+
+
+def session_request(method: str = "get"):
+    request = getattr(RequestFactory(), method)("/admin/chat/chat/")
+    SessionMiddleware(lambda request: None).process_request(request)
+    return request
+
+
+@pytest.mark.django_db
+def test_replica_pinning_after_write(settings):
+    settings.DATABASE_ROUTERS = ["utils.replicas.ReplicaRouter"]
+
+    def create_user_view(request):
+        CustomUser.objects.create_user("testuser")
+        return HttpResponse("ok")
+
+    request = session_request("post")
+    ReplicaPinningMiddleware(create_user_view)(request)
+    assert request.session[REPLICA_PIN_SESSION_KEY] > time.time()
+
+
+@pytest.mark.django_db
+def test_replica_pinning_ignores_reads(settings):
+    settings.DATABASE_ROUTERS = ["utils.replicas.ReplicaRouter"]
+    request = session_request()
+    ReplicaPinningMiddleware(n_plus_one_view)(request)
+    assert REPLICA_PIN_SESSION_KEY not in request.session
+
+
+@patch("utils.replicas.has_replica", return_value=True)
+def test_pinned_session_reads_from_primary(mock_has_replica):
+    databases = []
+
+    def view(request):
+        databases.append(get_read_database())
+        return HttpResponse("ok")
+
+    request = session_request()
+    ReplicaPinningMiddleware(view)(request)
+    request.session[REPLICA_PIN_SESSION_KEY] = time.time() + 5
+    ReplicaPinningMiddleware(view)(request)
+    assert databases == ["replica", "default"]
+
+
+@pytest.mark.django_db
+def test_replica_pinning_async(settings):
+    settings.DATABASE_ROUTERS = ["utils.replicas.ReplicaRouter"]
+
+    async def create_user_view(request):
+        await CustomUser.objects.acreate(username="testuser")
+        return HttpResponse("ok")
+
+    middleware = ReplicaPinningMiddleware(create_user_view)
+    assert iscoroutinefunction(middleware)
+    request = session_request("post")
+    response = async_to_sync(middleware)(request)
+    assert response.status_code == 200
+    assert request.session[REPLICA_PIN_SESSION_KEY] > time.time()
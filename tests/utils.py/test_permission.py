@@ -1,8 +1,11 @@
+from unittest.mock import patch
+
 import pytest
-from django.contrib.auth.models import Permission
+import redis
+from django.contrib.auth.models import Group, Permission
 
 from account.models import CustomUser
-from utils.permissions import has_modify_permissions
+from utils.permissions import get_permission_cache_key, has_modify_permissions
 
 
 @pytest.fixture
@@ -29,3 +32,64 @@ def test_has_modify_permissions(user_with_permissions, app, module, expected):
     assert (
         has_modify_permissions(user_with_permissions, app, module) == expected
     )
+
+
+def reload_user(user):
+    # A new request gets a new user object, without in-memory caches.
+    return CustomUser.objects.get(pk=user.pk)
+
+
+@pytest.mark.django_db
+def test_permissions_cached_across_requests(
+    user_with_permissions, fake_redis, django_assert_num_queries
+):
+    assert has_modify_permissions(user_with_permissions, "chat", "chat")
+    assert fake_redis.exists(
+        get_permission_cache_key(user_with_permissions.pk)
+    )
+
+    user = reload_user(user_with_permissions)
+    with django_assert_num_queries(0):
+        assert has_modify_permissions(user, "chat", "chat")
+        assert not has_modify_permissions(user, "chat", "message")
+        assert user.has_module_perms("chat")
+
+
+@pytest.mark.django_db
+def test_user_permission_change_invalidates_cache(
+    user_with_permissions, fake_redis, django_capture_on_commit_callbacks
+):
+    assert not has_modify_permissions(user_with_permissions, "chat", "message")
+    with django_capture_on_commit_callbacks(execute=True):
+        user_with_permissions.user_permissions.add(
+            Permission.objects.get(codename="add_message")
+        )
+
+    user = reload_user(user_with_permissions)
+    assert has_modify_permissions(user, "chat", "message")
+
+
+@pytest.mark.django_db
+def test_group_permission_change_invalidates_cache(
+    user_with_permissions, fake_redis, django_capture_on_commit_callbacks
+):
+    group = Group.objects.create(name="editors")
+    user_with_permissions.groups.add(group)
+    assert not has_modify_permissions(user_with_permissions, "chat", "message")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        group.permissions.add(Permission.objects.get(codename="add_message"))
+    user = reload_user(user_with_permissions)
+    assert has_modify_permissions(user, "chat", "message")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        group.delete()
+    user = reload_user(user_with_permissions)
+    assert not has_modify_permissions(user, "chat", "message")
+
+
+@pytest.mark.django_db
+def test_permissions_without_redis(user_with_permissions):
+    with patch("utils.permissions.redis_client") as mock_redis:
+        mock_redis.get.side_effect = redis.ConnectionError("Redis down")
+        assert has_modify_permissions(user_with_permissions, "chat", "chat")
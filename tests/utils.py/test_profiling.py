@@ -0,0 +1,139 @@
+import logging
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import requests
+from requests.models import Response
+
+from account.models import CustomUser
+from utils.profiling import (
+    OperationBudgetExceeded,
+    OperationTracker,
+    finish_task_profiling,
+    operation_budget,
+    parse_importtime,
+    profile_imports,
+    start_task_profiling,
+)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.mark.django_db
+def test_tracker_counts_sql_queries():
+    with OperationTracker() as tracker:
+        CustomUser.objects.count()
+        CustomUser.objects.exists()
+    assert tracker.stats.sql_count == 2
+    assert tracker.stats.sql_time > 0
+
+
+def test_tracker_counts_redis_commands(redis_client):
+    with OperationTracker() as tracker:
+        redis_client.set("key", "value")
+        redis_client.get("key")
+    assert tracker.stats.redis_count == 2
+
+
+def test_tracker_counts_pipeline_as_one_round_trip(redis_client):
+    with OperationTracker() as tracker:
+        pipeline = redis_client.pipeline()
+        pipeline.set("key", "value")
+        pipeline.get("key")
+        pipeline.execute()
+    assert tracker.stats.redis_count == 1
+
+
+def test_nested_trackers(redis_client):
+    with OperationTracker() as outer:
+        redis_client.set("key", "value")
+        with OperationTracker() as inner:
+            redis_client.get("key")
+    assert outer.stats.redis_count == 2
+    assert inner.stats.redis_count == 1
+
+
+def test_tracker_ignores_operations_outside_block(redis_client):
+    with OperationTracker() as tracker:
+        pass
+    redis_client.set("key", "value")
+    assert tracker.stats.as_dict()["redis_count"] == 0
+
+
+@pytest.mark.django_db
+def test_operation_budget_within_limits(redis_client):
+    with operation_budget(sql=1, redis=1, http=0) as tracker:
+        CustomUser.objects.count()
+        redis_client.get("key")
+    assert tracker.stats.sql_count == 1
+
+
+@pytest.mark.django_db
+def test_operation_budget_exceeded(redis_client):
+    with pytest.raises(OperationBudgetExceeded, match="SQL queries: 2 > 1"):
+        with operation_budget(sql=1):
+            CustomUser.objects.count()
+            CustomUser.objects.exists()
+
+
+@patch("requests.adapters.HTTPAdapter.send")
+def test_operation_budget_counts_http_requests(mock_send):
+    mock_send.return_value = Response()
+    mock_send.return_value.status_code = 200
+    with pytest.raises(OperationBudgetExceeded, match="HTTP requests"):
+        with operation_budget(http=0):
+            requests.get("http://test.com")
+
+
+def test_tracker_captures_top_statements(redis_client):
+    with OperationTracker(capture_statements=True) as tracker:
+        redis_client.get("key")
+        redis_client.get("key")
+        redis_client.set("key", "value")
+    top = tracker.top_statements()
+    assert {item["statement"]: item["count"] for item in top} == {
+        "GET": 2,
+        "SET": 1,
+    }
+    assert top[0]["kind"] == "redis"
+
+
+@pytest.mark.django_db
+def test_task_profiling_logs_slow_task(settings, caplog):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    settings.PROFILING_MAX_SQL_QUERIES = 0
+    with caplog.at_level(logging.WARNING, logger="utils.profiling"):
+        start_task_profiling("task-id")
+        CustomUser.objects.count()
+        finish_task_profiling("task-id", "chat.tasks.test")
+    assert "Slow operation task chat.tasks.test[task-id]" in caplog.text
+    assert "sql_queries=1" in caplog.text
+
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       149 |        149 |   _io\n"
+        "import time:      1635 |      38890 | redis\n"
+        "Traceback or any other line\n"
+    )
+    times = parse_importtime(output)
+    assert [(t.module, t.self_us, t.cumulative_us) for t in times] == [
+        ("_io", 149, 149),
+        ("redis", 1635, 38890),
+    ]
+
+
+def test_django_setup_does_not_import_heavy_clients():
+    modules = {
+        time.module
+        for time in profile_imports("import django; django.setup()")
+    }
+    assert "chat.models.image" in modules
+    assert "requests" not in modules
+    assert "PIL" not in modules
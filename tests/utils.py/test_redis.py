@@ -1,9 +1,11 @@
 import json
+import uuid
 from unittest.mock import MagicMock, patch
 
+import msgpack
 import pytest
 
-from utils.redis import cache_decorator
+from utils.redis import cache_decorator, pack_image_record, unpack_image_record
 
 
 @pytest.fixture
@@ -54,3 +56,39 @@ def test_cache_decorator_empty_cache(mock_redis, decorated_function):
     mock_redis.lrange.assert_called_once_with("test_key", 0, -1)
     mock_redis.lpop.assert_not_called()
     assert result == (None, "test_key")
+
+
+def test_image_record_round_trip():
+    image_data = {
+        "id": str(uuid.uuid4()),
+        "external_id": 12,
+        "url": "http://example.com/image.jpg",
+        "image_path": None,
+    }
+    packed = pack_image_record(image_data)
+    assert unpack_image_record(packed) == image_data
+    assert len(packed) < len(json.dumps(image_data))
+
+
+def test_unpack_legacy_json_image_record():
+    image_data = {"id": str(uuid.uuid4()), "external_id": 12}
+    assert unpack_image_record(json.dumps(image_data).encode()) == image_data
+
+
+def test_unpack_unknown_image_record_version():
+    assert unpack_image_record(msgpack.packb([99, b"", 1, "", None])) is None
+
+
+@patch("utils.redis.IMAGE_RECORD_VERSION", 2)
+def test_unpack_follows_image_record_version():
+    image_id = uuid.uuid4()
+    assert unpack_image_record(
+        msgpack.packb([2, image_id.bytes, 1, "http://example.com", None])
+    )["id"] == str(image_id)
+    assert unpack_image_record(msgpack.packb([1, b"", 1, "", None])) is None
+
+
+def test_cache_decorator_skips_unknown_records(mock_redis, decorated_function):
+    mock_redis.lrange.return_value = [msgpack.packb([99])]
+    result = decorated_function(MagicMock(), MagicMock(), cache_key="key")
+    assert result == (None, "key")
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+import pytest
+from django.urls import reverse
+
+from account.models import CustomUser
+from utils.replicas import (
+    ReplicaRouter,
+    get_read_database,
+    read_from_replica,
+    track_replica_state,
+)
+
+
+@pytest.fixture
+def replica():
+    with patch("utils.replicas.has_replica", return_value=True):
+        yield
+
+
+def test_reads_stay_on_primary_without_replica():
+    router = ReplicaRouter()
+    with read_from_replica():
+        assert get_read_database() == "default"
+        assert router.db_for_read(CustomUser) == "default"
+
+
+def test_reads_within_block_use_replica(replica):
+    router = ReplicaRouter()
+    assert router.db_for_read(CustomUser) is None
+    with read_from_replica():
+        assert router.db_for_read(CustomUser) == "replica"
+    assert router.db_for_read(CustomUser) is None
+
+
+def test_pinned_request_reads_from_primary(replica):
+    router = ReplicaRouter()
+    with track_replica_state(pinned=True), read_from_replica():
+        assert router.db_for_read(CustomUser) == "default"
+
+
+def test_write_pins_the_rest_of_the_request(replica):
+    router = ReplicaRouter()
+    with track_replica_state(pinned=False) as state, read_from_replica():
+        assert router.db_for_read(CustomUser) == "replica"
+        assert router.db_for_write(CustomUser) == "default"
+        assert state.wrote
+        assert router.db_for_read(CustomUser) == "default"
+
+
+def test_migrations_only_run_on_primary():
+    router = ReplicaRouter()
+    assert router.allow_migrate("default", "chat")
+    assert not router.allow_migrate("replica", "chat")
+
+
+@pytest.mark.django_db
+def test_changelist_reads_from_replica(admin_client, settings):
+    settings.DATABASE_ROUTERS = ["utils.replicas.ReplicaRouter"]
+    url = reverse("admin:chat_chat_changelist")
+    with patch(
+        "utils.replicas.get_read_database", return_value="default"
+    ) as mock_get_read_database:
+        admin_client.get(url)
+        assert mock_get_read_database.called
+        mock_get_read_database.reset_mock()
+        admin_client.post(url, {"action": "delete_elements"})
+        assert not mock_get_read_database.called
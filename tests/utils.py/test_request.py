@@ -14,7 +14,7 @@ from utils.request import make_get_request
 
 @pytest.fixture
 def mock_requests():
-    with patch("utils.request.requests.get") as mock:
+    with patch("requests.get") as mock:
         yield mock
 
 
@@ -0,0 +1,58 @@
+import hashlib
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from utils.storage import (
+    get_blob_name,
+    get_rendition_name,
+    list_blob_files,
+    store_blob,
+)
+
+CONTENT = b"fake image content"
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_get_blob_name():
+    assert get_blob_name(SHA256, ".JPG") == (
+        f"images/sha256/{SHA256[:2]}/{SHA256[2:4]}/{SHA256}.jpg"
+    )
+
+
+def test_store_blob(tmp_path):
+    storage = FileSystemStorage(location=tmp_path)
+    blob = store_blob([b"fake ", b"image content"], ".jpg", storage)
+
+    assert blob.sha256 == SHA256
+    assert blob.name == get_blob_name(SHA256, ".jpg")
+    assert blob.size == len(CONTENT)
+    with storage.open(blob.name) as file:
+        assert file.read() == CONTENT
+
+
+def test_store_blob_skips_existing(tmp_path):
+    storage = FileSystemStorage(location=tmp_path)
+    first = store_blob([CONTENT], ".jpg", storage)
+    with patch.object(storage, "save") as mock_save:
+        second = store_blob([CONTENT], ".jpg", storage)
+
+    assert second == first
+    mock_save.assert_not_called()
+    assert store_blob([b"other"], ".jpg", storage).name != first.name
+
+
+def test_list_blob_files(tmp_path):
+    storage = FileSystemStorage(location=tmp_path)
+    assert list_blob_files(SHA256, storage) == []
+
+    blob = store_blob([CONTENT], ".jpg", storage)
+    rendition = get_rendition_name(SHA256, (200, 200), ".webp")
+    assert rendition == get_blob_name(SHA256, "_200x200.webp")
+    storage.save(rendition, ContentFile(b"rendition"))
+    store_blob([b"other"], ".jpg", storage)
+
+    assert sorted(list_blob_files(SHA256, storage)) == sorted(
+        [blob.name, rendition]
+    )
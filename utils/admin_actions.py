@@ -1,6 +1,10 @@
 from django.contrib import admin
 from django.db.models import QuerySet
-from django.http import HttpRequest
+from django.http import HttpRequest, StreamingHttpResponse
+
+from utils.counts import invalidate_counts
+from utils.export import get_export_fields, streaming_export_response
+from utils.replicas import get_read_database
 
 
 @admin.action(
@@ -19,3 +23,60 @@ def delete_elements(
         selected in the admin interface.
     """
     queryset.update(is_deleted=True)
+    invalidate_counts(queryset.model)
+
+
+def _export(
+    model_admin: admin.ModelAdmin, queryset: QuerySet, export_format: str
+) -> StreamingHttpResponse:
+    fields = getattr(model_admin, "export_fields", None) or get_export_fields(
+        model_admin.model
+    )
+    # Rows are streamed after the request returns, so the database is
+    # chosen now, while the read-your-writes state is known.
+    return streaming_export_response(
+        queryset.using(get_read_database()),
+        fields,
+        export_format,
+        model_admin.model._meta.model_name,
+    )
+
+
+@admin.action(
+    permissions=["view"],
+    description="Export selected elements as CSV",
+)
+def export_as_csv(
+    model_admin: admin.ModelAdmin, request: HttpRequest, queryset: QuerySet
+) -> StreamingHttpResponse:
+    """
+    Streams the selected instances as a CSV file, with the fields listed
+    in the ``export_fields`` attribute of the ModelAdmin.
+
+    :param model_admin: The current ModelAdmin instance.
+    :param request: The current HttpRequest instance.
+    :param queryset: The QuerySet of instances
+        selected in the admin interface.
+    :return: The streaming CSV response.
+    """
+    return _export(model_admin, queryset, "csv")
+
+
+@admin.action(
+    permissions=["view"],
+    description="Export selected elements as JSON lines",
+)
+def export_as_jsonl(
+    model_admin: admin.ModelAdmin, request: HttpRequest, queryset: QuerySet
+) -> StreamingHttpResponse:
+    """
+    Streams the selected instances as a JSON lines file, with the fields
+    listed in the ``export_fields`` attribute of the ModelAdmin.
+
+    :param model_admin: The current ModelAdmin instance.
+    :param request: The current HttpRequest instance.
+    :param queryset: The QuerySet of instances
+        selected in the admin interface.
+    :return: The streaming JSON lines response.
+    """
+    return _export(model_admin, queryset, "jsonl")
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Iterator, List
+
+from django.contrib import admin
+from django.contrib.admin.utils import get_last_value_from_parameters
+from django.urls import reverse
+
+
+class UsernameAutocompleteFilter(admin.FieldListFilter):
+    """
+    Username filter rendered as a search box suggesting usernames from
+    the user autocomplete endpoint, instead of a link per user. The
+    changelist then renders without loading any username, and the
+    suggestions are limited prefix searches on an indexed column.
+    """
+
+    template = "admin/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = field_path
+        self.lookup_val = get_last_value_from_parameters(params, field_path)
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.autocomplete_url = reverse(
+            "admin:account_customuser_autocomplete"
+        )
+        self.hidden_params: List = []
+
+    def expected_parameters(self) -> List[str]:
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist) -> Iterator[Dict[str, Any]]:
+        # The search box submits the other filters of the changelist too.
+        self.hidden_params = [
+            (name, value)
+            for name, value in changelist.params.items()
+            if name != self.lookup_kwarg
+        ]
+        yield {
+            "selected": self.lookup_val is None,
+            "query_string": changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+            "display": "All",
+        }
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+from typing import Optional, Type
+
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import CASCADE, Model, QuerySet
+from django.utils.functional import cached_property
+
+from core.settings import COUNT_CACHE_TIMEOUT, COUNT_ESTIMATE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+def _get_version_key(model: Type[Model]) -> str:
+    return f"count_version:{model._meta.label_lower}"
+
+
+def invalidate_counts(model: Type[Model]) -> None:
+    """
+    Drop the cached counts of every queryset of a model, after writes.
+
+    :param model: The model class.
+    """
+    key = _get_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def invalidate_deleted_counts(model: Type[Model]) -> None:
+    """
+    Drop the cached counts of a model and of the models its deletes
+    cascade to, once per delete whatever the number of rows. Delete
+    signals would disable the fast deletes of cascaded rows.
+
+    :param model: The model class of the deleted rows.
+    """
+    invalidate_counts(model)
+    for relation in model._meta.related_objects:
+        if relation.on_delete is CASCADE:
+            invalidate_counts(relation.related_model)
+
+
+def get_estimated_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Get the number of rows of a queryset estimated by the PostgreSQL
+    planner, without running it.
+
+    :param queryset: The queryset.
+    :return: The estimated count, None on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+    except DatabaseError as e:
+        logger.warning(f"Error estimating count: {str(e)}")
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def get_count(
+    queryset: QuerySet, threshold: int = COUNT_ESTIMATE_THRESHOLD
+) -> int:
+    """
+    Count the rows of a queryset. Planner estimates above ``threshold``
+    are returned as they are. Below it, the exact count is cached for
+    COUNT_CACHE_TIMEOUT, or until invalidate_counts is called.
+
+    :param queryset: The queryset.
+    :param threshold: Minimum estimate returned instead of a COUNT.
+    :return: The estimated or exact count.
+    """
+    estimate = get_estimated_count(queryset)
+    if estimate is not None and estimate >= threshold:
+        return estimate
+
+    model = queryset.model
+    version = cache.get(_get_version_key(model), 0)
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.md5(f"{sql}{params!r}".encode()).hexdigest()
+    key = f"count:{model._meta.label_lower}:{version}:{digest}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class CountPaginator(Paginator):
+    """
+    Paginator counting its rows with get_count.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        return get_count(self.object_list)
+
+
+class CountChangeList(ChangeList):
+    """
+    ChangeList counting the unfiltered rows with get_count.
+    """
+
+    def get_results(self, request) -> None:
+        super().get_results(request)
+        if self.model_admin.show_full_result_count:
+            return
+        self.full_result_count = get_count(self.root_queryset)
+        self.show_full_result_count = True
+        self.show_admin_actions = bool(self.full_result_count)
+
+
+class ApproximateCountMixin:
+    """
+    ModelAdmin mixin counting the changelist rows with get_count: the
+    result and full counts of large tables are planner estimates, and
+    those of smaller ones are cached.
+    """
+
+    paginator = CountPaginator
+    # CountChangeList counts the unfiltered rows itself.
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return CountChangeList
+
+    def delete_model(self, request, obj) -> None:
+        super().delete_model(request, obj)
+        invalidate_deleted_counts(self.model)
+
+    def delete_queryset(self, request, queryset) -> None:
+        super().delete_queryset(request, queryset)
+        invalidate_deleted_counts(self.model)
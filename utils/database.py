@@ -0,0 +1,115 @@
+import os
+import warnings
+from typing import Any, Dict, Mapping, Optional
+
+import django
+
+
+def get_env_setting(
+    name: str,
+    default: str,
+    process_type: str,
+    environ: Optional[Mapping[str, str]] = None,
+) -> str:
+    """
+    Read a setting from the environment, letting a variable prefixed
+    with the process type (e.g. WORKER_DB_CONN_MAX_AGE) override the
+    generic one (DB_CONN_MAX_AGE).
+
+    :param name: Name of the environment variable.
+    :param default: Value used when neither variable is set.
+    :param process_type: Type of the running process (web, worker...).
+    :param environ: Environment to read. Defaults to os.environ.
+    :return: The setting value.
+    """
+    environ = os.environ if environ is None else environ
+    return environ.get(
+        f"{process_type.upper()}_{name}", environ.get(name, default)
+    )
+
+
+def get_database_config(
+    process_type: str, environ: Optional[Mapping[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Build the default database settings for a process type.
+
+    Connections are persistent and health checked by default. With
+    DB_PGBOUNCER=1 server-side cursors are disabled so the settings are
+    safe behind PgBouncer in transaction pooling mode. DB_POOL=1 uses
+    the psycopg 3 connection pool on Django 5.1+ and falls back to
+    persistent connections otherwise.
+
+    :param process_type: Type of the running process (web, worker...).
+    :param environ: Environment to read. Defaults to os.environ.
+    :return: The database settings.
+    """
+
+    def setting(name: str, default: str) -> str:
+        return get_env_setting(name, default, process_type, environ)
+
+    engine = setting("DB_ENGINE", "django.db.backends.postgresql")
+    config = {
+        "ENGINE": engine,
+        "NAME": setting("DB_NAME", "pure_app_db"),
+        "USER": setting("DB_USER", "user"),
+        "PASSWORD": setting("DB_PASS", "pure_app_db"),
+        "HOST": setting("DB_HOST", "db"),
+        "PORT": setting("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(setting("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": setting("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        "DISABLE_SERVER_SIDE_CURSORS": setting("DB_PGBOUNCER", "0") == "1",
+        "OPTIONS": {},
+    }
+    if "postgresql" not in engine:
+        return config
+
+    config["OPTIONS"]["connect_timeout"] = int(
+        setting("DB_CONNECT_TIMEOUT", "5")
+    )
+    if setting("DB_POOL", "0") != "1":
+        return config
+
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        psycopg_pool = None
+    if django.VERSION < (5, 1) or psycopg_pool is None:
+        warnings.warn(
+            "DB_POOL requires Django 5.1+ with psycopg 3 and psycopg_pool, "
+            "using persistent connections instead."
+        )
+        return config
+
+    # Django manages pooled connections itself, so they must not persist.
+    config["CONN_MAX_AGE"] = 0
+    config["OPTIONS"]["pool"] = {
+        "min_size": int(setting("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(setting("DB_POOL_MAX_SIZE", "10")),
+        "timeout": int(setting("DB_POOL_TIMEOUT", "10")),
+    }
+    return config
+
+
+def get_replica_config(
+    process_type: str, environ: Optional[Mapping[str, str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Build the settings of the read replica, if DB_REPLICA_HOST is set.
+    The replica shares the settings of the default database, except its
+    host and port, and mirrors the default database in tests.
+
+    :param process_type: Type of the running process (web, worker...).
+    :param environ: Environment to read. Defaults to os.environ.
+    :return: The replica settings, None without a replica.
+    """
+    host = get_env_setting("DB_REPLICA_HOST", "", process_type, environ)
+    if not host:
+        return None
+    config = get_database_config(process_type, environ)
+    config["HOST"] = host
+    config["PORT"] = get_env_setting(
+        "DB_REPLICA_PORT", config["PORT"], process_type, environ
+    )
+    config["TEST"] = {"MIRROR": "default"}
+    return config
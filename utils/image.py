@@ -1,33 +1,196 @@
+import io
 import logging
+import multiprocessing
 import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
 from urllib.parse import urlparse
 
-import requests
-from django.core.files.base import ContentFile
-from django.db.models import Model
+from core.settings import (
+    IMAGE_RENDITION_FORMAT,
+    IMAGE_RENDITION_QUALITY,
+    IMAGE_RENDITION_WORKERS,
+)
+from utils.metrics import (
+    IMAGE_DOWNLOAD_BYTES,
+    IMAGE_DOWNLOAD_DURATION,
+    IMAGE_DOWNLOAD_ERRORS,
+)
+from utils.storage import BLOB_CHUNK_SIZE, SpooledBlob, spool_blob
 
+# requests and Pillow are imported by the functions using them: this
+# module is loaded with the models by every web and worker process, and
+# most never download or render an image.
 logger = logging.getLogger(__name__)
+_rendition_executor: Optional[Executor] = None
 
 
-def download_image(
-    url: str, model_instance: Model, field_name: str = "image"
-) -> None:
+@contextmanager
+def download_blob(url: str) -> Iterator[Optional[SpooledBlob]]:
     """
-    Downloads an image from a URL and saves it to an
-    ImageField of a model instance.
+    Download an image from a URL and spool it, hashed, until the block
+    exits. The caller stores it once it knows the blob of its content,
+    see :func:`utils.storage.write_blob`.
 
     :param url: The URL of the image to download.
-    :param model_instance: The model instance where the image will be saved.
-    :param field_name: The name of the ImageField in the model.
-        Default is 'image'.
+    :return: The spooled content, None if the download failed.
     """
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        file_name = os.path.basename(urlparse(url).path)
-        file_content = ContentFile(response.content)
-        getattr(model_instance, field_name).save(
-            file_name, file_content, save=False
+    import requests
+
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        try:
+            response = requests.get(url, stream=True)
+            response.raise_for_status()
+            extension = os.path.splitext(urlparse(url).path)[1]
+            blob = stack.enter_context(
+                spool_blob(
+                    response.iter_content(chunk_size=BLOB_CHUNK_SIZE),
+                    extension,
+                )
+            )
+        except requests.RequestException as e:
+            IMAGE_DOWNLOAD_ERRORS.inc()
+            logger.error(f"Failed to download image from {url}. Error: {e}")
+            blob = None
+        else:
+            IMAGE_DOWNLOAD_DURATION.observe(time.perf_counter() - start)
+            IMAGE_DOWNLOAD_BYTES.inc(blob.size)
+        yield blob
+
+
+def render_image(
+    data: bytes,
+    max_size: Tuple[int, int],
+    image_format: str = IMAGE_RENDITION_FORMAT,
+    quality: int = IMAGE_RENDITION_QUALITY,
+) -> Tuple[bytes, int, int]:
+    """
+    Resize an image to fit in ``max_size``, keeping its aspect ratio and
+    never upscaling it, and encode it in ``image_format``.
+
+    Runs in the rendition worker processes, so it only takes and
+    returns picklable values.
+
+    :param data: Content of the original image.
+    :param max_size: Maximum width and height of the rendition.
+    :param image_format: Pillow format of the rendition.
+    :param quality: Encoding quality of the rendition.
+    :return: Content, width and height of the rendition.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert(
+                "RGBA" if image.has_transparency_data else "RGB"
+            )
+        output = io.BytesIO()
+        image.save(output, format=image_format, quality=quality)
+        return output.getvalue(), image.width, image.height
+
+
+def dhash(data: bytes, hash_size: int = 8) -> int:
+    """
+    Compute the difference hash of an image: every bit tells whether a
+    pixel of the downscaled grayscale image is brighter than its right
+    neighbour. Resized, recompressed or slightly edited copies of an
+    image get hashes at a small Hamming distance.
+
+    :param data: Content of the image.
+    :param hash_size: Number of rows and of bits per row of the hash.
+    :return: The hash, of ``hash_size ** 2`` bits.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Let JPEG decode at a reduced scale, far faster on large photos.
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        pixels = list(
+            ImageOps.exif_transpose(image)
+            .convert("L")
+            .resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+            .getdata()
+        )
+    width = hash_size + 1
+    value = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            index = row * width + column
+            value = value << 1 | (pixels[index] > pixels[index + 1])
+    return value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """
+    Count the bits that differ between two hashes.
+
+    :param first: The first hash.
+    :param second: The second hash.
+    :return: The number of differing bits.
+    """
+    return (first ^ second).bit_count()
+
+
+def get_rendition_executor() -> Optional[Executor]:
+    """
+    Get the process pool resizing the images, started on first use and
+    reused by the following calls. Daemonic processes, such as the
+    children of the prefork Celery pool, cannot start one and render
+    inline instead.
+
+    :return: The process pool, None if IMAGE_RENDITION_WORKERS is 0 or
+        the current process is daemonic.
+    """
+    global _rendition_executor
+    if multiprocessing.current_process().daemon:
+        return None
+    if _rendition_executor is None and IMAGE_RENDITION_WORKERS > 0:
+        _rendition_executor = ProcessPoolExecutor(
+            max_workers=IMAGE_RENDITION_WORKERS
         )
-    except requests.RequestException as e:
-        logger.error(f"Failed to download image from {url}. Error: {e}")
+    return _rendition_executor
+
+
+def render_images(
+    sources: Dict[Hashable, bytes], sizes: Dict[str, Tuple[int, int]]
+) -> Dict[Tuple[Hashable, str], Tuple[bytes, int, int]]:
+    """
+    Render every size of every source image, in parallel in the
+    rendition process pool. Images Pillow cannot read are skipped.
+
+    :param sources: Content of the original images, by key.
+    :param sizes: Maximum width and height of the renditions, by name.
+    :return: Content, width and height of the renditions, by source key
+        and rendition name.
+    """
+    from PIL import Image
+
+    executor = get_rendition_executor()
+    submit = executor.submit if executor else _run_inline
+    futures = {
+        (key, name): submit(render_image, data, max_size)
+        for key, data in sources.items()
+        for name, max_size in sizes.items()
+    }
+
+    renditions = {}
+    for (key, name), future in futures.items():
+        try:
+            renditions[key, name] = future.result()
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            logger.error(f"Failed to render image {key}. Error: {e}")
+    return renditions
+
+
+def _run_inline(func: Callable, *args: Any) -> Future:
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
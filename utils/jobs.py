@@ -0,0 +1,66 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import redis
+
+from core.settings import JOB_STATUS_TTL
+from utils.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+def get_job_key(kind: str, job_id: str) -> str:
+    """
+    Get the Redis key of the status of a job.
+
+    :param kind: The kind of job, e.g. the task name.
+    :param job_id: The id of the job within its kind.
+    :return: The Redis key.
+    """
+    return f"job:{kind}:{job_id}"
+
+
+def set_job_status(kind: str, job_id: str, status: str, **fields: Any) -> None:
+    """
+    Record the status of a long-running job in a Redis hash, expiring
+    JOB_STATUS_TTL after its last update. A JOB_RUNNING status starts a
+    new run and replaces the fields of the previous one, such as its
+    error. Errors are logged, not raised, so tracking never fails the
+    job.
+
+    :param kind: The kind of job, e.g. the task name.
+    :param job_id: The id of the job within its kind.
+    :param status: One of JOB_RUNNING, JOB_SUCCEEDED or JOB_FAILED.
+    :param fields: Other fields of the status, stored as strings.
+    """
+    key = get_job_key(kind, job_id)
+    mapping = {"status": status, "updated_at": f"{time.time():.3f}"}
+    mapping.update({name: str(value) for name, value in fields.items()})
+    try:
+        with redis_client.pipeline() as pipe:
+            if status == JOB_RUNNING:
+                pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, JOB_STATUS_TTL)
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Error recording status of {key}: {str(e)}")
+
+
+def get_job_status(kind: str, job_id: str) -> Optional[Dict[str, str]]:
+    """
+    Get the last recorded status of a job.
+
+    :param kind: The kind of job, e.g. the task name.
+    :param job_id: The id of the job within its kind.
+    :return: The fields of the status, None if none is recorded.
+    """
+    status = redis_client.hgetall(get_job_key(kind, job_id))
+    if not status:
+        return None
+    return {name.decode(): value.decode() for name, value in status.items()}
@@ -0,0 +1,162 @@
+import ipaddress
+import os
+import time
+from typing import Dict
+
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+from core.settings import METRICS_ALLOWED_NETWORKS
+
+# Banner fan-out
+BANNER_SENDS = Counter(
+    "banner_sends_total", "Banner sends by outcome", ["status"]
+)
+BANNER_MESSAGES_CREATED = Counter(
+    "banner_messages_created_total", "Banner messages inserted"
+)
+BANNER_SEND_DURATION = Histogram(
+    "banner_send_duration_seconds",
+    "Time spent inserting the messages of a banner send",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+# Banner image cache
+IMAGE_CACHE_REQUESTS = Counter(
+    "banner_image_cache_requests_total",
+    "Banner image cache lookups by result",
+    ["result"],
+)
+IMAGE_CACHE_REFILLS = Counter(
+    "banner_image_cache_refills_total", "Banner image cache refills"
+)
+IMAGE_CACHE_SIZE = Gauge(
+    "banner_image_cache_size",
+    "Images in the banner image cache after the last refill",
+    multiprocess_mode="max",
+)
+
+# Providers
+PROVIDER_FETCH_DURATION = Histogram(
+    "provider_fetch_duration_seconds",
+    "Time spent fetching data from a provider API",
+    ["provider"],
+)
+PROVIDER_FETCH_ERRORS = Counter(
+    "provider_fetch_errors_total", "Failed provider fetches", ["provider"]
+)
+PROVIDER_IMAGES_SAVED = Counter(
+    "provider_images_saved_total", "Images saved from a provider", ["provider"]
+)
+
+# Image downloads
+IMAGE_DOWNLOAD_DURATION = Histogram(
+    "image_download_duration_seconds", "Time spent downloading an image"
+)
+IMAGE_DOWNLOAD_BYTES = Counter(
+    "image_download_bytes_total", "Bytes of images downloaded"
+)
+IMAGE_DOWNLOAD_ERRORS = Counter(
+    "image_download_errors_total", "Failed image downloads"
+)
+
+# Celery
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time by task and final state",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+
+_task_start_times: Dict[str, float] = {}
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Get the registry to export. When PROMETHEUS_MULTIPROC_DIR is set,
+    the metrics of every process (e.g. prefork Celery workers) are
+    aggregated.
+
+    :return: The collector registry.
+    """
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def is_metrics_client_allowed(address: str) -> bool:
+    """
+    Check whether a client address belongs to METRICS_ALLOWED_NETWORKS.
+
+    :param address: The IP address of the client.
+    :return: True if the client may scrape the metrics.
+    """
+    try:
+        client = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        client in ipaddress.ip_network(network, strict=False)
+        for network in METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Expose the metrics in the Prometheus text format to the clients of
+    METRICS_ALLOWED_NETWORKS.
+
+    :param request: The current request object.
+    :return: Response with the current metric values, 403 for other
+        clients.
+    """
+    if not is_metrics_client_allowed(request.META.get("REMOTE_ADDR", "")):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
+
+
+def start_metrics_server(port: int) -> None:
+    """
+    Serve the metrics over HTTP from a background thread.
+
+    :param port: Port to listen on.
+    """
+    start_http_server(port, registry=get_registry())
+
+
+def task_started(task_id: str) -> None:
+    """
+    Remember when a Celery task started.
+
+    :param task_id: The id of the task.
+    """
+    _task_start_times[task_id] = time.perf_counter()
+
+
+def task_finished(task_id: str, task_name: str, state: str) -> None:
+    """
+    Record the duration of a finished Celery task.
+
+    :param task_id: The id of the task.
+    :param task_name: The name of the task.
+    :param state: The final state of the task.
+    """
+    start = _task_start_times.pop(task_id, None)
+    if start is not None:
+        CELERY_TASK_DURATION.labels(task_name, state or "UNKNOWN").observe(
+            time.perf_counter() - start
+        )
@@ -0,0 +1,123 @@
+import time
+from typing import Callable
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.http import HttpRequest, HttpResponse
+
+from core.settings import REPLICA_PIN_SECONDS
+from utils.profiling import (
+    OperationTracker,
+    log_slow_operation,
+    should_profile,
+)
+from utils.replicas import track_replica_state
+
+# Session key of the time until which the session reads from the primary.
+REPLICA_PIN_SESSION_KEY = "_replica_pinned_until"
+
+
+class OperationProfilingMiddleware:
+    """
+    Record the SQL queries, Redis commands and HTTP requests of a
+    sample of requests and log the ones exceeding the PROFILING_*
+    thresholds together with their top statements.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not should_profile():
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with OperationTracker(capture_statements=True) as tracker:
+            response = self.get_response(request)
+        log_slow_operation(
+            f"{request.method} {request.path}",
+            tracker,
+            time.perf_counter() - start,
+        )
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if not should_profile():
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        async with OperationTracker(capture_statements=True) as tracker:
+            response = await self.get_response(request)
+        log_slow_operation(
+            f"{request.method} {request.path}",
+            tracker,
+            time.perf_counter() - start,
+        )
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Give every session read-your-writes consistency with the replica:
+    a request that writes reads from the primary for the rest of the
+    request, and so do the requests of its session for the next
+    REPLICA_PIN_SECONDS, while the replica catches up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with track_replica_state(self.is_pinned(request)) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        # The session may be loaded from the database.
+        pinned = await sync_to_async(self.is_pinned)(request)
+        with track_replica_state(pinned) as state:
+            response = await self.get_response(request)
+        if state.wrote:
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def is_pinned(self, request: HttpRequest) -> bool:
+        """
+        Check whether the session of a request reads from the primary.
+
+        :param request: The current request object.
+        :return: True if the session wrote in the last REPLICA_PIN_SECONDS.
+        """
+        pinned_until = request.session.get(REPLICA_PIN_SESSION_KEY, 0)
+        return pinned_until > time.time()
+
+    def pin(self, request: HttpRequest) -> None:
+        """
+        Make the session of a request read from the primary for the next
+        REPLICA_PIN_SECONDS.
+
+        :param request: The current request object.
+        """
+        request.session[REPLICA_PIN_SESSION_KEY] = (
+            time.time() + REPLICA_PIN_SECONDS
+        )
@@ -1,6 +1,16 @@
-from typing import Callable
+import json
+import logging
+from typing import Callable, Iterable, Optional, Set
+
+import redis
+from django.contrib.auth.backends import ModelBackend
 
 from account.models import CustomUser
+from core.settings import PERMISSION_CACHE_TIMEOUT
+from utils.redis import redis_client
+
+PERMISSION_CACHE_PREFIX = "permissions:user:"
+logger = logging.getLogger(__name__)
 
 
 def has_modify_permissions(user: CustomUser, app: str, module: str) -> bool:
@@ -42,3 +52,71 @@ def has_modify_permissions_for_module(
         return has_modify_permissions(user, app, module)
 
     return has_permissions
+
+
+def get_permission_cache_key(user_id) -> str:
+    """
+    Get the Redis key of the cached permissions of a user.
+
+    :param user_id: The id of the user.
+    :return: The Redis key.
+    """
+    return f"{PERMISSION_CACHE_PREFIX}{user_id}"
+
+
+def invalidate_permission_cache(user_ids: Optional[Iterable] = None) -> None:
+    """
+    Drop the cached permissions of users. Redis errors are logged, the
+    entries then expire after PERMISSION_CACHE_TIMEOUT.
+
+    :param user_ids: Ids of the users, every user if None.
+    """
+    try:
+        if user_ids is None:
+            keys = list(
+                redis_client.scan_iter(match=f"{PERMISSION_CACHE_PREFIX}*")
+            )
+        else:
+            keys = [get_permission_cache_key(user_id) for user_id in user_ids]
+        if keys:
+            redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Error invalidating permission cache: {str(e)}")
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend caching the permissions of every user in Redis, so
+    permission checks of staff users need no query after the first
+    request. Within a request, the permissions stay cached on the user
+    object as ModelBackend does. account.signals invalidates the cache
+    when user, group or permission assignments change.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None) -> Set[str]:
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            user_obj._perm_cache = self._get_cached_permissions(user_obj)
+        return user_obj._perm_cache
+
+    def _get_cached_permissions(self, user_obj: CustomUser) -> Set[str]:
+        key = get_permission_cache_key(user_obj.pk)
+        try:
+            cached = redis_client.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Error reading permission cache: {str(e)}")
+            return super().get_all_permissions(user_obj)
+        if cached is not None:
+            return set(json.loads(cached))
+
+        permissions = super().get_all_permissions(user_obj)
+        try:
+            redis_client.set(
+                key,
+                json.dumps(sorted(permissions)),
+                ex=PERMISSION_CACHE_TIMEOUT,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Error writing permission cache: {str(e)}")
+        return permissions
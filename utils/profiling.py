@@ -0,0 +1,447 @@
+import logging
+import os
+import random
+import subprocess  # nosec B404
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_active_trackers: ContextVar[Tuple["OperationTracker", ...]] = ContextVar(
+    "active_trackers", default=()
+)
+_hooks_installed = False
+_task_trackers: Dict[str, Tuple["OperationTracker", float]] = {}
+
+
+class ImportTime(NamedTuple):
+    """
+    Import time of a module, as reported by ``python -X importtime``,
+    in microseconds.
+    """
+
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+class OperationBudgetExceeded(AssertionError):
+    """Exception raised when an operation exceeds its budget."""
+
+
+@dataclass
+class OperationStats:
+    """Counters and accumulated time (in seconds) per backend."""
+
+    sql_count: int = 0
+    sql_time: float = 0.0
+    redis_count: int = 0
+    redis_time: float = 0.0
+    http_count: int = 0
+    http_time: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Return the stats as a plain dictionary.
+
+        :return: Dictionary with the counters and timings.
+        """
+        return {
+            "sql_count": self.sql_count,
+            "sql_time": self.sql_time,
+            "redis_count": self.redis_count,
+            "redis_time": self.redis_time,
+            "http_count": self.http_count,
+            "http_time": self.http_time,
+        }
+
+
+@dataclass
+class OperationTracker:
+    """
+    Context manager that records the SQL queries, Redis commands and
+    outbound HTTP requests made by the current thread while it is active.
+
+    Trackers can be nested; every active tracker sees every operation.
+    With ``capture_statements`` the count and total time of every
+    distinct statement are also kept, see :meth:`top_statements`.
+    Async code uses ``async with`` so the queries it runs through
+    ``sync_to_async`` are recorded too.
+    """
+
+    stats: OperationStats = field(default_factory=OperationStats)
+    capture_statements: bool = False
+    statements: Dict[Tuple[str, str], List[float]] = field(
+        default_factory=dict
+    )
+
+    def __post_init__(self) -> None:
+        self._token = None
+        self._connections = []
+
+    def __enter__(self) -> "OperationTracker":
+        _install_hooks()
+        self._token = _active_trackers.set(_active_trackers.get() + (self,))
+        self._track_connections()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for connection in self._connections:
+            connection.execute_wrappers.remove(self._sql_wrapper)
+        self._connections = []
+        _active_trackers.reset(self._token)
+
+    async def __aenter__(self) -> "OperationTracker":
+        self.__enter__()
+        # sync_to_async runs the queries in a thread with its own
+        # connections.
+        await sync_to_async(self._track_connections)()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.__exit__(*exc_info)
+
+    def _track_connections(self) -> None:
+        for connection in connections.all():
+            if connection not in self._connections:
+                connection.execute_wrappers.append(self._sql_wrapper)
+                self._connections.append(connection)
+
+    def _sql_wrapper(
+        self,
+        execute: Callable,
+        sql: str,
+        params: Any,
+        many: bool,
+        context: Dict[str, Any],
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.stats.sql_count += 1
+            self.stats.sql_time += duration
+            if self.capture_statements:
+                self._record_statement("sql", sql, duration)
+
+    def _record_statement(
+        self, kind: str, statement: str, duration: float
+    ) -> None:
+        totals = self.statements.setdefault((kind, statement), [0, 0.0])
+        totals[0] += 1
+        totals[1] += duration
+
+    def record_redis(
+        self, duration: float, statement: Optional[str] = None
+    ) -> None:
+        """
+        Record a Redis round-trip.
+
+        :param duration: Time spent on the round-trip, in seconds.
+        :param statement: The Redis command, if known.
+        """
+        self.stats.redis_count += 1
+        self.stats.redis_time += duration
+        if self.capture_statements and statement:
+            self._record_statement("redis", statement, duration)
+
+    def record_http(
+        self, duration: float, statement: Optional[str] = None
+    ) -> None:
+        """
+        Record an outbound HTTP request.
+
+        :param duration: Time spent on the request, in seconds.
+        :param statement: The request method and URL, if known.
+        """
+        self.stats.http_count += 1
+        self.stats.http_time += duration
+        if self.capture_statements and statement:
+            self._record_statement("http", statement, duration)
+
+    def top_statements(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Get the statements that took the most time in total.
+
+        :param limit: Maximum number of statements to return.
+        :return: List of dictionaries with the kind, statement, count
+            and total time of each statement.
+        """
+        ranked = sorted(
+            self.statements.items(), key=lambda item: item[1][1], reverse=True
+        )
+        return [
+            {
+                "kind": kind,
+                "statement": statement,
+                "count": count,
+                "time": total_time,
+            }
+            for (kind, statement), (count, total_time) in ranked[:limit]
+        ]
+
+
+def _describe_redis_command(args: Tuple[Any, ...]) -> str:
+    return str(args[0]) if args else "PIPELINE"
+
+
+def _describe_http_request(args: Tuple[Any, ...]) -> str:
+    request = args[0]
+    return f"{request.method} {request.url.split('?')[0]}"
+
+
+def _tracked_call(
+    method: Callable, record: str, describe: Callable[[Tuple], str]
+) -> Callable:
+    """
+    Wrap a client method so every call is reported to the active
+    trackers as a single round-trip.
+
+    :param method: The unbound client method to wrap.
+    :param record: Name of the tracker method recording the call.
+    :param describe: Function building the statement of a call from its
+        positional arguments. Only called when a tracker captures them.
+    :return: The wrapped method.
+    """
+
+    def wrapper(self, *args, **kwargs):
+        trackers = _active_trackers.get()
+        if not trackers:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            statement = None
+            if any(tracker.capture_statements for tracker in trackers):
+                statement = describe(args)
+            for tracker in trackers:
+                getattr(tracker, record)(duration, statement)
+
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def _install_hooks() -> None:
+    """
+    Patch the Redis and requests clients once so commands, pipeline
+    executions and HTTP requests are visible to the trackers. Untracked
+    calls only pay for a context variable lookup.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    # Imported here so processes that never track pay nothing for them.
+    import redis
+    import requests
+
+    redis.Redis.execute_command = _tracked_call(
+        redis.Redis.execute_command, "record_redis", _describe_redis_command
+    )
+    redis.client.Pipeline.execute = _tracked_call(
+        redis.client.Pipeline.execute, "record_redis", _describe_redis_command
+    )
+    requests.Session.send = _tracked_call(
+        requests.Session.send, "record_http", _describe_http_request
+    )
+    _hooks_installed = True
+
+
+@contextmanager
+def operation_budget(
+    sql: Optional[int] = None,
+    redis: Optional[int] = None,
+    http: Optional[int] = None,
+    seconds: Optional[float] = None,
+) -> Iterator[OperationTracker]:
+    """
+    Fail when the wrapped block runs more SQL queries, Redis commands
+    or HTTP requests, or takes longer, than allowed. ``None`` leaves a
+    limit unchecked.
+
+    :param sql: Maximum number of SQL queries.
+    :param redis: Maximum number of Redis round-trips.
+    :param http: Maximum number of outbound HTTP requests.
+    :param seconds: Maximum wall time, in seconds.
+    :return: The tracker recording the block.
+    :raises OperationBudgetExceeded: If any limit is exceeded.
+    """
+    start = time.perf_counter()
+    with OperationTracker() as tracker:
+        yield tracker
+    elapsed = time.perf_counter() - start
+
+    stats = tracker.stats
+    errors = [
+        f"{name}: {used} > {limit}"
+        for name, used, limit in (
+            ("SQL queries", stats.sql_count, sql),
+            ("Redis commands", stats.redis_count, redis),
+            ("HTTP requests", stats.http_count, http),
+            ("Seconds", round(elapsed, 3), seconds),
+        )
+        if limit is not None and used > limit
+    ]
+    if errors:
+        raise OperationBudgetExceeded(
+            "Operation budget exceeded. " + ", ".join(errors)
+        )
+
+
+def should_profile() -> bool:
+    """
+    Decide whether the current request or task is profiled, according
+    to PROFILING_ENABLED and PROFILING_SAMPLE_RATE.
+
+    :return: True if the operation should be profiled.
+    """
+    return settings.PROFILING_ENABLED and (
+        random.random() < settings.PROFILING_SAMPLE_RATE  # nosec B311
+    )
+
+
+def log_slow_operation(
+    label: str, tracker: OperationTracker, elapsed: float
+) -> bool:
+    """
+    Log an operation, with its top statements, when it exceeds any of
+    the PROFILING_* thresholds.
+
+    :param label: Description of the operation (request or task).
+    :param tracker: The tracker that recorded the operation.
+    :param elapsed: Wall time of the operation, in seconds.
+    :return: True if the operation was logged.
+    """
+    stats = tracker.stats
+    exceeded = [
+        f"{name}={value}"
+        for name, value, limit in (
+            ("time_ms", round(elapsed * 1000), settings.PROFILING_SLOW_MS),
+            (
+                "sql_queries",
+                stats.sql_count,
+                settings.PROFILING_MAX_SQL_QUERIES,
+            ),
+            (
+                "sql_ms",
+                round(stats.sql_time * 1000),
+                settings.PROFILING_SLOW_SQL_MS,
+            ),
+            (
+                "redis_commands",
+                stats.redis_count,
+                settings.PROFILING_MAX_REDIS_COMMANDS,
+            ),
+            (
+                "http_requests",
+                stats.http_count,
+                settings.PROFILING_MAX_HTTP_REQUESTS,
+            ),
+        )
+        if value > limit
+    ]
+    if not exceeded:
+        return False
+
+    top_statements = "".join(
+        f"\n  {item['count']}x {item['time'] * 1000:.1f}ms "
+        f"[{item['kind']}] {item['statement'][:500]}"
+        for item in tracker.top_statements(settings.PROFILING_TOP_STATEMENTS)
+    )
+    logger.warning(
+        f"Slow operation {label}: {', '.join(exceeded)} "
+        f"(sql={stats.sql_count}/{stats.sql_time * 1000:.1f}ms "
+        f"redis={stats.redis_count}/{stats.redis_time * 1000:.1f}ms "
+        f"http={stats.http_count}/{stats.http_time * 1000:.1f}ms)"
+        f"{top_statements}"
+    )
+    return True
+
+
+def start_task_profiling(task_id: str) -> None:
+    """
+    Start profiling a Celery task, if it is sampled.
+
+    :param task_id: The id of the task.
+    """
+    if not should_profile():
+        return
+    tracker = OperationTracker(capture_statements=True)
+    tracker.__enter__()
+    _task_trackers[task_id] = (tracker, time.perf_counter())
+
+
+def finish_task_profiling(task_id: str, task_name: str) -> None:
+    """
+    Stop profiling a Celery task and log it if it was slow.
+
+    :param task_id: The id of the task.
+    :param task_name: The name of the task.
+    """
+    profiled = _task_trackers.pop(task_id, None)
+    if profiled is None:
+        return
+    tracker, start = profiled
+    tracker.__exit__(None, None, None)
+    log_slow_operation(
+        f"task {task_name}[{task_id}]", tracker, time.perf_counter() - start
+    )
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """
+    Parse the report ``python -X importtime`` writes to stderr.
+
+    :param output: The report.
+    :return: The import time of every module, in import order.
+    """
+    times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, module = line[12:].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue
+        times.append(
+            ImportTime(module.strip(), int(self_us), int(cumulative_us))
+        )
+    return times
+
+
+def profile_imports(code: str) -> List[ImportTime]:
+    """
+    Run Python code in a fresh interpreter with ``-X importtime``, so
+    nothing is already imported, and report the import time of every
+    module it loaded.
+
+    :param code: The code to run, e.g. ``"import core.wsgi"``.
+    :return: The import time of every module, in import order.
+    :raises subprocess.CalledProcessError: If the code fails.
+    """
+    process = subprocess.run(  # nosec B603
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=True,
+    )
+    return parse_importtime(process.stderr)
@@ -1,11 +1,97 @@
 import json
+import logging
+import uuid
 from functools import wraps
+from typing import Any, Dict, Optional, Union
 
+import msgpack
 import redis
+import redis.asyncio
 
 from core.settings import REDIS_HOST, REDIS_PORT
+from utils.metrics import IMAGE_CACHE_REQUESTS
 
 redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+logger = logging.getLogger(__name__)
+
+# Every module holding the shared Redis client, for the tests and the
+# benchmarks replacing it with an in-memory server.
+REDIS_CLIENT_TARGETS = (
+    "utils.redis.redis_client",
+    "utils.jobs.redis_client",
+    "utils.permissions.redis_client",
+    "chat.admin.redis_client",
+)
+
+# Version of the msgpack layout of the cached image records, first item
+# of every record. Bump it when the layout changes.
+IMAGE_RECORD_VERSION = 1
+
+
+def get_async_redis_client() -> redis.asyncio.Redis:
+    """
+    Create an asyncio Redis client. Its connections belong to the
+    running event loop, so callers close it with ``aclose()``.
+
+    :return: The asyncio Redis client.
+    """
+    return redis.asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+
+
+def publish_event(channel: str, payload: Dict[str, Any]) -> None:
+    """
+    Publish a JSON event on a Redis channel. Events are best effort:
+    Redis errors are logged, not raised.
+
+    :param channel: Name of the channel.
+    :param payload: JSON serializable event.
+    """
+    try:
+        redis_client.publish(channel, json.dumps(payload))
+    except redis.RedisError as e:
+        logger.warning(f"Error publishing event on {channel}: {str(e)}")
+
+
+def pack_image_record(image_data: Dict[str, Any]) -> bytes:
+    """
+    Pack an image record of the banner image cache with msgpack, as
+    [version, id bytes, external_id, url, image_path].
+
+    :param image_data: The image record, with its id as a string.
+    :return: The packed record.
+    """
+    return msgpack.packb(
+        [
+            IMAGE_RECORD_VERSION,
+            uuid.UUID(image_data["id"]).bytes,
+            image_data["external_id"],
+            image_data["url"],
+            image_data["image_path"],
+        ]
+    )
+
+
+def unpack_image_record(raw: Union[bytes, str]) -> Optional[Dict[str, Any]]:
+    """
+    Unpack an image record of the banner image cache. Records cached as
+    JSON before the msgpack layout are still read.
+
+    :param raw: The cached record.
+    :return: The image record, None if its version is unknown.
+    """
+    if isinstance(raw, str) or raw[:1] == b"{":
+        return json.loads(raw)
+    version, *fields = msgpack.unpackb(raw)
+    if version != IMAGE_RECORD_VERSION:
+        logger.warning(f"Unknown image record version: {version}")
+        return None
+    image_id, external_id, url, image_path = fields
+    return {
+        "id": str(uuid.UUID(bytes=image_id)),
+        "external_id": external_id,
+        "url": url,
+        "image_path": image_path,
+    }
 
 
 def cache_decorator():
@@ -26,8 +112,12 @@ def cache_decorator():
             cached_images = redis_client.lrange(cache_key, 0, -1)
             image_data = None
             if cached_images:
-                image_data = json.loads(cached_images[0])
+                image_data = unpack_image_record(cached_images[0])
                 redis_client.lpop(cache_key)
+            if image_data:
+                IMAGE_CACHE_REQUESTS.labels("hit").inc()
+            else:
+                IMAGE_CACHE_REQUESTS.labels("miss").inc()
             return func(self, request, image_data, cache_key, *args, **kwargs)
 
         return wrapper
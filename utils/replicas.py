@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.template.response import SimpleTemplateResponse
+
+REPLICA_DATABASE = "replica"
+
+
+@dataclass
+class ReplicaState:
+    """
+    Replica routing state of the current request: whether its user
+    wrote recently, so it reads from the primary, and whether it wrote
+    itself.
+    """
+
+    pinned: bool = False
+    wrote: bool = False
+
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+_replica_state: ContextVar[Optional[ReplicaState]] = ContextVar(
+    "replica_state", default=None
+)
+
+
+def has_replica() -> bool:
+    """
+    Check whether a replica database is configured.
+
+    :return: True if the ``replica`` alias exists.
+    """
+    return REPLICA_DATABASE in settings.DATABASES
+
+
+def get_read_database() -> str:
+    """
+    Get the database read-only queries of the current request should
+    use: the replica, unless none is configured or the request is
+    pinned to the primary after a write.
+
+    :return: The database alias.
+    """
+    state = _replica_state.get()
+    if not has_replica() or (state and (state.pinned or state.wrote)):
+        return DEFAULT_DB_ALIAS
+    return REPLICA_DATABASE
+
+
+@contextmanager
+def read_from_replica() -> Iterator[None]:
+    """
+    Route the reads made within the block to the replica, see
+    :func:`get_read_database`. Reads elsewhere stay on the primary.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def track_replica_state(pinned: bool) -> Iterator[ReplicaState]:
+    """
+    Track the writes of a request and keep its reads on the primary if
+    it is pinned.
+
+    :param pinned: Whether the request reads from the primary.
+    :return: The state of the request, telling if it wrote.
+    """
+    state = ReplicaState(pinned=pinned)
+    token = _replica_state.set(state)
+    try:
+        yield state
+    finally:
+        _replica_state.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads made within
+    :func:`read_from_replica` to the replica. Writes, migrations and
+    every other read stay on the primary, and a request writing reads
+    its own writes from the primary.
+    """
+
+    def db_for_read(self, model, **hints: Any) -> Optional[str]:
+        if _replica_reads.get():
+            return get_read_database()
+        return None
+
+    def db_for_write(self, model, **hints: Any) -> str:
+        state = _replica_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints: Any) -> bool:
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints: Any) -> bool:
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    ModelAdmin mixin reading the changelist, its search, filters and
+    counts from the replica on GET requests. Actions, posted to the
+    changelist, stay on the primary.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method not in ("GET", "HEAD"):
+            return super().changelist_view(request, extra_context)
+        with read_from_replica():
+            response = super().changelist_view(request, extra_context)
+            # The results are queried while the template is rendered.
+            if isinstance(response, SimpleTemplateResponse):
+                response.render()
+        return response
@@ -1,16 +1,13 @@
+import logging
 from typing import Any, Dict
 
-import requests
-from celery.utils.log import get_task_logger
-from requests.exceptions import HTTPError, RequestException
-
 from utils.exceptions import (
     ExternalAPIUnavailableError,
     InternalError,
     UnexpectedResponseError,
 )
 
-logger = get_task_logger(__name__)
+logger = logging.getLogger(__name__)
 
 
 def make_get_request(
@@ -26,6 +23,11 @@ def make_get_request(
     :raises UnexpectedResponseError: If the server response is unexpected.
     :raises InternalError: For any other internal error.
     """
+    # Imported on first use: the providers importing this module are
+    # loaded by processes that never call them.
+    import requests
+    from requests.exceptions import HTTPError, RequestException
+
     try:
         response = requests.get(url, params=params)
         response.raise_for_status()
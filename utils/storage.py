@@ -0,0 +1,147 @@
+import hashlib
+import posixpath
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+
+BLOB_DIRECTORY = "images/sha256"
+BLOB_CHUNK_SIZE = 64 * 1024
+# Blobs larger than this are spooled to a temporary file while hashed
+BLOB_SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class StoredBlob(NamedTuple):
+    """Content-addressed file written by store_blob"""
+
+    sha256: str
+    name: str
+    size: int
+
+
+class SpooledBlob(NamedTuple):
+    """Content hashed by spool_blob, not stored yet"""
+
+    sha256: str
+    name: str
+    size: int
+    file: IO[bytes]
+
+
+def get_blob_name(sha256: str, extension: str = "") -> str:
+    """
+    Get the storage name of a blob from the digest of its content, fanned
+    out in two levels of directories.
+
+    :param sha256: The hex digest of the content.
+    :param extension: The file extension, with its leading dot.
+    :return: The storage name, e.g. images/sha256/ab/cd/abcd....jpg.
+    """
+    return (
+        f"{BLOB_DIRECTORY}/{sha256[:2]}/{sha256[2:4]}/"
+        f"{sha256}{extension.lower()}"
+    )
+
+
+def get_rendition_name(
+    sha256: str, size: Tuple[int, int], extension: str
+) -> str:
+    """
+    Get the storage name of a resized copy of the content of a blob,
+    next to the blob, so identical images share their renditions.
+
+    :param sha256: The hex digest of the original content.
+    :param size: The maximum width and height of the copy.
+    :param extension: The file extension, with its leading dot.
+    :return: The storage name, e.g.
+        images/sha256/ab/cd/abcd..._800x800.webp.
+    """
+    width, height = size
+    return get_blob_name(sha256, f"_{width}x{height}{extension}")
+
+
+def list_blob_files(
+    sha256: str, storage: Optional[Storage] = None
+) -> List[str]:
+    """
+    List the stored files named after the digest of a content: its blob
+    and the renditions of every size.
+
+    :param sha256: The hex digest of the content.
+    :param storage: The storage, default_storage if not given.
+    :return: The storage names of the files.
+    """
+    storage = storage or default_storage
+    directory = posixpath.dirname(get_blob_name(sha256))
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [f"{directory}/{file}" for file in files if file.startswith(sha256)]
+
+
+@contextmanager
+def spool_blob(
+    chunks: Iterable[bytes], extension: str = ""
+) -> Iterator[SpooledBlob]:
+    """
+    Hash a stream of bytes while spooling it, in memory or to a
+    temporary file, deleted when the block exits.
+
+    :param chunks: The content, chunk by chunk.
+    :param extension: The file extension, with its leading dot.
+    :return: The digest, storage name, size and spooled content.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=BLOB_SPOOL_MAX_SIZE) as spool:
+        for chunk in chunks:
+            digest.update(chunk)
+            spool.write(chunk)
+            size += len(chunk)
+        sha256 = digest.hexdigest()
+        yield SpooledBlob(
+            sha256, get_blob_name(sha256, extension), size, spool
+        )
+
+
+def write_blob(
+    name: str, file: IO[bytes], storage: Optional[Storage] = None
+) -> None:
+    """
+    Store content under a blob name. The write is skipped when a file
+    with the same name, so the same content, is already stored.
+
+    :param name: The storage name of the blob.
+    :param file: The content.
+    :param storage: The storage, default_storage if not given.
+    """
+    storage = storage or default_storage
+    if storage.exists(name):
+        return
+    file.seek(0)
+    saved = storage.save(name, File(file, name=name))
+    if saved != name:
+        # Stored concurrently: same name, so same content.
+        storage.delete(saved)
+
+
+def store_blob(
+    chunks: Iterable[bytes],
+    extension: str = "",
+    storage: Optional[Storage] = None,
+) -> StoredBlob:
+    """
+    Hash a stream of bytes while spooling it, and store it under the
+    digest of its content, see :func:`write_blob`.
+
+    :param chunks: The content, chunk by chunk.
+    :param extension: The file extension, with its leading dot.
+    :param storage: The storage, default_storage if not given.
+    :return: The digest, storage name and size of the blob.
+    """
+    with spool_blob(chunks, extension) as blob:
+        write_blob(blob.name, blob.file, storage)
+    return StoredBlob(blob.sha256, blob.name, blob.size)